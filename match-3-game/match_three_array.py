@@ -0,0 +1,103 @@
+"""三消网格的紧凑数组表示
+
+用uint8数组保存色块编码（0表示空位），掉落压缩和填充对所有列做批量数组运算。
+需要numpy（已列在requirements.txt中），未安装时导入本模块会抛出ImportError。
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from match_three_engine import CODE_COLORS, COLOR_CODES, EMPTY_CODE, Color
+
+
+def encode_colors(colors: Iterable[Color]) -> np.ndarray:
+    """把颜色列表转换为编码数组"""
+    return np.array([COLOR_CODES[color] for color in colors], dtype=np.uint8)
+
+
+def encode_grid(grid: List[List[Optional[Color]]]) -> np.ndarray:
+    """把 list-of-lists 颜色网格转换为uint8编码数组"""
+    return np.array(
+        [[COLOR_CODES[color] if color is not None else EMPTY_CODE for color in row] for row in grid],
+        dtype=np.uint8,
+    )
+
+
+def decode_grid(codes: np.ndarray) -> List[List[Optional[Color]]]:
+    """把uint8编码数组转换回 list-of-lists 颜色网格"""
+    return [[CODE_COLORS[code] for code in row] for row in codes.tolist()]
+
+
+class _CompactRow:
+    """CompactGrid 的行视图，按列读写颜色"""
+    __slots__ = ('_codes', '_row')
+
+    def __init__(self, codes: np.ndarray, row: int):
+        self._codes = codes
+        self._row = row
+
+    def __getitem__(self, col: int) -> Optional[Color]:
+        return CODE_COLORS[self._codes.item(self._row, col)]
+
+    def __setitem__(self, col: int, color: Optional[Color]):
+        self._codes[self._row, col] = COLOR_CODES[color] if color is not None else EMPTY_CODE
+
+    def __len__(self) -> int:
+        return self._codes.shape[1]
+
+    def __iter__(self):
+        return (CODE_COLORS[code] for code in self._codes[self._row].tolist())
+
+
+class CompactGrid:
+    """uint8数组网格，支持 grid[row][col] 形式的颜色读写"""
+
+    def __init__(self, rows: int, cols: int):
+        self.codes = np.zeros((rows, cols), dtype=np.uint8)
+
+    @classmethod
+    def from_grid(cls, grid: List[List[Optional[Color]]]) -> 'CompactGrid':
+        compact = cls(len(grid), len(grid[0]) if grid else 0)
+        compact.codes[:] = encode_grid(grid)
+        return compact
+
+    def __getitem__(self, row: int) -> _CompactRow:
+        return _CompactRow(self.codes, row)
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def __iter__(self):
+        return (_CompactRow(self.codes, row) for row in range(self.codes.shape[0]))
+
+    def to_grid(self) -> List[List[Optional[Color]]]:
+        return decode_grid(self.codes)
+
+    def fill_random(self, rng: np.random.Generator, palette: np.ndarray):
+        """用调色板中的颜色随机填满整个网格"""
+        self.codes[:] = palette[rng.integers(len(palette), size=self.codes.shape)]
+
+    def settle(self, rng: np.random.Generator, palette: np.ndarray,
+               columns: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """指定的列（默认所有列）同时做重力压缩并从上方填充新色块
+
+        返回 (发生变化的列, 每列从顶部填充的新色块数量)
+        """
+        if columns is None:
+            changed_columns = np.flatnonzero((self.codes == EMPTY_CODE).any(axis=0))
+        else:
+            columns = np.asarray(columns, dtype=np.intp)
+            changed_columns = columns[(self.codes[:, columns] == EMPTY_CODE).any(axis=0)]
+        if changed_columns.size == 0:
+            return changed_columns, changed_columns
+
+        # 只处理有空位的列：稳定排序把空位移到列顶，非空色块保持原有上下顺序
+        columns = self.codes[:, changed_columns]
+        order = np.argsort(columns != EMPTY_CODE, axis=0, kind='stable')
+        columns = np.take_along_axis(columns, order, axis=0)
+
+        # 一次性为所有空位抽取新色块
+        holes = columns == EMPTY_CODE
+        columns[holes] = palette[rng.integers(len(palette), size=int(holes.sum()))]
+        self.codes[:, changed_columns] = columns
+        return changed_columns, holes.sum(axis=0)
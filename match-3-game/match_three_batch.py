@@ -0,0 +1,331 @@
+"""三消游戏的批量多棋盘模拟
+
+BatchEngine 把成千上万个独立棋盘叠成一个 (棋盘数, 行, 列) 的uint8数组，每一步为每个棋盘
+同时执行一次点击：连通组用批量膨胀求出，计分、特殊色块升级链
+（普通 → 黄金 → 钻石 → 彩色 → 珍珠）、附近位置选择和掉落填充都是整批数组运算。
+规则与 MatchThreeEngine 相同，只有含彩色万能色块的混合组按行优先的第一个色块计分
+（引擎按集合遍历顺序），因此单局结果不逐一对应，统计分布一致。
+
+命令行统计分数、特殊色块出现频率和死局分布，用于平衡特殊色块的分数：
+    python3 match_three_batch.py --games 1000000 --boards 4096 --steps 200
+    python3 match_three_batch.py --corpus boards.m3b --steps 200   # 从棋盘库的固定开局模拟
+需要numpy（已列在requirements.txt中）。
+"""
+import argparse
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from match_three_engine import (COLOR_CODES, CODE_COLORS, ELIMINATION_POINTS, EMPTY_CODE, HAMMER_POINTS,
+                                NORMAL_COLORS, NORMAL_POINTS, SPECIAL_COLORS, Color)
+
+GOLD_CODE = COLOR_CODES[Color.GOLD]
+DIAMOND_CODE = COLOR_CODES[Color.DIAMOND]
+COLORFUL_CODE = COLOR_CODES[Color.COLORFUL]
+PEARL_CODE = COLOR_CODES[Color.PEARL]
+
+# 颜色编码 -> 是否特殊色块
+IS_SPECIAL = np.zeros(len(CODE_COLORS), dtype=bool)
+IS_SPECIAL[[COLOR_CODES[color] for color in SPECIAL_COLORS]] = True
+
+
+def point_table(points: Optional[Dict[Color, int]] = None) -> np.ndarray:
+    """颜色编码 -> 每个色块的分数（可覆盖特殊色块分数做平衡实验）"""
+    table = np.full(len(CODE_COLORS), NORMAL_POINTS, dtype=np.int64)
+    for color, value in {**ELIMINATION_POINTS, **(points or {})}.items():
+        table[COLOR_CODES[color]] = value
+    return table
+
+
+def dilate(mask: np.ndarray, diagonal: bool = False) -> np.ndarray:
+    """对 (棋盘数, 行, 列) 布尔数组做一格膨胀（4邻域或8邻域）"""
+    grown = mask.copy()
+    grown[:, 1:, :] |= mask[:, :-1, :]
+    grown[:, :-1, :] |= mask[:, 1:, :]
+    if diagonal:
+        rows = grown.copy()
+        grown[:, :, 1:] |= rows[:, :, :-1]
+        grown[:, :, :-1] |= rows[:, :, 1:]
+    else:
+        grown[:, :, 1:] |= mask[:, :, :-1]
+        grown[:, :, :-1] |= mask[:, :, 1:]
+    return grown
+
+
+def flood(seed: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+    """从种子出发在允许的格子内做4邻域洪水填充，只继续扩展上一轮还有变化的棋盘"""
+    mask = seed & allowed
+    growing = np.flatnonzero(mask.any(axis=(1, 2)))
+    while growing.size:
+        current = mask[growing]
+        grown = dilate(current) & allowed[growing]
+        mask[growing] = grown
+        growing = growing[(grown != current).any(axis=(1, 2))]
+    return mask
+
+
+class BatchEngine:
+    """批量三消规则引擎：一步为每个未结束的棋盘执行一次点击或锤子"""
+
+    def __init__(self, boards: int, grid_size: int = 10, colors=None, seed: Optional[int] = None,
+                 hammer_count: int = 3, points: Optional[Dict[Color, int]] = None,
+                 codes: Optional[np.ndarray] = None):
+        self.boards = boards
+        self.GRID_SIZE = grid_size
+        self.rng = np.random.default_rng(seed)
+        self.palette_codes = np.array([COLOR_CODES[color] for color in (colors or NORMAL_COLORS)],
+                                      dtype=np.uint8)
+        self.points = point_table(points)
+
+        # 开局棋盘：给定的 (棋盘数, 行, 列) 颜色编码（例如棋盘库中的固定开局）或随机生成
+        shape = (boards, grid_size, grid_size)
+        if codes is not None:
+            if codes.shape != shape:
+                raise ValueError(f"开局棋盘的形状应为 {shape}，实际 {codes.shape}")
+            self.codes = codes.astype(np.uint8, copy=True)
+        else:
+            self.codes = self.palette_codes[self.rng.integers(len(self.palette_codes), size=shape)]
+        self._board_index = np.arange(boards)
+
+        # 每个棋盘的统计
+        self.score = np.zeros(boards, dtype=np.int64)
+        self.eliminated_count = np.zeros(boards, dtype=np.int64)
+        self.hammer_count = np.full(boards, hammer_count, dtype=np.int64)
+        self.clicks = np.zeros(boards, dtype=np.int64)
+        self.dead_boards = np.zeros(boards, dtype=np.int64)        # 遇到死局的次数
+        self.first_dead_step = np.full(boards, -1, dtype=np.int64)
+        self.game_over_step = np.full(boards, -1, dtype=np.int64)
+        # 按 SPECIAL_COLORS 顺序：生成的特殊色块数量 / 以该颜色计分的消除次数
+        self.specials_created = np.zeros((boards, len(SPECIAL_COLORS)), dtype=np.int64)
+        self.special_eliminations = np.zeros((boards, len(SPECIAL_COLORS)), dtype=np.int64)
+        self.steps = 0
+
+    @property
+    def active(self) -> np.ndarray:
+        return self.game_over_step < 0
+
+    def movable(self) -> np.ndarray:
+        """能组成至少2个色块消除组的格子：有同色或彩色邻居，或自身是彩色色块"""
+        codes = self.codes
+        colorful = codes == COLORFUL_CODE
+        movable = colorful.copy()
+        vertical = (codes[:, 1:, :] == codes[:, :-1, :]) | colorful[:, 1:, :] | colorful[:, :-1, :]
+        horizontal = (codes[:, :, 1:] == codes[:, :, :-1]) | colorful[:, :, 1:] | colorful[:, :, :-1]
+        movable[:, 1:, :] |= vertical
+        movable[:, :-1, :] |= vertical
+        movable[:, :, 1:] |= horizontal
+        movable[:, :, :-1] |= horizontal
+        return movable & (codes != EMPTY_CODE)
+
+    def pick_cells(self, mask: np.ndarray):
+        """每个棋盘在掩码内均匀随机选一个格子，返回 (行, 列, 是否有可选格子)"""
+        weights = self.rng.random(mask.shape)
+        weights[~mask] = -1.0
+        flat = weights.reshape(self.boards, -1).argmax(axis=1)
+        rows, cols = np.divmod(flat, self.GRID_SIZE)
+        return rows, cols, mask.reshape(self.boards, -1).any(axis=1)
+
+    def groups(self, rows: np.ndarray, cols: np.ndarray, clicking: np.ndarray) -> np.ndarray:
+        """求每个点击棋盘会消除的格子，规则与 MatchThreeEngine.find_connected_cells 相同"""
+        codes = self.codes
+        size = self.GRID_SIZE
+        index = self._board_index
+        start = np.zeros(codes.shape, dtype=bool)
+        start[index, rows, cols] = clicking
+        start_codes = codes[index, rows, cols]
+
+        # 普通色块：同色块和彩色色块组成的连通区域
+        allowed = (codes == start_codes[:, None, None]) | (codes == COLORFUL_CODE)
+        group = flood(start & (start_codes != COLORFUL_CODE)[:, None, None], allowed)
+
+        # 彩色色块：自身加四个相邻色块各自的同色连通组
+        colorful = np.flatnonzero(clicking & (start_codes == COLORFUL_CODE))
+        if colorful.size:
+            sub_codes = codes[colorful]
+            sub_group = start[colorful]
+            sub_index = np.arange(colorful.size)
+            for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                nr, nc = rows[colorful] + dr, cols[colorful] + dc
+                inside = (nr >= 0) & (nr < size) & (nc >= 0) & (nc < size)
+                nr, nc = np.clip(nr, 0, size - 1), np.clip(nc, 0, size - 1)
+                neighbor_codes = sub_codes[sub_index, nr, nc]
+                seed = np.zeros(sub_codes.shape, dtype=bool)
+                seed[sub_index, nr, nc] = inside & (neighbor_codes != EMPTY_CODE)
+                # 相邻的彩色色块不再向外扩展
+                same = (sub_codes == neighbor_codes[:, None, None]) & (neighbor_codes != COLORFUL_CODE)[:, None, None]
+                sub_group |= flood(seed, same | seed)
+            group[colorful] = sub_group
+        return group
+
+    def eliminate(self, group: np.ndarray, clicking: np.ndarray):
+        """批量消除、计分并按升级链在附近生成特殊色块（不含掉落）"""
+        codes = self.codes
+        boards = self.boards
+        counts = group.sum(axis=(1, 2))
+
+        # 按行优先的第一个色块颜色计分
+        first = group.reshape(boards, -1).argmax(axis=1)
+        first_codes = codes.reshape(boards, -1)[self._board_index, first]
+        points = np.where(clicking, counts * self.points[first_codes], 0)
+        self.score += points
+        self.eliminated_count += np.where(clicking, counts, 0)
+        self.clicks += clicking
+        for i, color in enumerate(SPECIAL_COLORS):
+            self.special_eliminations[:, i] += clicking & (first_codes == COLOR_CODES[color])
+
+        def contains(code):
+            return (group & (codes == code)).any(axis=(1, 2))
+
+        has_gold, has_diamond = contains(GOLD_CODE), contains(DIAMOND_CODE)
+        has_colorful, has_pearl = contains(COLORFUL_CODE), contains(PEARL_CODE)
+
+        # 升级链：彩色→珍珠，3个以上钻石→彩色，黄金→钻石，普通→黄金；钻石单独消除和珍珠消除不生成
+        new_codes = np.select(
+            [has_colorful, has_diamond & (counts >= 3), has_gold, ~(has_diamond | has_pearl)],
+            [PEARL_CODE, COLORFUL_CODE, DIAMOND_CODE, GOLD_CODE], EMPTY_CODE).astype(np.uint8)
+        new_codes[~clicking] = EMPTY_CODE
+
+        candidates = dilate(group, diagonal=True) & ~group & ~IS_SPECIAL[codes]
+        candidates &= (new_codes != EMPTY_CODE)[:, None, None]
+        codes[group] = EMPTY_CODE
+
+        rows, cols, placed = self.pick_cells(candidates)
+        placed = np.flatnonzero(placed)
+        codes[placed, rows[placed], cols[placed]] = new_codes[placed]
+        for i, color in enumerate(SPECIAL_COLORS):
+            self.specials_created[:, i] += np.bincount(
+                placed[new_codes[placed] == COLOR_CODES[color]], minlength=boards)
+
+    def use_hammers(self, dead: np.ndarray):
+        """死局的棋盘用锤子随机敲碎一个色块，没有锤子的结束游戏"""
+        has_hammer = dead & (self.hammer_count > 0)
+        self.dead_boards += dead
+        self.first_dead_step[dead & (self.first_dead_step < 0)] = self.steps
+        self.game_over_step[dead & ~has_hammer] = self.steps
+
+        boards = np.flatnonzero(has_hammer)
+        if boards.size:
+            rows = self.rng.integers(self.GRID_SIZE, size=boards.size)
+            cols = self.rng.integers(self.GRID_SIZE, size=boards.size)
+            self.codes[boards, rows, cols] = EMPTY_CODE
+            self.score[boards] += HAMMER_POINTS
+            self.eliminated_count[boards] += 1
+            self.hammer_count[boards] -= 1
+
+    def settle(self):
+        """所有棋盘同时做重力压缩并从上方填充新色块"""
+        empty = self.codes == EMPTY_CODE
+        if not empty.any():
+            return
+        order = np.argsort(~empty, axis=1, kind='stable')
+        self.codes = np.take_along_axis(self.codes, order, axis=1)
+        holes = self.codes == EMPTY_CODE
+        self.codes[holes] = self.palette_codes[self.rng.integers(len(self.palette_codes), size=int(holes.sum()))]
+
+    def step(self, rows: Optional[np.ndarray] = None, cols: Optional[np.ndarray] = None):
+        """每个未结束的棋盘执行一次点击（默认随机点击可消除的格子），死局时用锤子"""
+        active = self.active
+        movable = self.movable()
+        if rows is None or cols is None:
+            rows, cols, has_moves = self.pick_cells(movable)
+        else:
+            has_moves = movable.reshape(self.boards, -1).any(axis=1)
+
+        clicking = active & has_moves & movable[self._board_index, rows, cols]
+        self.use_hammers(active & ~has_moves)
+        self.eliminate(self.groups(rows, cols, clicking), clicking)
+        self.settle()
+        self.steps += 1
+
+    def run(self, steps: int):
+        for _ in range(steps):
+            if not self.active.any():
+                break
+            self.step()
+
+
+def _parse_points(items) -> Dict[Color, int]:
+    points = {}
+    for item in items or []:
+        name, value = item.split('=')
+        points[Color[name.upper()]] = int(value)
+    return points
+
+
+def _percentiles(values: np.ndarray) -> str:
+    if values.size == 0:
+        return "-"
+    p = np.percentile(values, [5, 25, 50, 75, 95])
+    return f"平均 {values.mean():.1f}，P5/P25/P50/P75/P95 = " + "/".join(f"{v:.0f}" for v in p)
+
+
+def main():
+    """命令行：批量模拟并报告分数、特殊色块频率和死局分布"""
+    parser = argparse.ArgumentParser(description="三消游戏批量模拟")
+    parser.add_argument('--games', type=int, default=100000, help="模拟的对局总数")
+    parser.add_argument('--boards', type=int, default=4096, help="每批同时模拟的棋盘数")
+    parser.add_argument('--steps', type=int, default=200, help="每局最多步数")
+    parser.add_argument('--seed', type=int, default=0, help="随机数种子")
+    parser.add_argument('--hammers', type=int, default=3, help="初始锤子数量")
+    parser.add_argument('--points', nargs='*', metavar='COLOR=N', help="覆盖特殊色块分数，例如 GOLD=2000")
+    parser.add_argument('--corpus', default=None, help="从棋盘库文件取开局棋盘（对局数不超过库中的棋盘数）")
+    args = parser.parse_args()
+
+    corpus = None
+    grid_size = 10
+    if args.corpus:
+        from match_three_boards import BoardCorpus
+        corpus = BoardCorpus(args.corpus)
+        if corpus.rows != corpus.cols:
+            parser.error(f"棋盘库中是 {corpus.rows}x{corpus.cols} 的棋盘，批量模拟只支持正方形棋盘")
+        grid_size = corpus.rows
+        args.games = min(args.games, len(corpus))
+
+    points = _parse_points(args.points)
+    scores, eliminated, clicks, dead, first_dead, over = [], [], [], [], [], []
+    created = np.zeros(len(SPECIAL_COLORS), dtype=np.int64)
+    special_eliminations = np.zeros(len(SPECIAL_COLORS), dtype=np.int64)
+
+    start = time.perf_counter()
+    done = 0
+    batch_seed = args.seed
+    while done < args.games:
+        boards = min(args.boards, args.games - done)
+        codes = corpus.arrays(done, done + boards) if corpus is not None else None
+        engine = BatchEngine(boards, grid_size, seed=batch_seed, hammer_count=args.hammers, points=points,
+                             codes=codes)
+        engine.run(args.steps)
+
+        scores.append(engine.score)
+        eliminated.append(engine.eliminated_count)
+        clicks.append(engine.clicks)
+        dead.append(engine.dead_boards)
+        first_dead.append(engine.first_dead_step)
+        over.append(engine.game_over_step)
+        created += engine.specials_created.sum(axis=0)
+        special_eliminations += engine.special_eliminations.sum(axis=0)
+        done += boards
+        batch_seed += 1
+
+    elapsed = time.perf_counter() - start
+    scores, eliminated, clicks = np.concatenate(scores), np.concatenate(eliminated), np.concatenate(clicks)
+    dead, first_dead, over = np.concatenate(dead), np.concatenate(first_dead), np.concatenate(over)
+    total_clicks = max(int(clicks.sum()), 1)
+
+    print(f"模拟 {done} 局，每局最多 {args.steps} 步，用时 {elapsed:.1f}s"
+          f"（{int(clicks.sum()) / elapsed:.0f} 次点击/秒）")
+    print(f"分数: {_percentiles(scores)}")
+    print(f"消除色块: {_percentiles(eliminated)}")
+    print("特殊色块（每千次点击）:")
+    for i, color in enumerate(SPECIAL_COLORS):
+        print(f"  {color.name:<9} 生成 {created[i] * 1000 / total_clicks:8.2f}"
+              f"  计分消除 {special_eliminations[i] * 1000 / total_clicks:8.2f}")
+    print(f"遇到死局的对局: {np.mean(dead > 0) * 100:.2f}%，死局次数分布: "
+          + ", ".join(f"{k}次 {np.mean(dead == k) * 100:.2f}%" for k in range(int(dead.max()) + 1)))
+    print(f"首次死局步数: {_percentiles(first_dead[first_dead >= 0])}")
+    print(f"锤子用完后结束的对局: {np.mean(over >= 0) * 100:.2f}%，结束步数: {_percentiles(over[over >= 0])}")
+
+
+if __name__ == '__main__':
+    main()
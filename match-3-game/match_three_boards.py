@@ -0,0 +1,323 @@
+"""三消棋盘的紧凑文件格式和棋盘库
+
+每个格子用4位保存颜色编码（编码表见 match_three_engine，0 为空位，13 个编码正好装进4位），
+10x10 的棋盘连同种子和分数只占 66 字节。一个文件是同一尺寸棋盘的序列（单个棋盘就是只有一个
+棋盘的库），每条记录定长，可以按序号直接定位。
+
+BoardCorpus 内存映射整个文件，len() 和按序号读取都不需要扫描；迭代时复用同一个 BoardView，
+只在调用 codes() 时才解码，遍历数百万个棋盘也不会为每个棋盘创建新对象。arrays() 把一段棋盘
+整批解码成 (数量, 行, 列) 的数组，批量模拟和基准测试可以共用同一批固定开局。
+
+文件格式（小端）：
+    文件头  <4sHHH  魔数 b'M3BD'、版本号、行数、列数
+    棋盘    <Qq     种子、分数 + ceil(行数×列数/2) 字节的颜色编码（每字节先高4位后低4位）
+
+命令行：
+    python3 match_three_boards.py export boards.m3b --count 1000000   # 用随机种子生成棋盘库
+    python3 match_three_boards.py info boards.m3b
+    python3 match_three_boards.py show boards.m3b --index 42
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from match_three_engine import CODE_COLORS, COLOR_CODES, EMPTY_CODE, MatchThreeEngine
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'M3BD'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sHHH')
+BOARD_HEADER = struct.Struct('<Qq')
+
+
+def packed_size(cells: int) -> int:
+    """cells 个格子打包后的字节数"""
+    return (cells + 1) // 2
+
+
+def pack_codes(codes: Sequence[int]) -> bytes:
+    """把颜色编码序列打包成每格4位（格子数为奇数时最后半个字节补0）"""
+    if np is not None:
+        values = np.asarray(codes, dtype=np.uint8).ravel()
+        if values.size % 2:
+            values = np.append(values, np.uint8(EMPTY_CODE))
+        return ((values[0::2] << 4) | values[1::2]).tobytes()
+
+    codes = list(codes)
+    if len(codes) % 2:
+        codes.append(EMPTY_CODE)
+    return bytes((codes[i] << 4) | codes[i + 1] for i in range(0, len(codes), 2))
+
+
+def unpack_codes(buffer, offset: int, cells: int) -> List[int]:
+    """从缓冲区的 offset 处解出 cells 个颜色编码"""
+    end = offset + packed_size(cells)
+    if np is not None:
+        return unpack_array(buffer, offset, cells).tolist()
+    codes = []
+    for byte in buffer[offset:end]:
+        codes.append(byte >> 4)
+        codes.append(byte & 0x0F)
+    return codes[:cells]
+
+
+def unpack_array(buffer, offset: int, cells: int):
+    """从缓冲区解出颜色编码的uint8数组（需要numpy）"""
+    packed = np.frombuffer(buffer, dtype=np.uint8, count=packed_size(cells), offset=offset)
+    codes = np.empty(packed.size * 2, dtype=np.uint8)
+    codes[0::2] = packed >> 4
+    codes[1::2] = packed & 0x0F
+    return codes[:cells]
+
+
+def record_dtype(cells: int):
+    """一条棋盘记录的numpy结构化类型，与 BOARD_HEADER + 打包格子的布局相同"""
+    return np.dtype([('seed', '<u8'), ('score', '<i8'), ('cells', np.uint8, (packed_size(cells),))])
+
+
+def engine_codes(engine: MatchThreeEngine) -> List[int]:
+    """引擎当前网格的颜色编码（行优先）"""
+    if engine.compact:
+        return engine.grid.codes.ravel().tolist()
+    return [COLOR_CODES[color] if color is not None else EMPTY_CODE
+            for row in engine.grid for color in row]
+
+
+class BoardWriter:
+    """顺序写入同一尺寸棋盘的棋盘库文件"""
+
+    def __init__(self, path: str, rows: int, cols: int, append: bool = False):
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.count = 0
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with BoardCorpus(path) as corpus:
+                if (corpus.rows, corpus.cols) != (rows, cols):
+                    raise ValueError(f"棋盘库 {path} 的尺寸是 {corpus.rows}x{corpus.cols}，不能追加 {rows}x{cols} 的棋盘")
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, rows, cols))
+
+    def write(self, codes: Sequence[int], seed: int = 0, score: int = 0):
+        """写入一个棋盘（行优先的颜色编码）"""
+        if len(codes) != self.rows * self.cols:
+            raise ValueError(f"棋盘应有 {self.rows * self.cols} 个格子，实际 {len(codes)} 个")
+        self._file.write(BOARD_HEADER.pack(seed, score) + pack_codes(codes))
+        self.count += 1
+
+    def write_engine(self, engine: MatchThreeEngine, seed: int = 0):
+        """写入引擎当前的棋盘和分数"""
+        self.write(engine_codes(engine), seed, engine.score)
+
+    def write_batch(self, codes, seeds, scores=None):
+        """一次写入一批棋盘：codes 是 (数量, 行数×列数) 或 (数量, 行数, 列数) 的uint8数组（需要numpy）"""
+        codes = np.asarray(codes, dtype=np.uint8).reshape(len(seeds), -1)
+        if codes.shape[1] != self.rows * self.cols:
+            raise ValueError(f"棋盘应有 {self.rows * self.cols} 个格子，实际 {codes.shape[1]} 个")
+        if codes.shape[1] % 2:
+            codes = np.hstack([codes, np.full((len(codes), 1), EMPTY_CODE, dtype=np.uint8)])
+
+        # 每行是一条完整记录：种子、分数和打包后的格子
+        records = np.empty(len(codes), dtype=record_dtype(self.rows * self.cols))
+        records['seed'] = seeds
+        records['score'] = 0 if scores is None else scores
+        records['cells'] = (codes[:, 0::2] << 4) | codes[:, 1::2]
+        self._file.write(records.tobytes())
+        self.count += len(codes)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'BoardWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BoardView:
+    """棋盘库中一个棋盘的只读视图（迭代时复用同一个对象，需要保留时调用 copy()）"""
+    __slots__ = ('corpus', 'index', 'offset', 'seed', 'score')
+
+    def __init__(self, corpus: 'BoardCorpus'):
+        self.corpus = corpus
+        self.index = -1
+        self.offset = 0
+        self.seed = 0
+        self.score = 0
+
+    def _move(self, index: int) -> 'BoardView':
+        corpus = self.corpus
+        self.index = index
+        self.offset = FILE_HEADER.size + index * corpus.record_size
+        self.seed, self.score = BOARD_HEADER.unpack_from(corpus.buffer, self.offset)
+        return self
+
+    def codes(self) -> List[int]:
+        """行优先的颜色编码"""
+        return unpack_codes(self.corpus.buffer, self.offset + BOARD_HEADER.size, self.corpus.cells)
+
+    def array(self):
+        """(行数, 列数) 的uint8颜色编码数组（需要numpy）"""
+        corpus = self.corpus
+        return unpack_array(corpus.buffer, self.offset + BOARD_HEADER.size, corpus.cells).reshape(corpus.rows, corpus.cols)
+
+    def colors(self):
+        """list-of-lists 颜色网格"""
+        codes = self.codes()
+        cols = self.corpus.cols
+        return [[CODE_COLORS[code] for code in codes[row * cols:(row + 1) * cols]] for row in range(self.corpus.rows)]
+
+    def copy(self) -> 'BoardView':
+        return BoardView(self.corpus)._move(self.index)
+
+    def load_into(self, engine: MatchThreeEngine):
+        """用这个棋盘重置引擎（网格、分数和随机数种子）"""
+        engine.load_board(self.codes(), self.seed, self.score)
+
+
+class BoardCorpus:
+    """内存映射的棋盘库，按序号直接读取或惰性遍历"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols = FILE_HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是三消棋盘库文件: {path}")
+        if version != VERSION:
+            raise ValueError(f"不支持的棋盘库版本: {version}")
+        self.cells = self.rows * self.cols
+        self.record_size = BOARD_HEADER.size + packed_size(self.cells)
+        # 最后一条记录没写完整时忽略它
+        self.count = (len(self.buffer) - FILE_HEADER.size) // self.record_size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> BoardView:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"棋盘序号超出范围: {index}")
+        return BoardView(self)._move(index)
+
+    def __iter__(self) -> Iterator[BoardView]:
+        return self.iter_boards()
+
+    def iter_boards(self, start: int = 0, stop: Optional[int] = None) -> Iterator[BoardView]:
+        """惰性遍历棋盘，每次产出同一个（已移动到下一个棋盘的）视图"""
+        view = BoardView(self)
+        for index in range(start, self.count if stop is None else min(stop, self.count)):
+            yield view._move(index)
+
+    def records(self, start: int = 0, stop: Optional[int] = None):
+        """[start, stop) 的记录数组（直接映射文件，不复制，需要numpy）"""
+        stop = self.count if stop is None else min(stop, self.count)
+        start = min(start, stop)
+        return np.frombuffer(self.buffer, dtype=record_dtype(self.cells), count=stop - start,
+                             offset=FILE_HEADER.size + start * self.record_size)
+
+    def arrays(self, start: int = 0, stop: Optional[int] = None):
+        """[start, stop) 的棋盘解码成 (数量, 行数, 列数) 的uint8数组，批量模拟用"""
+        packed = self.records(start, stop)['cells']
+        codes = np.empty((len(packed), packed.shape[1] * 2), dtype=np.uint8)
+        codes[:, 0::2] = packed >> 4
+        codes[:, 1::2] = packed & 0x0F
+        return codes[:, :self.cells].reshape(-1, self.rows, self.cols)
+
+    def close(self):
+        self.buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> 'BoardCorpus':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_board(path: str, engine: MatchThreeEngine, seed: int = 0):
+    """把引擎当前的棋盘保存为单个棋盘的文件"""
+    with BoardWriter(path, engine.GRID_SIZE, engine.GRID_SIZE) as writer:
+        writer.write_engine(engine, seed)
+
+
+def load_board(path: str, index: int = 0, engine: Optional[MatchThreeEngine] = None) -> MatchThreeEngine:
+    """从棋盘文件读取一个棋盘，加载到给定引擎或新建的引擎"""
+    with BoardCorpus(path) as corpus:
+        if corpus.rows != corpus.cols:
+            raise ValueError(f"引擎只支持正方形棋盘，文件中是 {corpus.rows}x{corpus.cols}")
+        board = corpus[index]
+        if engine is None:
+            engine = MatchThreeEngine(corpus.rows, seed=board.seed)
+        board.load_into(engine)
+    return engine
+
+
+def export_random_boards(path: str, count: int, grid_size: int = 10, seed: int = 0,
+                         colors: Optional[Iterable] = None):
+    """用连续的种子生成随机棋盘（与同种子的新对局开局相同）写入棋盘库"""
+    engine = MatchThreeEngine(grid_size, list(colors) if colors else None, seed=seed)
+    with BoardWriter(path, grid_size, grid_size) as writer:
+        for board_seed in range(seed, seed + count):
+            engine.rng.seed(board_seed)
+            engine.generate_grid()
+            writer.write_engine(engine, board_seed)
+
+
+def main():
+    """命令行：生成随机棋盘库、查看棋盘库信息或打印一个棋盘"""
+    parser = argparse.ArgumentParser(description="三消棋盘库工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="用连续的种子生成随机棋盘库")
+    export_parser.add_argument('corpus_path')
+    export_parser.add_argument('--count', type=int, default=1000, help="棋盘数量")
+    export_parser.add_argument('--size', type=int, default=10, help="棋盘边长")
+    export_parser.add_argument('--seed', type=int, default=0, help="第一个棋盘的种子")
+
+    info_parser = subparsers.add_parser('info', help="打印棋盘库的尺寸、数量和遍历速度")
+    info_parser.add_argument('corpus_path')
+
+    show_parser = subparsers.add_parser('show', help="打印一个棋盘")
+    show_parser.add_argument('corpus_path')
+    show_parser.add_argument('--index', type=int, default=0, help="棋盘序号")
+
+    args = parser.parse_args()
+    logging.getLogger('match_three_engine').setLevel(logging.WARNING)
+
+    if args.command == 'export':
+        start = time.perf_counter()
+        export_random_boards(args.corpus_path, args.count, args.size, args.seed)
+        print(f"生成 {args.count} 个棋盘到 {args.corpus_path}，用时 {time.perf_counter() - start:.2f}s")
+        return
+
+    with BoardCorpus(args.corpus_path) as corpus:
+        if args.command == 'info':
+            start = time.perf_counter()
+            score_total = sum(board.score for board in corpus)
+            elapsed = time.perf_counter() - start
+            print(f"{corpus.rows}x{corpus.cols} 棋盘 {len(corpus)} 个，每个 {corpus.record_size} 字节，"
+                  f"总分 {score_total}，遍历用时 {elapsed:.2f}s")
+            return
+
+        board = corpus[args.index]
+        print(f"棋盘 {board.index}：种子 {board.seed}，分数 {board.score}")
+        for row in board.colors():
+            print(' '.join(color.name[:2] if color is not None else '..' for color in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""三消游戏的自动游玩机器人
+
+RolloutBot 对每个候选消除组做蒙特卡洛模拟：在引擎副本上先点击该组，再随机点击若干步，
+以平均得分选择点击。模拟分批提交到进程池，每一步有时间预算；poll() 不阻塞，可以在窗口游戏的
+主循环里逐帧调用，choose_move() 阻塞到预算用完，用于无界面锦标赛。
+
+锦标赛比较不同策略的期望分数，同时是让所有CPU满载的引擎压力测试：
+    python3 match_three_bot.py --games 20 --strategies random greedy rollout --budget 0.2
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from match_three_engine import MatchThreeEngine
+
+# 机器人操作：('click', 行, 列) 或 ('hammer', 行, 列)
+Move = Tuple[str, int, int]
+
+
+def candidate_clicks(engine: MatchThreeEngine) -> List[Tuple[int, int]]:
+    """每个不同的可消除组取一个点击位置"""
+    return [divmod(i, engine.GRID_SIZE) for i, _, _ in engine.components.iter_groups()]
+
+
+def hammer_move(engine: MatchThreeEngine, rng: random.Random) -> Optional[Move]:
+    """死局时随机敲碎一个色块，没有锤子时返回None"""
+    if engine.hammer_count <= 0:
+        return None
+    return ('hammer', rng.randrange(engine.GRID_SIZE), rng.randrange(engine.GRID_SIZE))
+
+
+def apply_move(engine: MatchThreeEngine, move: Move):
+    """在引擎上执行操作，结算方式与窗口游戏相同"""
+    kind, row, col = move
+    if kind == 'hammer':
+        if engine.use_hammer(row, col) is not None:
+            engine.settle()
+    else:
+        engine.click(row, col)
+
+
+def _init_worker():
+    # 模拟时不输出引擎的逐步日志
+    logging.getLogger('match_three_engine').setLevel(logging.WARNING)
+
+
+def run_rollouts(snapshot: dict, click: Tuple[int, int], seeds: List[int], depth: int) -> Tuple[Tuple[int, int], int, int]:
+    """在进程池中执行：先点击候选位置，再随机点击depth步，返回 (候选位置, 模拟次数, 总得分)"""
+    total = 0
+    for seed in seeds:
+        engine = MatchThreeEngine.from_snapshot(snapshot, seed)
+        rng = random.Random(seed)
+        start = engine.score
+        engine.click(*click)
+        for _ in range(depth):
+            clicks = candidate_clicks(engine)
+            if not clicks:
+                break
+            engine.click(*rng.choice(clicks))
+        total += engine.score - start
+    return click, len(seeds), total
+
+
+class RandomBot:
+    """随机点击一个可消除组"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def choose_move(self, engine: MatchThreeEngine) -> Optional[Move]:
+        clicks = candidate_clicks(engine)
+        if not clicks:
+            return hammer_move(engine, self.rng)
+        return ('click',) + self.rng.choice(clicks)
+
+    def poll(self, engine: MatchThreeEngine) -> Optional[Move]:
+        return self.choose_move(engine)
+
+    def close(self):
+        pass
+
+
+class GreedyBot(RandomBot):
+    """点击当前得分最高的组（与提示功能相同）"""
+
+    def choose_move(self, engine: MatchThreeEngine) -> Optional[Move]:
+        best_move = engine.find_best_move()
+        if best_move is None:
+            return hammer_move(engine, self.rng)
+        return ('click', best_move[0], best_move[1])
+
+
+class RolloutBot(RandomBot):
+    """蒙特卡洛模拟机器人：在时间预算内把候选组的模拟分批分发到进程池"""
+
+    def __init__(self, budget: float = 0.5, depth: int = 10, batch: int = 4,
+                 workers: Optional[int] = None, seed: Optional[int] = None):
+        super().__init__(seed)
+        self.budget = budget
+        self.depth = depth
+        self.batch = batch
+        self.workers = workers or os.cpu_count() or 1
+        # spawn 启动的子进程不继承pygame窗口状态
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker)
+
+        # 当前思考中的一步
+        self._key = None
+        self._snapshot = None
+        self._stats: Dict[Tuple[int, int], List[int]] = {}
+        self._futures: Dict[Future, Tuple[int, int]] = {}  # 进行中的模拟 -> 候选位置
+        self._deadline = 0.0
+
+    def _state_key(self, engine: MatchThreeEngine):
+        return engine.score, engine.eliminated_count, engine.hammer_count
+
+    def _start(self, engine: MatchThreeEngine, clicks: List[Tuple[int, int]]):
+        self._key = self._state_key(engine)
+        self._snapshot = engine.snapshot()
+        self._stats = {click: [0, 0] for click in clicks}
+        self._deadline = time.perf_counter() + self.budget
+
+    def _submit(self):
+        # 模拟次数最少的候选优先，保证每个候选都至少有一批模拟
+        click = min(self._stats, key=lambda c: self._stats[c][0] + self._pending_count(c))
+        seeds = [self.rng.getrandbits(32) for _ in range(self.batch)]
+        future = self.pool.submit(run_rollouts, self._snapshot, click, seeds, self.depth)
+        self._futures[future] = click
+
+    def _pending_count(self, click) -> int:
+        return sum(self.batch for pending in self._futures.values() if pending == click)
+
+    def _collect(self):
+        for future in [f for f in self._futures if f.done()]:
+            del self._futures[future]
+            click, count, total = future.result()
+            stats = self._stats.get(click)
+            if stats is not None:
+                stats[0] += count
+                stats[1] += total
+
+    def poll(self, engine: MatchThreeEngine) -> Optional[Move]:
+        """不阻塞地推进思考，预算用完且模拟全部返回后给出操作，否则返回None"""
+        if self._key != self._state_key(engine):
+            # 新的一步（或局面被其他输入改变）：重新开始，丢弃旧的模拟结果，还没开始的模拟直接取消
+            for future in self._futures:
+                future.cancel()
+            self._futures.clear()
+            clicks = candidate_clicks(engine)
+            if len(clicks) <= 1:
+                self._key = None
+                return ('click',) + clicks[0] if clicks else hammer_move(engine, self.rng)
+            self._start(engine, clicks)
+
+        self._collect()
+        if time.perf_counter() < self._deadline:
+            while len(self._futures) < self.workers * 2:
+                self._submit()
+            return None
+        if self._futures:
+            return None
+
+        best = max(self._stats, key=lambda c: self._stats[c][1] / max(self._stats[c][0], 1))
+        self._key = None
+        return ('click',) + best
+
+    def choose_move(self, engine: MatchThreeEngine) -> Optional[Move]:
+        """阻塞直到预算用完"""
+        while True:
+            move = self.poll(engine)
+            if move is not None or self._key is None:
+                return move
+            remaining = max(self._deadline - time.perf_counter(), 0.0)
+            wait(self._futures, timeout=remaining or None, return_when=FIRST_COMPLETED)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def create_bot(strategy: str, seed: Optional[int] = None, budget: float = 0.5,
+               depth: int = 10, workers: Optional[int] = None):
+    if strategy == 'random':
+        return RandomBot(seed)
+    if strategy == 'greedy':
+        return GreedyBot(seed)
+    if strategy == 'rollout':
+        return RolloutBot(budget, depth, workers=workers, seed=seed)
+    raise ValueError(f"未知的策略: {strategy}")
+
+
+def play_game(bot, seed: int, max_moves: int) -> Tuple[int, int, int]:
+    """用无界面引擎下一局，返回 (分数, 消除数量, 操作数)"""
+    engine = MatchThreeEngine(seed=seed)
+    moves = 0
+    while moves < max_moves:
+        move = bot.choose_move(engine)
+        if move is None:
+            break
+        apply_move(engine, move)
+        moves += 1
+    return engine.score, engine.eliminated_count, moves
+
+
+def main():
+    """命令行：无界面锦标赛，比较各策略的期望分数"""
+    parser = argparse.ArgumentParser(description="三消游戏机器人锦标赛")
+    parser.add_argument('--games', type=int, default=10, help="每个策略的对局数（各策略使用相同的种子）")
+    parser.add_argument('--moves', type=int, default=100, help="每局最多操作数")
+    parser.add_argument('--strategies', nargs='+', default=['random', 'greedy', 'rollout'],
+                        choices=['random', 'greedy', 'rollout'])
+    parser.add_argument('--budget', type=float, default=0.2, help="蒙特卡洛机器人每步的时间预算（秒）")
+    parser.add_argument('--depth', type=int, default=10, help="每次模拟随机点击的步数")
+    parser.add_argument('--workers', type=int, default=None, help="进程池大小，默认CPU核数")
+    parser.add_argument('--seed', type=int, default=0, help="第一局的种子")
+    args = parser.parse_args()
+
+    _init_worker()
+    for strategy in args.strategies:
+        bot = create_bot(strategy, args.seed, args.budget, args.depth, args.workers)
+        start = time.perf_counter()
+        results = [play_game(bot, seed, args.moves) for seed in range(args.seed, args.seed + args.games)]
+        elapsed = time.perf_counter() - start
+        bot.close()
+
+        scores = [score for score, _, _ in results]
+        moves = sum(count for _, _, count in results)
+        spread = statistics.stdev(scores) if len(scores) > 1 else 0.0
+        print(f"{strategy:<8} 平均分 {statistics.mean(scores):>10.0f} ± {spread:<9.0f}"
+              f" 最低 {min(scores):>8} 最高 {max(scores):>8}"
+              f" 平均消除 {statistics.mean(e for _, e, _ in results):.0f}"
+              f" 用时 {elapsed:.1f}s（{moves / elapsed:.1f} 步/秒）")
+
+
+if __name__ == '__main__':
+    main()
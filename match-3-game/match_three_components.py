@@ -0,0 +1,342 @@
+"""三消网格的连通分量索引
+
+整盘一次性标记同色连通分量，之后只对发生变化的列（及其左右相邻列）涉及的分量重新标记。
+点击结算、连通组大小和悬停预览的分数查询变成查表，结果与 MatchThreeEngine 的洪水填充一致：
+- 普通色块：同色块加彩色万能色块组成的连通区域（彩色色块可以继续向外连接同色块）
+- 彩色色块：自身加四个相邻色块各自的同色连通组（不经过其他彩色色块扩展）
+"""
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from match_three_engine import ELIMINATION_POINTS, NORMAL_POINTS, Color
+
+EMPTY = -1       # 空位
+UNLABELED = 0    # 待重新标记
+
+
+class ComponentIndex:
+    """整盘连通分量标记，按列增量失效"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.rows = engine.GRID_SIZE
+        self.cols = engine.GRID_SIZE
+
+        # 扁平索引 row * cols + col -> 分量编号
+        self.labels: List[int] = [UNLABELED] * (self.rows * self.cols)
+        # 分量编号 -> 成员扁平索引 / 颜色
+        self.members: Dict[int, List[int]] = {}
+        self.label_colors: Dict[int, Color] = {}
+        self.colorful_labels: Set[int] = set()
+        self._next_label = 1
+        # 成员数不少于2的普通分量个数，用于即时判断是否还有可消除的组
+        self._multi_count = 0
+
+        # 彩色色块连接后的普通色块组（懒计算）：分量编号 -> 成员扁平索引
+        self._wildcard_groups: Optional[Dict[int, List[int]]] = None
+        self._wildcard_roots: Dict[int, int] = {}  # 分量编号 -> 合并集合的代表编号
+
+        # 每个组点击能获得的分数：普通分量按编号缓存，随分量一起失效；
+        # 彩色色块连接的组依赖相邻分量，每次重新标记后整体清空
+        self._points: Dict[int, int] = {}
+        self._derived_points: Dict[Tuple[str, int], int] = {}
+
+        self._dirty_columns: Set[int] = set()
+        self._needs_rebuild = True
+
+    def invalidate_all(self):
+        """整盘失效（生成新网格或外部直接改写网格后调用）"""
+        self._needs_rebuild = True
+        self._dirty_columns.clear()
+
+    def invalidate_columns(self, columns: Iterable[int]):
+        """标记发生变化的列，下次查询时重新标记"""
+        if not self._needs_rebuild:
+            self._dirty_columns.update(columns)
+
+    def refresh(self):
+        """按需重建或增量更新分量标记"""
+        if self._needs_rebuild:
+            self._rebuild()
+        elif self._dirty_columns:
+            self._update_dirty_columns()
+
+    def _rebuild(self):
+        self.labels = [UNLABELED] * (self.rows * self.cols)
+        self.members.clear()
+        self.label_colors.clear()
+        self.colorful_labels.clear()
+        self._next_label = 1
+        self._multi_count = 0
+        self._points.clear()
+        self._label_cells(range(self.rows * self.cols))
+        self._wildcard_groups = None
+        self._derived_points.clear()
+        self._needs_rebuild = False
+        self._dirty_columns.clear()
+
+    def _update_dirty_columns(self):
+        labels = self.labels
+        cols = self.cols
+
+        # 变化列和左右相邻列中的分量都可能合并或拆分
+        scan_columns = set()
+        for col in self._dirty_columns:
+            for c in (col - 1, col, col + 1):
+                if 0 <= c < cols:
+                    scan_columns.add(c)
+
+        stale = set()
+        cells = []
+        for col in scan_columns:
+            for i in range(col, self.rows * cols, cols):
+                label = labels[i]
+                if label > 0:
+                    stale.add(label)
+                else:
+                    labels[i] = UNLABELED
+                    cells.append(i)
+
+        for label in stale:
+            members = self.members.pop(label)
+            if len(members) >= 2:
+                self._multi_count -= 1
+            for i in members:
+                labels[i] = UNLABELED
+                cells.append(i)
+            del self.label_colors[label]
+            self.colorful_labels.discard(label)
+            self._points.pop(label, None)
+
+        self._label_cells(cells)
+        self._wildcard_groups = None
+        self._derived_points.clear()
+        self._dirty_columns.clear()
+
+    def _label_cells(self, cells: Iterable[int]):
+        """对未标记的格子做同色洪水填充"""
+        grid = self.engine.grid
+        labels = self.labels
+        rows, cols = self.rows, self.cols
+
+        for start in cells:
+            if labels[start] != UNLABELED:
+                continue
+
+            row, col = divmod(start, cols)
+            color = grid[row][col]
+            if color is None:
+                labels[start] = EMPTY
+                continue
+
+            label = self._next_label
+            self._next_label += 1
+            labels[start] = label
+            members = [start]
+            self.members[label] = members
+            self.label_colors[label] = color
+
+            # 彩色色块各自单独成组，连接关系在查询时处理
+            if color == Color.COLORFUL:
+                self.colorful_labels.add(label)
+                continue
+
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                row, col = divmod(i, cols)
+                for j, r, c in ((i - cols, row - 1, col), (i + cols, row + 1, col),
+                                (i - 1, row, col - 1), (i + 1, row, col + 1)):
+                    if (0 <= r < rows and 0 <= c < cols and
+                        labels[j] == UNLABELED and grid[r][c] == color):
+                        labels[j] = label
+                        members.append(j)
+                        stack.append(j)
+
+            if len(members) >= 2:
+                self._multi_count += 1
+
+    def _neighbors(self, i: int) -> List[int]:
+        row, col = divmod(i, self.cols)
+        result = []
+        if row > 0:
+            result.append(i - self.cols)
+        if row < self.rows - 1:
+            result.append(i + self.cols)
+        if col > 0:
+            result.append(i - 1)
+        if col < self.cols - 1:
+            result.append(i + 1)
+        return result
+
+    def _wildcard(self) -> Dict[int, List[int]]:
+        """计算经彩色色块连接后的普通色块组"""
+        if self._wildcard_groups is not None:
+            return self._wildcard_groups
+
+        self._wildcard_groups = {}
+        self._wildcard_roots = {}
+        if not self.colorful_labels:
+            return self._wildcard_groups
+
+        labels = self.labels
+        colorful_cells = {self.members[label][0] for label in self.colorful_labels}
+
+        # 并查集：被同一片彩色色块连接的同色分量合并
+        parent: Dict[int, int] = {}
+
+        def find(label):
+            root = label
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while label != root:
+                parent[label], label = root, parent[label]
+            return root
+
+        attached: List[Tuple[List[int], Set[int]]] = []
+        visited = set()
+        for start in colorful_cells:
+            if start in visited:
+                continue
+
+            # 相邻彩色色块组成一片
+            cluster = [start]
+            visited.add(start)
+            touching = set()
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                for j in self._neighbors(i):
+                    if j in colorful_cells:
+                        if j not in visited:
+                            visited.add(j)
+                            cluster.append(j)
+                            stack.append(j)
+                    elif labels[j] > 0:
+                        touching.add(labels[j])
+
+            by_color: Dict[Color, int] = {}
+            for label in touching:
+                color = self.label_colors[label]
+                if color in by_color:
+                    parent[find(label)] = find(by_color[color])
+                else:
+                    parent.setdefault(label, label)
+                    by_color[color] = label
+            attached.append((cluster, touching))
+
+        # 汇总每个合并集合的成员和连接它们的彩色色块
+        groups: Dict[int, List[int]] = {}
+        for label in parent:
+            groups.setdefault(find(label), []).extend(self.members[label])
+        for cluster, touching in attached:
+            for root in {find(label) for label in touching}:
+                groups[root].extend(cluster)
+
+        for label in parent:
+            root = find(label)
+            self._wildcard_groups[label] = groups[root]
+            self._wildcard_roots[label] = root
+        return self._wildcard_groups
+
+    def _group_indices(self, row: int, col: int) -> List[int]:
+        self.refresh()
+        return self._group_at(row * self.cols + col)
+
+    def _group_at(self, i: int) -> List[int]:
+        label = self.labels[i]
+        if label == EMPTY:
+            return []
+
+        if label not in self.colorful_labels:
+            return self._wildcard().get(label, self.members[label])
+
+        # 彩色色块：自身加相邻色块的同色组
+        seen = {label}
+        result = [i]
+        for j in self._neighbors(i):
+            neighbor = self.labels[j]
+            if neighbor > 0 and neighbor not in seen:
+                seen.add(neighbor)
+                result.extend(self.members[neighbor])
+        return result
+
+    def group(self, row: int, col: int) -> Set[Tuple[int, int]]:
+        """点击该位置会消除的坐标集合"""
+        # 按扁平索引顺序插入，集合的遍历顺序（决定计分颜色和特殊色块位置）只取决于网格内容，
+        # 与分量何时重新标记无关，保证回放可以确定性重现
+        cols = self.cols
+        return {divmod(i, cols) for i in sorted(self._group_indices(row, col))}
+
+    def group_size(self, row: int, col: int) -> int:
+        """点击该位置会消除的色块数量"""
+        return len(self._group_indices(row, col))
+
+    def group_key(self, row: int, col: int) -> Optional[Hashable]:
+        """点击该位置会消除的组的标识，同一组内的位置标识相同（彩色色块各自成组），空位为None
+
+        标识只在网格下一次变化之前有效。
+        """
+        self.refresh()
+        label = self.labels[row * self.cols + col]
+        if label == EMPTY:
+            return None
+        if label in self.colorful_labels:
+            return ('colorful', label)
+        if label in self._wildcard():
+            return ('wildcard', self._wildcard_roots[label])
+        return label
+
+    def group_points(self, row: int, col: int) -> int:
+        """点击该位置能获得的分数（不足2个色块时为0），按组缓存"""
+        key = self.group_key(row, col)
+        if key is None:
+            return 0
+        cache = self._points if isinstance(key, int) else self._derived_points
+        points = cache.get(key)
+        if points is None:
+            group = self._group_at(row * self.cols + col)
+            if len(group) < 2:
+                points = 0
+            elif isinstance(key, int):
+                points = len(group) * ELIMINATION_POINTS.get(self.label_colors[key], NORMAL_POINTS)
+            else:
+                # 含彩色色块的组按实际点击结果计分（计分颜色取决于坐标集合的遍历顺序）
+                points = self.engine.score_cells(self.group(row, col))
+            cache[key] = points
+        return points
+
+    def has_group(self) -> bool:
+        """是否存在至少2个色块的可消除组"""
+        self.refresh()
+        if self._multi_count:
+            return True
+
+        # 彩色色块只要有相邻色块就能消除
+        labels = self.labels
+        for label in self.colorful_labels:
+            if any(labels[j] > 0 for j in self._neighbors(self.members[label][0])):
+                return True
+        return False
+
+    def iter_groups(self, min_size: int = 2) -> Iterator[Tuple[int, List[int], bool]]:
+        """遍历每个不同的可消除组，产出 (可点击的扁平索引, 成员扁平索引, 是否含彩色色块)"""
+        self.refresh()
+        wildcard = self._wildcard()
+        seen_wildcard = set()
+
+        for label, members in self.members.items():
+            if label in self.colorful_labels:
+                group = self._group_at(members[0])
+                mixed = True
+            elif label in wildcard:
+                group = wildcard[label]
+                if id(group) in seen_wildcard:
+                    continue
+                seen_wildcard.add(id(group))
+                mixed = True
+            else:
+                group = members
+                mixed = False
+
+            if len(group) >= min_size:
+                yield members[0], group, mixed
@@ -0,0 +1,510 @@
+"""三消游戏的无界面规则引擎
+
+不依赖pygame，负责网格生成、连通检测、消除计分、特殊色块生成和掉落填充。
+窗口版 MatchThreeGame 包装本引擎，平衡测试和回归测试可以直接使用它。
+"""
+import logging
+import random
+from enum import Enum
+from typing import List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class GameState(Enum):
+    PLAYING = 1
+    FALLING = 2
+    GAME_OVER = 3
+
+
+class Color(Enum):
+    RED = (180, 60, 60)        # 柔和的红色
+    GREEN = (60, 180, 60)      # 柔和的绿色
+    BLUE = (60, 60, 180)       # 柔和的蓝色
+    ORANGE = (255, 165, 80)    # 柔和的橙色 (替换原黄色)
+    PINK = (255, 182, 193)     # 柔和的粉色 (替换原紫色)
+    GOLD = (255, 215, 0)       # 黄金色块 - 特殊奖励色块
+    DIAMOND = (185, 242, 255)  # 钻石色块 - 超级奖励色块（冰蓝钻石色）
+    COLORFUL = (255, 128, 255) # 彩色万能色块 - 可与任何色块消除（粉紫色基调）
+    PEARL = (248, 248, 255)    # 珍珠色块 - 终极奖励色块（珍珠白）
+    BLACK = (0, 0, 0)
+    WHITE = (255, 255, 255)
+    GRAY = (128, 128, 128)
+
+
+# 色块编码表：0 表示空位，其余按 Color 枚举顺序编号（共 13 个编码，可用 4 位保存）
+EMPTY_CODE = 0
+CODE_COLORS = [None] + list(Color)
+COLOR_CODES = {color: code for code, color in enumerate(CODE_COLORS) if color is not None}
+
+# 普通色块和特殊色块
+NORMAL_COLORS = [Color.RED, Color.GREEN, Color.BLUE, Color.ORANGE, Color.PINK]
+SPECIAL_COLORS = [Color.GOLD, Color.DIAMOND, Color.COLORFUL, Color.PEARL]
+
+# 四个方向
+NEIGHBOR_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# 计分表：按消除组中第一个色块的颜色计算每个色块的分数
+NORMAL_POINTS = 10
+HAMMER_POINTS = 50
+ELIMINATION_POINTS = {
+    Color.GOLD: 1000,
+    Color.DIAMOND: 10000,
+    Color.COLORFUL: 5000,
+    Color.PEARL: 15000,
+}
+
+# 特殊色块生成日志中的图标和名称
+SPECIAL_BLOCK_NAMES = {
+    Color.GOLD: ('✨', '黄金色块'),
+    Color.DIAMOND: ('💎', '钻石色块'),
+    Color.COLORFUL: ('🌈', '彩色万能色块'),
+    Color.PEARL: ('🐚', '珍珠色块'),
+}
+
+
+class MatchThreeEngine:
+    """三消规则引擎：点击同步结算，没有动画和定时器"""
+
+    def __init__(self, grid_size: int = 10, colors: Optional[List[Color]] = None,
+                 seed: Optional[int] = None, rng: Optional[random.Random] = None,
+                 hammer_count: int = 3, compact: bool = False, placement_rules=None):
+        self.GRID_SIZE = grid_size
+        self.COLORS = list(colors) if colors else list(NORMAL_COLORS)
+        self.INITIAL_HAMMER_COUNT = hammer_count
+
+        # 可注入的随机数生成器，保证相同种子得到相同对局
+        self.rng = rng if rng is not None else random.Random(seed)
+
+        # 紧凑模式使用uint8数组网格（需要numpy），掉落和填充按列批量计算
+        self.compact = compact
+        if compact:
+            import numpy as np
+            from match_three_array import CompactGrid, encode_colors
+            self.grid = CompactGrid(self.GRID_SIZE, self.GRID_SIZE)
+            self.np_rng = np.random.default_rng(self.rng.getrandbits(64))
+            self.palette_codes = encode_colors(self.COLORS)
+        else:
+            self.grid = [[None for _ in range(self.GRID_SIZE)] for _ in range(self.GRID_SIZE)]
+        self.score = 0
+        self.eliminated_count = 0
+        self.hammer_count = hammer_count
+
+        # 有空位等待掉落的列：掉落和填充只处理这些列，耗时与受影响的列数成正比而不是整盘面积
+        self.hole_columns: Set[int] = set()
+
+        # 可选的二进制事件日志（match_three_journal.EventJournal）
+        self.journal = None
+        # 可选的撤销/重做栈（match_three_undo.UndoHistory），修改网格前由引擎通知
+        self.history = None
+
+        # 连通分量索引：点击结算和连通组大小查询直接查表
+        from match_three_components import ComponentIndex
+        self.components = ComponentIndex(self)
+
+        # 特殊色块放置：预计算的8邻域表 + 放置规则（特殊色块 -> 可替换的颜色）
+        from match_three_placement import SpecialPlacer
+        self.placer = SpecialPlacer(self.GRID_SIZE, self.GRID_SIZE, placement_rules)
+
+        self.generate_grid()
+
+    def snapshot(self) -> dict:
+        """可序列化的对局状态（网格颜色编码、分数和道具），用于跨进程复制引擎"""
+        return {
+            'grid_size': self.GRID_SIZE,
+            'colors': [COLOR_CODES[color] for color in self.COLORS],
+            'codes': [[COLOR_CODES[color] if color is not None else EMPTY_CODE for color in row]
+                      for row in self.grid],
+            'score': self.score,
+            'eliminated_count': self.eliminated_count,
+            'hammer_count': self.hammer_count,
+            'initial_hammer_count': self.INITIAL_HAMMER_COUNT,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict, seed: Optional[int] = None,
+                      compact: bool = False) -> 'MatchThreeEngine':
+        """按 snapshot() 的状态创建引擎，之后的新色块由 seed 决定"""
+        engine = cls(snapshot['grid_size'], [CODE_COLORS[code] for code in snapshot['colors']],
+                     seed=seed, hammer_count=snapshot['initial_hammer_count'], compact=compact)
+        for row, codes in enumerate(snapshot['codes']):
+            for col, code in enumerate(codes):
+                engine.grid[row][col] = CODE_COLORS[code]
+                if code == EMPTY_CODE:
+                    engine.hole_columns.add(col)
+        engine.components.invalidate_all()
+        engine.score = snapshot['score']
+        engine.eliminated_count = snapshot['eliminated_count']
+        engine.hammer_count = snapshot['hammer_count']
+        return engine
+
+    def reset(self):
+        """重置网格、分数和道具"""
+        self.generate_grid()
+        self.score = 0
+        self.eliminated_count = 0
+        self.hammer_count = self.INITIAL_HAMMER_COUNT
+
+    def generate_grid(self):
+        """生成随机的色块网格"""
+        if self.compact:
+            self.grid.fill_random(self.np_rng, self.palette_codes)
+        else:
+            for row in range(self.GRID_SIZE):
+                for col in range(self.GRID_SIZE):
+                    self.grid[row][col] = self.rng.choice(self.COLORS)
+
+        self.hole_columns.clear()
+        self.components.invalidate_all()
+        if self.history is not None:
+            self.history.clear()
+        self.journal_new_grid()
+        logger.info("生成了新的游戏网格")
+
+    def load_board(self, codes: Sequence[int], seed: int, score: int = 0):
+        """用给定的棋盘（行优先的颜色编码）开始新对局，之后的新色块由 seed 决定"""
+        size = self.GRID_SIZE
+        if len(codes) != size * size:
+            raise ValueError(f"棋盘应有 {size * size} 个格子，实际 {len(codes)} 个")
+        self.rng.seed(seed)
+        if self.compact:
+            import numpy as np
+            self.np_rng = np.random.default_rng(self.rng.getrandbits(64))
+            self.grid.codes[:] = np.asarray(codes, dtype=np.uint8).reshape(size, size)
+        else:
+            for row in range(size):
+                self.grid[row][:] = [CODE_COLORS[code] for code in codes[row * size:(row + 1) * size]]
+
+        self.hole_columns = {i % size for i, code in enumerate(codes) if code == EMPTY_CODE}
+        self.score = score
+        self.eliminated_count = 0
+        self.hammer_count = self.INITIAL_HAMMER_COUNT
+        self.components.invalidate_all()
+        if self.history is not None:
+            self.history.clear()
+        self.journal_new_grid()
+        logger.info(f"载入棋盘，种子 {seed}")
+
+    def journal_new_grid(self):
+        """把整盘网格写入事件日志"""
+        if self.journal is not None:
+            self.journal.new_grid([[COLOR_CODES[color] if color is not None else EMPTY_CODE
+                                    for color in row] for row in self.grid])
+
+    def find_connected_cells(self, start_row: int, start_col: int) -> Set[Tuple[int, int]]:
+        """找到与起始位置连接的同色块（查连通分量索引）"""
+        return self.components.group(start_row, start_col)
+
+    def group_size(self, row: int, col: int) -> int:
+        """点击该位置会消除的色块数量"""
+        return self.components.group_size(row, col)
+
+    def group_key(self, row: int, col: int):
+        """点击该位置会消除的组的标识（下一次网格变化前有效），空位为None"""
+        return self.components.group_key(row, col)
+
+    def group_points(self, row: int, col: int) -> int:
+        """点击该位置能获得的分数，不能消除时为0"""
+        return self.components.group_points(row, col)
+
+    def flood_fill_connected_cells(self, start_row: int, start_col: int) -> Set[Tuple[int, int]]:
+        """用洪水填充找到与起始位置连接的同色块（彩色色块有特殊处理）"""
+        if self.grid[start_row][start_col] is None:
+            return set()
+
+        start_color = self.grid[start_row][start_col]
+        connected = set()
+        to_check = [(start_row, start_col)]
+
+        # 如果起始是彩色色块，使用特殊逻辑
+        if start_color == Color.COLORFUL:
+            return self.find_colorful_connected_cells(start_row, start_col)
+
+        while to_check:
+            row, col = to_check.pop()
+            if (row, col) in connected:
+                continue
+
+            if (0 <= row < self.GRID_SIZE and 0 <= col < self.GRID_SIZE and
+                self.grid[row][col] is not None):
+
+                current_color = self.grid[row][col]
+
+                # 普通色块连接逻辑：相同颜色或包含彩色色块
+                can_connect = (
+                    current_color == start_color or  # 相同颜色
+                    current_color == Color.COLORFUL   # 当前是彩色色块
+                )
+
+                if can_connect:
+                    connected.add((row, col))
+
+                    # 检查四个方向
+                    for dr, dc in NEIGHBOR_OFFSETS:
+                        new_row, new_col = row + dr, col + dc
+                        if (new_row, new_col) not in connected:
+                            to_check.append((new_row, new_col))
+
+        return connected
+
+    def find_colorful_connected_cells(self, start_row: int, start_col: int) -> Set[Tuple[int, int]]:
+        """找到彩色色块的连接组合（只连接直接相邻的同色块）"""
+        connected = {(start_row, start_col)}  # 包含彩色色块本身
+
+        # 检查四个方向的直接相邻色块
+        for dr, dc in NEIGHBOR_OFFSETS:
+            new_row, new_col = start_row + dr, start_col + dc
+            if (0 <= new_row < self.GRID_SIZE and 0 <= new_col < self.GRID_SIZE and
+                self.grid[new_row][new_col] is not None):
+
+                adjacent_color = self.grid[new_row][new_col]
+
+                # 收集相邻的同色块组
+                same_color_group = self.find_same_color_group(new_row, new_col, adjacent_color)
+                connected.update(same_color_group)
+
+        return connected
+
+    def find_same_color_group(self, start_row: int, start_col: int, target_color) -> Set[Tuple[int, int]]:
+        """找到指定颜色的连接组"""
+        if target_color == Color.COLORFUL:
+            return {(start_row, start_col)}  # 彩色色块不再递归连接
+
+        connected = set()
+        to_check = [(start_row, start_col)]
+
+        while to_check:
+            row, col = to_check.pop()
+            if (row, col) in connected:
+                continue
+
+            if (0 <= row < self.GRID_SIZE and 0 <= col < self.GRID_SIZE and
+                self.grid[row][col] == target_color):
+
+                connected.add((row, col))
+
+                # 检查四个方向
+                for dr, dc in NEIGHBOR_OFFSETS:
+                    new_row, new_col = row + dr, col + dc
+                    if (new_row, new_col) not in connected:
+                        to_check.append((new_row, new_col))
+
+        return connected
+
+    def click(self, row: int, col: int) -> Set[Tuple[int, int]]:
+        """同步处理一次点击：消除并立即完成掉落，返回被消除的坐标"""
+        if self.journal is not None:
+            self.journal.click(row, col)
+
+        connected = self.find_connected_cells(row, col)
+        if len(connected) < 2:
+            return set()
+
+        self.eliminate_cells(connected)
+        self.settle()
+        return connected
+
+    def score_cells(self, cells: Set[Tuple[int, int]]) -> int:
+        """按 eliminate_cells 的计分规则计算消除这些色块能获得的分数"""
+        for row, col in cells:
+            return len(cells) * ELIMINATION_POINTS.get(self.grid[row][col], NORMAL_POINTS)
+        return 0
+
+    def has_moves(self) -> bool:
+        """是否还有至少2个色块的可消除组"""
+        return self.components.has_group()
+
+    def find_best_move(self) -> Optional[Tuple[int, int, int]]:
+        """找到得分最高的点击，返回 (行, 列, 分数)，没有可消除的组时返回None"""
+        best = None
+        cols = self.GRID_SIZE
+        for i, group, mixed in self.components.iter_groups():
+            row, col = divmod(i, cols)
+            if mixed:
+                # 含彩色色块的组按实际点击结果计分
+                points = self.score_cells(self.find_connected_cells(row, col))
+            else:
+                points = len(group) * ELIMINATION_POINTS.get(self.grid[row][col], NORMAL_POINTS)
+            if best is None or points > best[2]:
+                best = (row, col, points)
+        return best
+
+    def use_hammer(self, row: int, col: int) -> Optional[Color]:
+        """使用锤子消除单个色块（不含掉落），返回被敲碎的颜色"""
+        if self.hammer_count <= 0 or self.grid[row][col] is None:
+            return None
+
+        eliminated_color = self.grid[row][col]
+        if self.history is not None:
+            self.history.touch(row, col)
+        self.grid[row][col] = None
+        self.hole_columns.add(col)
+        self.components.invalidate_columns((col,))
+
+        # 锤子消除获得50分
+        points = HAMMER_POINTS
+        self.score += points
+        self.eliminated_count += 1
+        self.hammer_count -= 1
+
+        logger.debug("🔨 使用锤子消除坐标 (%d, %d) 的 %s 色块，获得 %d 分，剩余锤子: %d",
+                     row, col, eliminated_color.name, points, self.hammer_count)
+        if self.journal is not None:
+            self.journal.hammer(row, col, eliminated_color)
+        return eliminated_color
+
+    def eliminate_cells(self, cells: Set[Tuple[int, int]]) -> int:
+        """消除指定的色块并生成特殊色块（不含掉落），返回获得的分数"""
+        eliminated_color = None
+        is_gold_elimination = False
+        is_diamond_elimination = False
+        is_colorful_elimination = False
+        is_pearl_elimination = False
+        if self.history is not None:
+            self.history.touch_cells(cells)
+
+        for row, col in cells:
+            if eliminated_color is None:
+                eliminated_color = self.grid[row][col]
+
+            # 检查是否是特殊色块
+            if self.grid[row][col] == Color.GOLD:
+                is_gold_elimination = True
+            elif self.grid[row][col] == Color.DIAMOND:
+                is_diamond_elimination = True
+            elif self.grid[row][col] == Color.COLORFUL:
+                is_colorful_elimination = True
+            elif self.grid[row][col] == Color.PEARL:
+                is_pearl_elimination = True
+
+            # 清除色块
+            self.grid[row][col] = None
+
+        columns = {col for _, col in cells}
+        self.hole_columns.update(columns)
+        self.components.invalidate_columns(columns)
+
+        # 更新分数和统计
+        if is_pearl_elimination and eliminated_color == Color.PEARL:
+            # 珍珠色块消除，给予终极奖励
+            points = len(cells) * ELIMINATION_POINTS[Color.PEARL]
+            logger.debug("🐚 消除了 %d 个珍珠色块，获得 %d 分！！！！", len(cells), points)
+        elif is_colorful_elimination and eliminated_color == Color.COLORFUL:
+            # 彩色色块消除，给予特殊奖励
+            points = len(cells) * ELIMINATION_POINTS[Color.COLORFUL]  # 彩色色块本身的价值
+            logger.debug("🌈 消除了 %d 个彩色色块，获得 %d 分！！", len(cells), points)
+        elif is_diamond_elimination and eliminated_color == Color.DIAMOND:
+            # 钻石色块消除，给予超级奖励
+            points = len(cells) * ELIMINATION_POINTS[Color.DIAMOND]
+            logger.debug("💎 消除了 %d 个钻石色块，获得 %d 分！！！", len(cells), points)
+        elif is_gold_elimination and eliminated_color == Color.GOLD:
+            # 黄金色块消除，给予特殊奖励
+            points = len(cells) * ELIMINATION_POINTS[Color.GOLD]
+            logger.debug("🌟 消除了 %d 个黄金色块，获得 %d 分！", len(cells), points)
+        else:
+            # 普通色块消除
+            points = len(cells) * NORMAL_POINTS
+            logger.debug("消除了 %d 个 %s 色块，获得 %d 分", len(cells), eliminated_color.name, points)
+
+        self.score += points
+        self.eliminated_count += len(cells)
+        if self.journal is not None:
+            self.journal.eliminate(eliminated_color, points, cells)
+
+        # 生成特殊色块的逻辑
+        if is_colorful_elimination:
+            # 彩色色块消除后生成珍珠色块
+            self.generate_special_block_near(cells, Color.PEARL)
+        elif is_diamond_elimination and len(cells) >= 3:
+            # 3个或以上钻石消除后生成彩色色块
+            self.generate_special_block_near(cells, Color.COLORFUL)
+            logger.debug("✨ 特殊触发：%d个钻石连消，生成彩色万能色块！", len(cells))
+        elif is_gold_elimination:
+            # 黄金色块消除后生成钻石色块
+            self.generate_special_block_near(cells, Color.DIAMOND)
+        elif not (is_diamond_elimination or is_pearl_elimination):
+            # 普通色块消除后生成黄金色块（钻石单独消除和珍珠消除后不生成新色块）
+            self.generate_special_block_near(cells, Color.GOLD)
+
+        return points
+
+    def generate_special_block_near(self, eliminated_cells: Set[Tuple[int, int]],
+                                    special: Color) -> Optional[Tuple[int, int]]:
+        """在消除区域附近按放置规则随机替换一个色块为特殊色块，返回生成位置"""
+        if not eliminated_cells:
+            return None
+
+        icon, name = SPECIAL_BLOCK_NAMES[special]
+        candidates = self.placer.candidates(self.grid, eliminated_cells, special)
+        if not candidates:
+            logger.debug("⚠️ 没有合适的位置生成%s（附近都是特殊色块）", name)
+            return None
+
+        target_row, target_col = divmod(self.rng.choice(candidates), self.GRID_SIZE)
+        old_color = self.grid[target_row][target_col]
+        if self.history is not None:
+            self.history.touch(target_row, target_col)
+        self.grid[target_row][target_col] = special
+        self.components.invalidate_columns((target_col,))
+        if self.journal is not None:
+            self.journal.special(target_row, target_col, special, old_color)
+        logger.debug("%s 在位置 (%d, %d) 生成%s (原色块: %s)", icon, target_row, target_col, name,
+                     old_color.name if old_color else 'None')
+        return target_row, target_col
+
+    def settle(self) -> List[int]:
+        """让有空位的列掉落并从上方填充新色块，返回发生变化的列"""
+        columns = sorted(self.hole_columns)
+        self.hole_columns.clear()
+        if self.history is not None:
+            self.history.touch_columns(columns)
+        if self.compact:
+            changed, fill_counts = self.grid.settle(self.np_rng, self.palette_codes, columns)
+            changed_columns = changed.tolist()
+            self.components.invalidate_columns(changed_columns)
+            if self.journal is not None:
+                for col, count in zip(changed_columns, fill_counts.tolist()):
+                    self.journal.spawn(col, self.grid.codes[:count, col].tolist())
+            if changed_columns:
+                logger.debug("在 %d 列中填充了 %d 个新色块", len(changed_columns), int(fill_counts.sum()))
+            if self.history is not None:
+                self.history.commit()
+            return changed_columns
+
+        changed_columns = []
+        spawned = 0
+
+        # 只处理有空位的列
+        for col in columns:
+            # 收集非空色块
+            non_empty = []
+            empty_count = 0
+
+            for row in range(self.GRID_SIZE - 1, -1, -1):  # 从底部向上
+                if self.grid[row][col] is not None:
+                    non_empty.append(self.grid[row][col])
+                else:
+                    empty_count += 1
+                self.grid[row][col] = None
+
+            # 重新放置现有色块
+            for i, color in enumerate(non_empty):
+                target_row = self.GRID_SIZE - 1 - i
+                self.grid[target_row][col] = color
+
+            # 默认自动填充新色块，从上方掉落新色块填满网格
+            if empty_count > 0:
+                changed_columns.append(col)
+                spawned += empty_count
+                for i in range(empty_count):
+                    new_row = empty_count - 1 - i
+                    self.grid[new_row][col] = self.rng.choice(self.COLORS)
+                if self.journal is not None:
+                    self.journal.spawn(col, [COLOR_CODES[self.grid[row][col]] for row in range(empty_count)])
+
+        self.components.invalidate_columns(changed_columns)
+        if changed_columns:
+            logger.debug("在 %d 列中填充了 %d 个新色块", len(changed_columns), spawned)
+        if self.history is not None:
+            self.history.commit()  # 一步在掉落填充后结束
+        return changed_columns
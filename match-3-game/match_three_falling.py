@@ -0,0 +1,96 @@
+"""三消掉落动画
+
+消除后引擎立即完成掉落和填充，动画只负责显示。一列中掉落的色块按掉落距离分段：同一段的色块
+掉落行数相同（段与段之间隔着被消除的空位，最上面一段包括新填充的色块）。每段在掉落开始时预渲染
+成一张竖条表面，之后每帧只按匀加速运动算出竖条的位置并 blit 一次，每帧开销与竖条数量成正比，
+与下落的色块数量无关。
+"""
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pygame
+
+FALL_ACCELERATION = 50.0  # 下落加速度（单元格/秒²）
+
+
+def fall_runs(holes: List[int], rows: int) -> List[Tuple[int, int, int]]:
+    """一列掉落后的分段 (落地后的首行, 末行, 掉落行数)，holes 是掉落前空位的行号（升序）"""
+    runs = []
+    lower = rows
+    for below, hole in enumerate(reversed(holes)):
+        # 这个空位和下面一个空位之间的色块，下方有 below 个空位
+        if below and hole + 1 < lower:
+            runs.append((hole + 1 + below, lower - 1 + below, below))
+        lower = hole
+    # 最上面一个空位以上的色块和新填充的色块一起掉落
+    if holes:
+        runs.append((0, lower - 1 + len(holes), len(holes)))
+    return runs
+
+
+class FallAnimation:
+    """一次掉落的竖条动画，竖条位置按整个棋盘的像素坐标保存，绘制时加上视口偏移"""
+
+    def __init__(self, acceleration: float = FALL_ACCELERATION):
+        self.acceleration = acceleration
+        self.strips: List[Tuple[pygame.Surface, int, int, int]] = []  # (竖条, 落地后的x, 落地后的y, 掉落像素)
+        self.columns: Dict[int, int] = {}  # 列 -> 被竖条覆盖的最后一行，这一行及以上不按单元格绘制
+        self.step = 1
+        self.start_ms = 0
+        self.duration_ms = 0
+
+    def __len__(self) -> int:
+        return len(self.strips)
+
+    def start(self, runs: Dict[int, List[Tuple[int, int, int]]], visible_rows: Tuple[int, int],
+              step: int, margin: int, render_strip: Callable[[int, int, int], pygame.Surface], now: int):
+        """为每段在视口内会出现的部分渲染竖条，动画时长取最长的掉落距离"""
+        self.clear()
+        self.step = step
+        first_visible, last_visible = visible_rows
+        longest = 0
+        for col, col_runs in runs.items():
+            for first, last, drop in col_runs:
+                # 掉落路径 [行 - drop, 行] 与可见行相交的色块
+                first = max(first, first_visible)
+                last = min(last, last_visible + drop)
+                if first > last:
+                    continue
+                self.strips.append((render_strip(col, first, last), col * step + margin,
+                                    first * step + margin, drop * step))
+                self.columns[col] = max(self.columns.get(col, -1), last)
+                longest = max(longest, drop)
+        self.start_ms = now
+        self.duration_ms = math.ceil(1000 * math.sqrt(2 * longest / self.acceleration))
+
+    def clear(self):
+        self.strips.clear()
+        self.columns.clear()
+        self.duration_ms = 0
+
+    def finished(self, now: int) -> bool:
+        return now - self.start_ms >= self.duration_ms
+
+    def remaining(self, drop: int, now: int) -> int:
+        """竖条离落地位置还差的像素"""
+        elapsed = (now - self.start_ms) / 1000
+        fallen = 0.5 * self.acceleration * self.step * elapsed * elapsed
+        return max(0, drop - int(fallen))
+
+    def regions(self, dx: int, dy: int) -> List[pygame.Rect]:
+        """每列竖条整个掉落路径覆盖的屏幕区域"""
+        bounds = {}
+        for strip, x, y, drop in self.strips:
+            rect = pygame.Rect(x + dx, y + dy - drop, strip.get_width(), strip.get_height() + drop)
+            bounds[x] = bounds[x].union(rect) if x in bounds else rect
+        return list(bounds.values())
+
+    def draw(self, surface: pygame.Surface, dx: int, dy: int, now: int, region: Optional[pygame.Rect] = None):
+        """按当前时间绘制所有竖条（指定区域时跳过与该区域不相交的竖条）"""
+        blits = []
+        for strip, x, y, drop in self.strips:
+            dest = (x + dx, y + dy - self.remaining(drop, now))
+            if region is not None and not region.colliderect(dest, strip.get_size()):
+                continue
+            blits.append((strip, dest))
+        surface.blits(blits, doreturn=False)
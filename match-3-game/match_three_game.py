@@ -1,11 +1,18 @@
 import pygame
-import random
+import argparse
 import logging
+import math
+import random
 import sys
-from enum import Enum
+from collections import deque
 from typing import List, Tuple, Set
 import time
 
+from match_three_engine import HAMMER_POINTS, Color, GameState, MatchThreeEngine
+from match_three_falling import FallAnimation, fall_runs
+from match_three_particles import ParticlePool
+from match_three_undo import UndoHistory
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -17,77 +24,130 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class GameState(Enum):
-    PLAYING = 1
-    FALLING = 2
-    GAME_OVER = 3
+# 特殊色块效果图集：颜色 -> (循环长度的动画帧数, 每个循环内的闪光周期数, 每张图集帧持续的动画帧数)
+# 循环长度取各效果旋转/换色周期的公倍数，闪光频率取最接近原频率的整周期，保证无缝循环；
+# 图集只按步长采样渲染 循环长度 / 步长 张帧（共294张），相邻采样之间沿用上一张
+EFFECT_LOOPS = {
+    Color.GOLD: (63, 1, 3),        # 闪光频率约0.1，21张
+    Color.DIAMOND: (180, 4, 4),    # 切面每帧旋转2度；闪光频率约0.14，45张
+    Color.COLORFUL: (840, 27, 5),  # 漩涡每帧旋转3度、每5帧换色，边框每10帧换色；闪光频率约0.2，168张
+    Color.PEARL: (240, 3, 4),      # 三道高光每帧移动2度；闪光频率约0.08，60张
+}
+EFFECT_PADDING = 16  # 效果帧四周为光晕和星光预留的像素
 
-class Color(Enum):
-    RED = (180, 60, 60)        # 柔和的红色
-    GREEN = (60, 180, 60)      # 柔和的绿色
-    BLUE = (60, 60, 180)       # 柔和的蓝色
-    ORANGE = (255, 165, 80)    # 柔和的橙色 (替换原黄色)
-    PINK = (255, 182, 193)     # 柔和的粉色 (替换原紫色)
-    GOLD = (255, 215, 0)       # 黄金色块 - 特殊奖励色块
-    DIAMOND = (185, 242, 255)  # 钻石色块 - 超级奖励色块（冰蓝钻石色）
-    COLORFUL = (255, 128, 255) # 彩色万能色块 - 可与任何色块消除（粉紫色基调）
-    PEARL = (248, 248, 255)    # 珍珠色块 - 终极奖励色块（珍珠白）
-    BLACK = (0, 0, 0)
-    WHITE = (255, 255, 255)
-    GRAY = (128, 128, 128)
+def effect_frame_index(color: Color, animation_clock: int) -> int:
+    """共享动画时钟对应的效果图集帧序号"""
+    loop_length, _, step = EFFECT_LOOPS[color]
+    return animation_clock % loop_length // step
 
 class MatchThreeGame:
-    def __init__(self):
+    def __init__(self, seed=None, journal_path=None, replay_path=None, bot=None, grid_size=10, boards_path=None):
         pygame.init()
         
+        # 可选的棋盘库（match_three_boards）：开局和重开时依次载入库中的棋盘，棋盘尺寸由库决定
+        self.boards = None
+        self.board_index = 0
+        if boards_path:
+            from match_three_boards import BoardCorpus
+            self.boards = BoardCorpus(boards_path)
+            if self.boards.rows != self.boards.cols or not len(self.boards):
+                raise ValueError(f"棋盘库 {boards_path} 需要至少一个正方形棋盘")
+            grid_size = self.boards.rows
+            logger.info(f"棋盘库: {boards_path}，共 {len(self.boards)} 个 {grid_size}x{grid_size} 棋盘")
+        
         # 游戏配置
-        self.GRID_SIZE = 10
+        self.GRID_SIZE = grid_size
         self.CELL_SIZE = 60
         self.GRID_MARGIN = 5
         self.COLORS = [Color.RED, Color.GREEN, Color.BLUE, Color.ORANGE, Color.PINK]
         
+        # 视口：棋盘区域固定显示 VIEW_CELLS x VIEW_CELLS 个默认大小的单元格，大棋盘可以滚动和缩放
+        self.VIEW_CELLS = 10
+        self.MIN_CELL_SIZE = 20
+        self.MAX_CELL_SIZE = 60
+        self.BOARD_PIXELS = self.VIEW_CELLS * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN
+        self.view_x = 0  # 视口左上角在整个棋盘中的像素位置
+        self.view_y = 0
+        self.SCROLL_KEYS = {
+            pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0),
+            pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1),
+        }
+        
         # 窗口设置
-        self.WINDOW_WIDTH = self.GRID_SIZE * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN
+        self.WINDOW_WIDTH = self.BOARD_PIXELS
         self.SCORE_HEIGHT = 80  # 上方计分区域高度
         self.TOOL_HEIGHT = 100  # 下方道具区域高度
-        self.WINDOW_HEIGHT = self.WINDOW_WIDTH + self.SCORE_HEIGHT + self.TOOL_HEIGHT
+        self.WINDOW_HEIGHT = self.BOARD_PIXELS + self.SCORE_HEIGHT + self.TOOL_HEIGHT
         
         self.screen = pygame.display.set_mode((self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
         pygame.display.set_caption("三消游戏")
         
-        # 游戏状态
+        # 游戏状态（网格、分数和锤子数量由规则引擎维护）
         self.state = GameState.PLAYING
-        self.grid = [[None for _ in range(self.GRID_SIZE)] for _ in range(self.GRID_SIZE)]
+        # 记录回放时需要确定的种子，结束时把种子和操作序列追加到回放库
+        self.replay = None
+        self.replay_path = replay_path
+        if replay_path and seed is None:
+            seed = random.randrange(2 ** 32)
+        self.engine = MatchThreeEngine(self.GRID_SIZE, self.COLORS, seed=seed)
+        if replay_path:
+            from match_three_replay import Replay
+            self.replay = Replay.for_engine(self.engine, seed)
+        
+        # 多级撤销/重做：只保存每步改动的格子和随机数状态，总大小受预算限制
+        self.history = UndoHistory(self.engine)
+        if self.boards is not None:
+            self.load_next_board()
+        
+        # 可选的二进制事件日志，由后台线程写入
+        if journal_path:
+            from match_three_journal import EventJournal
+            self.engine.journal = EventJournal(journal_path)
+            self.engine.journal_new_grid()
+            logger.info(f"事件日志写入: {journal_path}")
         self.selected_cells = set()
-        self.score = 0
-        self.eliminated_count = 0
+        self.hint_cells = set()  # 提示的最佳消除组
+        self.no_moves = False    # 棋盘上没有可消除的组
         
-        # 动画相关
-        self.falling_cells = []
-        self.elimination_effects = []
-        self.fall_speed = 2
-        
-        # 黄金色块闪光动画
-        self.gold_animation_timer = 0
-        self.gold_glow_intensity = 0
+        # 悬停预览：鼠标所在位置点击会消除的组和能获得的分数，换到另一个组时才重新取组内坐标
+        self.hover_pos = None
+        self.hover_key = None
+        self.hover_cells = set()
+        self.hover_points = 0
         
-        # 钻石色块闪光动画
-        self.diamond_animation_timer = 0
-        self.diamond_glow_intensity = 0
+        # 动画相关
+        self.falling = FallAnimation()  # 掉落动画：每段掉落的色块是一张预渲染竖条
+        self.elimination_effects = ParticlePool()  # 消除效果粒子池（预缩放、预淡出的精灵）
         
-        # 彩色色块闪光动画
-        self.colorful_animation_timer = 0
-        self.colorful_glow_intensity = 0
+        # 掉落期间的点击先排队，落地后按掉落完成的棋盘依次处理
+        self.INPUT_BUFFER_SIZE = 8
+        self.pending_clicks = deque(maxlen=self.INPUT_BUFFER_SIZE)
         
-        # 珍珠色块闪光动画
-        self.pearl_animation_timer = 0
-        self.pearl_glow_intensity = 0
+        # 特殊色块动画：共享时钟 + 按需渲染的循环效果图集
+        self.animation_clock = 0
+        self.effect_atlas = {}  # 颜色 -> 效果帧列表
+        self.effect_atlas_size = self.CELL_SIZE
         
         # 道具系统
-        self.hammer_count = 3  # 锤子道具数量
         self.is_hammer_mode = False  # 是否处于锤子使用模式
         self.hammer_cursor = None  # 锤子鼠标指针
         
+        # 脏矩形渲染：只重绘变化的单元格、动画中的特殊色块、消除效果和UI
+        self.use_dirty_rects = True
+        self.MAX_DIRTY_RECTS = 60
+        self.full_redraw = True
+        
+        # 自动游玩机器人（match_three_bot），每帧不阻塞地推进思考
+        self.bot = bot
+        
+        # 空闲降频：画面静止时阻塞等待事件，失去焦点时暂停渲染
+        self.IDLE_WAIT_MS = 1000
+        self.window_active = True
+        
+        # 色块图块缓存：(颜色, 单元格大小) -> 预渲染表面
+        self.tile_cache = {}
+        self.tile_cache_size = self.CELL_SIZE
+        
         # 字体设置 - 尝试使用系统中文字体
         try:
             # 尝试使用系统中文字体
@@ -100,15 +160,32 @@ class MatchThreeGame:
                 # 最后使用默认字体
                 self.font = pygame.font.Font(None, 36)
         
-        # 初始化游戏网格
-        self.generate_grid()
-        
         # 设置自定义鼠标指针
         self.create_finger_cursor()
         self.create_hammer_cursor()
         
         logger.info("游戏初始化完成")
     
+    @property
+    def grid(self):
+        return self.engine.grid
+    
+    @property
+    def score(self) -> int:
+        return self.engine.score
+    
+    @property
+    def eliminated_count(self) -> int:
+        return self.engine.eliminated_count
+    
+    @property
+    def hammer_count(self) -> int:
+        return self.engine.hammer_count
+    
+    @hammer_count.setter
+    def hammer_count(self, value: int):
+        self.engine.hammer_count = value
+    
     def create_finger_cursor(self):
         """创建自定义大尺寸鼠标指针"""
         # 创建一个比普通鼠标稍大的指针图案 (28x36像素)
@@ -209,120 +286,116 @@ class MatchThreeGame:
         logger.info("已创建锤子鼠标指针")
     
     def generate_grid(self):
-        """生成随机的10x10色块网格"""
-        for row in range(self.GRID_SIZE):
-            for col in range(self.GRID_SIZE):
-                self.grid[row][col] = random.choice(self.COLORS)
-        logger.info("生成了新的游戏网格")
+        """生成随机的色块网格"""
+        self.engine.generate_grid()
     
     def get_cell_at_pos(self, pos: Tuple[int, int]) -> Tuple[int, int]:
-        """根据鼠标位置获取网格坐标"""
+        """根据鼠标位置获取网格坐标（只命中视口内可见的单元格）"""
         x, y = pos
-        # 网格开始位置需要考虑上方计分区域
-        grid_start_y = self.SCORE_HEIGHT
+        if not self.board_rect().collidepoint(x, y):
+            return None, None
         
-        if x < self.GRID_MARGIN or y < grid_start_y + self.GRID_MARGIN:
+        # 换算到整个棋盘的像素坐标，网格开始位置需要考虑上方计分区域
+        step = self.CELL_SIZE + self.GRID_MARGIN
+        board_x = x + self.view_x - self.GRID_MARGIN
+        board_y = y - self.SCORE_HEIGHT + self.view_y - self.GRID_MARGIN
+        if board_x < 0 or board_y < 0:
             return None, None
         
-        col = (x - self.GRID_MARGIN) // (self.CELL_SIZE + self.GRID_MARGIN)
-        row = (y - grid_start_y - self.GRID_MARGIN) // (self.CELL_SIZE + self.GRID_MARGIN)
+        col, col_offset = divmod(board_x, step)
+        row, row_offset = divmod(board_y, step)
+        if col_offset >= self.CELL_SIZE or row_offset >= self.CELL_SIZE:
+            return None, None  # 点在单元格之间的间隙上
         
         if 0 <= row < self.GRID_SIZE and 0 <= col < self.GRID_SIZE:
             return row, col
         return None, None
     
     def get_cell_rect(self, row: int, col: int) -> pygame.Rect:
-        """获取网格单元的矩形区域"""
-        x = col * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN
-        y = row * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN + self.SCORE_HEIGHT
+        """获取网格单元在屏幕上的矩形区域（随视口滚动）"""
+        x = col * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN - self.view_x
+        y = row * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN + self.SCORE_HEIGHT - self.view_y
         return pygame.Rect(x, y, self.CELL_SIZE, self.CELL_SIZE)
     
-    def find_connected_cells(self, start_row: int, start_col: int) -> Set[Tuple[int, int]]:
-        """找到与起始位置连接的同色块（彩色色块有特殊处理）"""
-        if self.grid[start_row][start_col] is None:
-            return set()
-        
-        start_color = self.grid[start_row][start_col]
-        connected = set()
-        to_check = [(start_row, start_col)]
-        
-        # 如果起始是彩色色块，使用特殊逻辑
-        if start_color == Color.COLORFUL:
-            return self.find_colorful_connected_cells(start_row, start_col)
+    def board_rect(self) -> pygame.Rect:
+        """屏幕上的棋盘视口区域"""
+        return pygame.Rect(0, self.SCORE_HEIGHT, self.BOARD_PIXELS, self.BOARD_PIXELS)
+    
+    def visible_range(self) -> Tuple[int, int, int, int]:
+        """视口内可见的单元格范围 (首行, 末行, 首列, 末列)，包含两端"""
+        step = self.CELL_SIZE + self.GRID_MARGIN
+        first_row = max(0, self.view_y // step)
+        last_row = min(self.GRID_SIZE - 1, (self.view_y + self.BOARD_PIXELS) // step)
+        first_col = max(0, self.view_x // step)
+        last_col = min(self.GRID_SIZE - 1, (self.view_x + self.BOARD_PIXELS) // step)
+        return first_row, last_row, first_col, last_col
+    
+    def visible_cells(self):
+        """遍历视口内可见的单元格坐标"""
+        first_row, last_row, first_col, last_col = self.visible_range()
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                yield row, col
+    
+    def scroll_view(self, dx: int, dy: int):
+        """滚动视口（像素），限制在棋盘范围内"""
+        step = self.CELL_SIZE + self.GRID_MARGIN
+        max_offset = max(0, self.GRID_SIZE * step + self.GRID_MARGIN - self.BOARD_PIXELS)
+        view_x = min(max(self.view_x + dx, 0), max_offset)
+        view_y = min(max(self.view_y + dy, 0), max_offset)
+        if (view_x, view_y) == (self.view_x, self.view_y):
+            return
         
-        while to_check:
-            row, col = to_check.pop()
-            if (row, col) in connected:
-                continue
-            
-            if (0 <= row < self.GRID_SIZE and 0 <= col < self.GRID_SIZE and 
-                self.grid[row][col] is not None):
-                
-                current_color = self.grid[row][col]
-                
-                # 普通色块连接逻辑：相同颜色或包含彩色色块
-                can_connect = (
-                    current_color == start_color or  # 相同颜色
-                    current_color == Color.COLORFUL   # 当前是彩色色块
-                )
-                
-                if can_connect:
-                    connected.add((row, col))
-                    
-                    # 检查四个方向
-                    for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                        new_row, new_col = row + dr, col + dc
-                        if (new_row, new_col) not in connected:
-                            to_check.append((new_row, new_col))
-        
-        return connected
-    
-    def find_colorful_connected_cells(self, start_row: int, start_col: int) -> Set[Tuple[int, int]]:
-        """找到彩色色块的连接组合（只连接直接相邻的同色块）"""
-        connected = {(start_row, start_col)}  # 包含彩色色块本身
-        
-        # 检查四个方向的直接相邻色块
-        for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            new_row, new_col = start_row + dr, start_col + dc
-            if (0 <= new_row < self.GRID_SIZE and 0 <= new_col < self.GRID_SIZE and 
-                self.grid[new_row][new_col] is not None):
-                
-                adjacent_color = self.grid[new_row][new_col]
-                
-                # 收集相邻的同色块组
-                same_color_group = self.find_same_color_group(new_row, new_col, adjacent_color)
-                connected.update(same_color_group)
+        # 掉落竖条只渲染了原视口内的部分，滚动时直接落地
+        if self.state == GameState.FALLING:
+            self.finish_falling()
         
-        return connected
+        # 进行中的消除效果跟着棋盘一起移动
+        self.elimination_effects.shift(self.view_x - view_x, self.view_y - view_y)
+        self.view_x, self.view_y = view_x, view_y
+        self.full_redraw = True
+        self.update_hover(self.hover_pos)
     
-    def find_same_color_group(self, start_row: int, start_col: int, target_color) -> Set[Tuple[int, int]]:
-        """找到指定颜色的连接组"""
-        if target_color == Color.COLORFUL:
-            return {(start_row, start_col)}  # 彩色色块不再递归连接
-        
-        connected = set()
-        to_check = [(start_row, start_col)]
+    def zoom_view(self, delta: int):
+        """按单元格像素缩放视口，保持视口中心对准的位置不变"""
+        cell_size = min(max(self.CELL_SIZE + delta, self.MIN_CELL_SIZE), self.MAX_CELL_SIZE)
+        if cell_size == self.CELL_SIZE:
+            return
         
-        while to_check:
-            row, col = to_check.pop()
-            if (row, col) in connected:
-                continue
-            
-            if (0 <= row < self.GRID_SIZE and 0 <= col < self.GRID_SIZE and 
-                self.grid[row][col] == target_color):
-                
-                connected.add((row, col))
-                
-                # 检查四个方向
-                for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    new_row, new_col = row + dr, col + dc
-                    if (new_row, new_col) not in connected:
-                        to_check.append((new_row, new_col))
+        old_step = self.CELL_SIZE + self.GRID_MARGIN
+        new_step = cell_size + self.GRID_MARGIN
+        center_x = (self.view_x + self.BOARD_PIXELS / 2) / old_step
+        center_y = (self.view_y + self.BOARD_PIXELS / 2) / old_step
         
-        return connected
+        if self.state == GameState.FALLING:
+            self.finish_falling()
+        self.CELL_SIZE = cell_size
+        self.elimination_effects.clear()
+        self.view_x = int(center_x * new_step - self.BOARD_PIXELS / 2)
+        self.view_y = int(center_y * new_step - self.BOARD_PIXELS / 2)
+        self.scroll_view(0, 0)
+        self.update_hover(self.hover_pos)
+        self.full_redraw = True
+        logger.info(f"缩放视口: 单元格 {cell_size} 像素")
+    
+    def scroll_to_cell(self, row: int, col: int):
+        """单元格不在视口内时把它滚动到视口中央"""
+        rect = self.get_cell_rect(row, col)
+        if self.board_rect().contains(rect):
+            return
+        board = self.board_rect()
+        self.scroll_view(rect.centerx - board.centerx, rect.centery - board.centery)
+    
+    def find_connected_cells(self, start_row: int, start_col: int) -> Set[Tuple[int, int]]:
+        """找到与起始位置连接的同色块（彩色色块有特殊处理）"""
+        return self.engine.find_connected_cells(start_row, start_col)
     
     def handle_click(self, pos: Tuple[int, int]):
         """处理鼠标点击"""
+        if self.state == GameState.FALLING:
+            # 掉落期间的点击排队，落地后再处理
+            self.pending_clicks.append(pos)
+            return
         if self.state != GameState.PLAYING:
             return
         
@@ -334,10 +407,15 @@ class MatchThreeGame:
         if row is None or col is None:
             return
         
-        logger.info(f"点击坐标: ({row}, {col})")
+        logger.debug("点击坐标: (%d, %d)", row, col)
+        if self.engine.journal is not None:
+            self.engine.journal.click(row, col)
+        self.hint_cells.clear()
         
         # 如果处于锤子模式，直接消除单个色块
         if self.is_hammer_mode:
+            if self.replay is not None:
+                self.replay.hammer(row, col)
             self.use_hammer(row, col)
             return
         
@@ -346,8 +424,9 @@ class MatchThreeGame:
         
         if len(connected) >= 2:
             # 可以消除
+            if self.replay is not None:
+                self.replay.click(row, col)
             self.eliminate_cells(connected)
-            logger.info(f"消除坐标: {list(connected)}")
             self.selected_cells.clear()
         else:
             # 更新选中状态
@@ -359,7 +438,7 @@ class MatchThreeGame:
     def handle_tool_click(self, pos: Tuple[int, int]) -> bool:
         """处理道具区域点击，返回是否点击了道具"""
         x, y = pos
-        tool_area_start_y = self.SCORE_HEIGHT + self.GRID_SIZE * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN
+        tool_area_start_y = self.tool_area_rect().y
         
         # 作弊功能：锤子模式下点击Score文字重置锤子数量
         if self.is_hammer_mode and y < self.SCORE_HEIGHT:
@@ -368,6 +447,10 @@ class MatchThreeGame:
             if score_rect.collidepoint(x, y):
                 self.hammer_count = 99
                 logger.info("🎉 作弊功能激活！锤子数量重置为99个")
+                if self.engine.journal is not None:
+                    self.engine.journal.hammer_refill(self.hammer_count)
+                if self.replay is not None:
+                    self.replay.refill(self.hammer_count)
                 return True
         
         # 检查是否在道具区域内
@@ -394,377 +477,255 @@ class MatchThreeGame:
             self.is_hammer_mode = True
             pygame.mouse.set_cursor(self.hammer_cursor)  # 设置锤子鼠标
             logger.info("进入锤子模式")
+        self.update_hover()
     
     def use_hammer(self, row: int, col: int):
         """使用锤子消除单个色块"""
-        if self.grid[row][col] is None:
+        eliminated_color = self.engine.use_hammer(row, col)
+        if eliminated_color is None:
             return
         
-        # 消除单个色块
-        eliminated_color = self.grid[row][col]
-        self.grid[row][col] = None
-        
         # 添加消除效果
-        rect = self.get_cell_rect(row, col)
-        self.elimination_effects.append({
-            'rect': rect,
-            'timer': 30,
-            'color': eliminated_color
-        })
-        
-        # 更新分数
-        points = 50  # 锤子消除获得50分
-        self.score += points
-        self.eliminated_count += 1
-        
-        # 减少锤子数量
-        self.hammer_count -= 1
+        self.elimination_effects.spawn(self.get_cell_rect(row, col), eliminated_color)
         
         # 退出锤子模式
         self.is_hammer_mode = False
         self.create_finger_cursor()  # 恢复普通鼠标
         
-        logger.info(f"🔨 使用锤子消除坐标 ({row}, {col}) 的 {eliminated_color.name} 色块，获得 {points} 分，剩余锤子: {self.hammer_count}")
-        
         # 开始掉落动画
         self.start_falling_animation()
     
     def eliminate_cells(self, cells: Set[Tuple[int, int]]):
         """消除指定的色块"""
         eliminated_color = None
-        is_gold_elimination = False
-        is_diamond_elimination = False
-        is_colorful_elimination = False
-        is_pearl_elimination = False
         
-        # 添加消除效果
+        # 添加消除效果动画（只为视口内可见的单元格添加）
+        board = self.board_rect()
         for row, col in cells:
             if eliminated_color is None:
                 eliminated_color = self.grid[row][col]
             
-            # 检查是否是特殊色块
-            if self.grid[row][col] == Color.GOLD:
-                is_gold_elimination = True
-            elif self.grid[row][col] == Color.DIAMOND:
-                is_diamond_elimination = True
-            elif self.grid[row][col] == Color.COLORFUL:
-                is_colorful_elimination = True
-            elif self.grid[row][col] == Color.PEARL:
-                is_pearl_elimination = True
-            
-            # 添加消除效果动画
             rect = self.get_cell_rect(row, col)
-            self.elimination_effects.append({
-                'rect': rect,
-                'timer': 30,  # 效果持续帧数
-                'color': eliminated_color
-            })
-            
-            # 清除色块
-            self.grid[row][col] = None
-        
-        # 更新分数和统计
-        if is_pearl_elimination and eliminated_color == Color.PEARL:
-            # 珍珠色块消除，给予终极奖励
-            points = len(cells) * 15000
-            logger.info(f"🐚 消除了 {len(cells)} 个珍珠色块，获得 {points} 分！！！！")
-        elif is_colorful_elimination and eliminated_color == Color.COLORFUL:
-            # 彩色色块消除，给予特殊奖励
-            points = len(cells) * 5000  # 彩色色块本身的价值
-            logger.info(f"🌈 消除了 {len(cells)} 个彩色色块，获得 {points} 分！！")
-        elif is_diamond_elimination and eliminated_color == Color.DIAMOND:
-            # 钻石色块消除，给予超级奖励
-            points = len(cells) * 10000
-            logger.info(f"💎 消除了 {len(cells)} 个钻石色块，获得 {points} 分！！！")
-        elif is_gold_elimination and eliminated_color == Color.GOLD:
-            # 黄金色块消除，给予特殊奖励
-            points = len(cells) * 1000
-            logger.info(f"🌟 消除了 {len(cells)} 个黄金色块，获得 {points} 分！")
-        else:
-            # 普通色块消除
-            points = len(cells) * 10
-            logger.info(f"消除了 {len(cells)} 个 {eliminated_color.name} 色块，获得 {points} 分")
-        
-        self.score += points
-        self.eliminated_count += len(cells)
-        
-        # 生成特殊色块的逻辑
-        if is_colorful_elimination:
-            # 彩色色块消除后生成珍珠色块
-            self.generate_pearl_block_near(cells)
-        elif is_diamond_elimination and len(cells) >= 3:
-            # 3个或以上钻石消除后生成彩色色块
-            self.generate_colorful_block_near(cells)
-            logger.info(f"✨ 特殊触发：{len(cells)}个钻石连消，生成彩色万能色块！")
-        elif is_gold_elimination:
-            # 黄金色块消除后生成钻石色块
-            self.generate_diamond_block_near(cells)
-        elif not (is_diamond_elimination or is_pearl_elimination):
-            # 普通色块消除后生成黄金色块（钻石单独消除和珍珠消除后不生成新色块）
-            self.generate_gold_block_near(cells)
+            if board.colliderect(rect):
+                self.elimination_effects.spawn(rect, eliminated_color)
+        
+        # 计分和特殊色块生成由引擎完成
+        self.engine.eliminate_cells(cells)
         
         # 开始掉落动画
         self.start_falling_animation()
     
-    def generate_gold_block_near(self, eliminated_cells: Set[Tuple[int, int]]):
-        """在消除区域附近生成黄金色块"""
-        if not eliminated_cells:
-            return
+    def start_falling_animation(self):
+        """开始掉落动画"""
+        self.state = GameState.FALLING
+        self.hint_cells.clear()
+        self.update_hover()
+        
+        # 掉落前记下视口内各列的空位，算出每段的掉落距离
+        first_row, last_row, first_col, last_col = self.visible_range()
+        grid = self.grid
+        runs = {}
+        for col in self.engine.hole_columns:
+            if first_col <= col <= last_col:
+                holes = [row for row in range(self.GRID_SIZE) if grid[row][col] is None]
+                runs[col] = fall_runs(holes, self.GRID_SIZE)
+        
+        # 引擎同步完成掉落和填充，竖条按掉落后的棋盘渲染
+        self.engine.settle()
+        self.falling.start(runs, (first_row, last_row), self.CELL_SIZE + self.GRID_MARGIN, self.GRID_MARGIN,
+                           self.render_fall_strip, pygame.time.get_ticks())
+    
+    def render_fall_strip(self, col: int, first_row: int, last_row: int) -> pygame.Surface:
+        """把一列中连续几行的色块和边框渲染成一张竖条"""
+        step = self.CELL_SIZE + self.GRID_MARGIN
+        height = (last_row - first_row) * step + self.CELL_SIZE + 2
+        strip = pygame.Surface((self.CELL_SIZE + 2, height), pygame.SRCALPHA)
+        for row in range(first_row, last_row + 1):
+            rect = pygame.Rect(0, (row - first_row) * step, self.CELL_SIZE, self.CELL_SIZE)
+            strip.blit(self.get_block_tile(self.grid[row][col]), rect)
+            pygame.draw.rect(strip, Color.GRAY.value, rect, 2)
+        return strip.convert_alpha()
+    
+    def update_falling(self):
+        """掉落动画到时间后落地"""
+        if self.state == GameState.FALLING and self.falling.finished(pygame.time.get_ticks()):
+            self.finish_falling()
+    
+    def finish_falling(self):
+        """掉落完成：恢复游戏状态，再按新棋盘处理掉落期间排队的点击"""
+        self.falling.clear()
+        self.state = GameState.PLAYING
+        logger.info("掉落动画完成")
+        self.check_game_over()
+        self.update_hover()
         
-        # 收集消除区域附近的候选位置
-        candidate_positions = set()
-        
-        for row, col in eliminated_cells:
-            # 检查周围8个方向的位置
-            for dr in [-1, 0, 1]:
-                for dc in [-1, 0, 1]:
-                    if dr == 0 and dc == 0:
-                        continue  # 跳过中心位置
-                    
-                    new_row, new_col = row + dr, col + dc
-                    if (0 <= new_row < self.GRID_SIZE and 
-                        0 <= new_col < self.GRID_SIZE and
-                        (new_row, new_col) not in eliminated_cells):
-                        candidate_positions.add((new_row, new_col))
-        
-        # 过滤掉已经是特殊色块的位置
-        valid_positions = []
-        for row, col in candidate_positions:
-            if (self.grid[row][col] != Color.GOLD and 
-                self.grid[row][col] != Color.DIAMOND and
-                self.grid[row][col] != Color.COLORFUL and
-                self.grid[row][col] != Color.PEARL):
-                valid_positions.append((row, col))
-        
-        # 如果有有效位置，随机选择一个生成黄金色块
-        if valid_positions:
-            target_row, target_col = random.choice(valid_positions)
-            old_color = self.grid[target_row][target_col]
-            self.grid[target_row][target_col] = Color.GOLD
-            logger.info(f"✨ 在位置 ({target_row}, {target_col}) 生成黄金色块 (原色块: {old_color.name if old_color else 'None'})")
-        else:
-            logger.info("⚠️ 没有合适的位置生成黄金色块（附近都是特殊色块）")
+        # 排队的点击可能再次触发掉落，剩下的点击等下一次落地
+        while self.pending_clicks and self.state == GameState.PLAYING:
+            self.handle_click(self.pending_clicks.popleft())
     
-    def generate_diamond_block_near(self, eliminated_cells: Set[Tuple[int, int]]):
-        """在消除区域附近生成钻石色块"""
-        if not eliminated_cells:
+    def update_hover(self, pos: Tuple[int, int] = None):
+        """更新悬停预览（pos为None时按上次的鼠标位置重新计算，网格或模式变化后调用）"""
+        if pos is not None:
+            self.hover_pos = pos
+        else:
+            # 网格或模式变化后旧的组标识失效
+            self.hover_key = None
+            self.hover_cells = set()
+            self.hover_points = 0
+        
+        row = col = key = None
+        if self.hover_pos is not None and self.state == GameState.PLAYING:
+            row, col = self.get_cell_at_pos(self.hover_pos)
+        if row is not None:
+            if self.is_hammer_mode:
+                key = ('hammer', row, col) if self.grid[row][col] is not None else None
+            elif self.engine.group_points(row, col):
+                key = self.engine.group_key(row, col)
+        
+        # 还在同一个组里：不需要重新取组内坐标
+        if key == self.hover_key:
             return
-        
-        # 收集消除区域附近的候选位置
-        candidate_positions = set()
-        
-        for row, col in eliminated_cells:
-            # 检查周围8个方向的位置
-            for dr in [-1, 0, 1]:
-                for dc in [-1, 0, 1]:
-                    if dr == 0 and dc == 0:
-                        continue  # 跳过中心位置
-                    
-                    new_row, new_col = row + dr, col + dc
-                    if (0 <= new_row < self.GRID_SIZE and 
-                        0 <= new_col < self.GRID_SIZE and
-                        (new_row, new_col) not in eliminated_cells):
-                        candidate_positions.add((new_row, new_col))
-        
-        # 过滤掉已经是特殊色块的位置
-        valid_positions = []
-        for row, col in candidate_positions:
-            if (self.grid[row][col] != Color.GOLD and 
-                self.grid[row][col] != Color.DIAMOND and
-                self.grid[row][col] != Color.COLORFUL and
-                self.grid[row][col] != Color.PEARL):
-                valid_positions.append((row, col))
-        
-        # 如果有有效位置，随机选择一个生成钻石色块
-        if valid_positions:
-            target_row, target_col = random.choice(valid_positions)
-            old_color = self.grid[target_row][target_col]
-            self.grid[target_row][target_col] = Color.DIAMOND
-            logger.info(f"💎 在位置 ({target_row}, {target_col}) 生成钻石色块 (原色块: {old_color.name if old_color else 'None'})")
+        self.hover_key = key
+        if key is None:
+            self.hover_cells = set()
+            self.hover_points = 0
+        elif self.is_hammer_mode:
+            self.hover_cells = {(row, col)}
+            self.hover_points = HAMMER_POINTS
         else:
-            logger.info("⚠️ 没有合适的位置生成钻石色块（附近都是特殊色块）")
+            self.hover_cells = self.find_connected_cells(row, col)
+            self.hover_points = self.engine.group_points(row, col)
+    
+    def fall_regions(self) -> List[pygame.Rect]:
+        """掉落竖条在屏幕上覆盖的区域（裁剪在棋盘区域内）"""
+        board = self.board_rect()
+        return [region.clip(board) for region in self.falling.regions(-self.view_x, self.SCORE_HEIGHT - self.view_y)]
     
-    def generate_colorful_block_near(self, eliminated_cells: Set[Tuple[int, int]]):
-        """在消除区域附近生成彩色万能色块"""
-        if not eliminated_cells:
+    def draw_falling(self, region: pygame.Rect = None):
+        """绘制掉落中的竖条"""
+        self.falling.draw(self.screen, -self.view_x, self.SCORE_HEIGHT - self.view_y,
+                          pygame.time.get_ticks(), region)
+    
+    def undo(self):
+        """撤销上一步（掉落期间不能撤销）"""
+        if self.state == GameState.FALLING or not self.history.undo():
             return
-        
-        # 收集消除区域附近的候选位置
-        candidate_positions = set()
-        
-        for row, col in eliminated_cells:
-            # 检查周围8个方向的位置
-            for dr in [-1, 0, 1]:
-                for dc in [-1, 0, 1]:
-                    if dr == 0 and dc == 0:
-                        continue  # 跳过中心位置
-                    
-                    new_row, new_col = row + dr, col + dc
-                    if (0 <= new_row < self.GRID_SIZE and 
-                        0 <= new_col < self.GRID_SIZE and
-                        (new_row, new_col) not in eliminated_cells):
-                        candidate_positions.add((new_row, new_col))
-        
-        # 过滤掉已经是特殊色块的位置
-        valid_positions = []
-        for row, col in candidate_positions:
-            if (self.grid[row][col] != Color.GOLD and 
-                self.grid[row][col] != Color.DIAMOND and
-                self.grid[row][col] != Color.COLORFUL and
-                self.grid[row][col] != Color.PEARL):
-                valid_positions.append((row, col))
-        
-        # 如果有有效位置，随机选择一个生成彩色色块
-        if valid_positions:
-            target_row, target_col = random.choice(valid_positions)
-            old_color = self.grid[target_row][target_col]
-            self.grid[target_row][target_col] = Color.COLORFUL
-            logger.info(f"🌈 在位置 ({target_row}, {target_col}) 生成彩色万能色块 (原色块: {old_color.name if old_color else 'None'})")
-        else:
-            logger.info("⚠️ 没有合适的位置生成彩色色块（附近都是特殊色块）")
+        if self.replay is not None:
+            self.replay.undo()
+        self.history_changed("↩️ 撤销一步")
+    
+    def redo(self):
+        """重做上一次撤销的一步"""
+        if self.state == GameState.FALLING or not self.history.redo():
+            return
+        if self.replay is not None:
+            self.replay.redo()
+        self.history_changed("↪️ 重做一步")
+    
+    def history_changed(self, message: str):
+        """撤销或重做后按新的网格刷新状态和画面"""
+        self.state = GameState.PLAYING
+        self.selected_cells.clear()
+        self.hint_cells.clear()
+        self.full_redraw = True
+        self.check_game_over()
+        self.update_hover()
+        logger.info(f"{message}，分数: {self.score}，剩余锤子: {self.hammer_count}，"
+                    f"可撤销 {len(self.history.undo_entries)} 步、可重做 {len(self.history.redo_entries)} 步")
     
-    def generate_pearl_block_near(self, eliminated_cells: Set[Tuple[int, int]]):
-        """在消除区域附近生成珍珠色块"""
-        if not eliminated_cells:
+    def check_game_over(self):
+        """掉落完成后检查棋盘上是否还有可消除的组"""
+        self.no_moves = not self.engine.has_moves()
+        if not self.no_moves:
             return
         
-        # 收集消除区域附近的候选位置
-        candidate_positions = set()
-        
-        for row, col in eliminated_cells:
-            # 检查周围8个方向的位置
-            for dr in [-1, 0, 1]:
-                for dc in [-1, 0, 1]:
-                    if dr == 0 and dc == 0:
-                        continue  # 跳过中心位置
-                    
-                    new_row, new_col = row + dr, col + dc
-                    if (0 <= new_row < self.GRID_SIZE and 
-                        0 <= new_col < self.GRID_SIZE and
-                        (new_row, new_col) not in eliminated_cells):
-                        candidate_positions.add((new_row, new_col))
-        
-        # 过滤掉已经是特殊色块的位置
-        valid_positions = []
-        for row, col in candidate_positions:
-            if (self.grid[row][col] != Color.GOLD and 
-                self.grid[row][col] != Color.DIAMOND and
-                self.grid[row][col] != Color.COLORFUL and
-                self.grid[row][col] != Color.PEARL):
-                valid_positions.append((row, col))
-        
-        # 如果有有效位置，随机选择一个生成珍珠色块
-        if valid_positions:
-            target_row, target_col = random.choice(valid_positions)
-            old_color = self.grid[target_row][target_col]
-            self.grid[target_row][target_col] = Color.PEARL
-            logger.info(f"🐚 在位置 ({target_row}, {target_col}) 生成珍珠色块 (原色块: {old_color.name if old_color else 'None'})")
+        if self.hammer_count > 0:
+            logger.info(f"⚠️ 没有可消除的色块，还可以使用锤子 (剩余 {self.hammer_count} 个)")
         else:
-            logger.info("⚠️ 没有合适的位置生成珍珠色块（附近都是特殊色块）")
+            self.state = GameState.GAME_OVER
+            logger.info("没有可消除的色块，游戏结束")
     
-    def start_falling_animation(self):
-        """开始掉落动画"""
-        self.state = GameState.FALLING
-        self.falling_cells = []
+    def show_hint(self):
+        """高亮得分最高的可消除组"""
+        if self.state != GameState.PLAYING:
+            return
         
-        # 为每列处理掉落
-        for col in range(self.GRID_SIZE):
-            # 收集非空色块
-            non_empty = []
-            empty_count = 0
-            
-            for row in range(self.GRID_SIZE - 1, -1, -1):  # 从底部向上
-                if self.grid[row][col] is not None:
-                    non_empty.append(self.grid[row][col])
-                else:
-                    empty_count += 1
-                self.grid[row][col] = None
-            
-            # 重新放置现有色块
-            for i, color in enumerate(non_empty):
-                target_row = self.GRID_SIZE - 1 - i
-                self.grid[target_row][col] = color
-            
-            # 默认自动填充新色块，从上方掉落新色块填满网格
-            if empty_count > 0:
-                for i in range(empty_count):
-                    new_row = empty_count - 1 - i
-                    self.grid[new_row][col] = random.choice(self.COLORS)
-                    logger.info(f"在位置 ({new_row}, {col}) 生成新色块: {self.grid[new_row][col].name}")
+        best_move = self.engine.find_best_move()
+        if best_move is None:
+            self.hint_cells.clear()
+            return
         
-        # 模拟掉落完成
-        pygame.time.set_timer(pygame.USEREVENT + 1, 500)  # 500ms后完成掉落
+        row, col, points = best_move
+        self.hint_cells = self.find_connected_cells(row, col)
+        self.scroll_to_cell(row, col)
+        logger.info(f"💡 提示: 点击 ({row}, {col}) 可消除 {len(self.hint_cells)} 个色块，获得 {points} 分")
     
     def update_elimination_effects(self):
         """更新消除效果"""
-        self.elimination_effects = [
-            effect for effect in self.elimination_effects
-            if self.update_single_effect(effect)
-        ]
+        self.elimination_effects.update()
     
-    def update_gold_animation(self):
-        """更新黄金色块动画效果"""
-        import math
-        self.gold_animation_timer += 1
-        # 使用sin函数创建周期性闪烁效果，周期约为60帧(1秒)
-        self.gold_glow_intensity = (math.sin(self.gold_animation_timer * 0.1) + 1) * 0.5  # 0-1之间
-    
-    def update_diamond_animation(self):
-        """更新钻石色块动画效果"""
-        import math
-        self.diamond_animation_timer += 1
-        # 钻石使用更快的闪烁频率，创造更炫目的效果
-        self.diamond_glow_intensity = (math.sin(self.diamond_animation_timer * 0.15) + 1) * 0.5  # 0-1之间，比黄金更快
-    
-    def update_colorful_animation(self):
-        """更新彩色色块动画效果"""
-        import math
-        self.colorful_animation_timer += 1
-        # 彩色使用彩虹变化效果，更加炫目
-        self.colorful_glow_intensity = (math.sin(self.colorful_animation_timer * 0.2) + 1) * 0.5  # 0-1之间，最快频率
-    
-    def update_pearl_animation(self):
-        """更新珍珠色块动画效果"""
-        import math
-        self.pearl_animation_timer += 1
-        # 珍珠使用优雅的脉动效果
-        self.pearl_glow_intensity = (math.sin(self.pearl_animation_timer * 0.08) + 1) * 0.5  # 0-1之间，最慢优雅
-    
-    def update_single_effect(self, effect: dict) -> bool:
-        """更新单个消除效果，返回是否继续"""
-        effect['timer'] -= 1
-        return effect['timer'] > 0
-    
-    def draw_elimination_effect(self, effect: dict):
-        """绘制消除效果"""
-        alpha = int(255 * (effect['timer'] / 30))
-        size_factor = 1 + (30 - effect['timer']) / 30 * 0.5
-        
-        rect = effect['rect']
-        new_size = int(rect.width * size_factor)
-        new_rect = pygame.Rect(
-            rect.centerx - new_size // 2,
-            rect.centery - new_size // 2,
-            new_size,
-            new_size
-        )
-        
-        # 创建带透明度的表面
-        temp_surface = pygame.Surface((new_size, new_size), pygame.SRCALPHA)
-        color_with_alpha = (*effect['color'].value, alpha)
-        pygame.draw.rect(temp_surface, color_with_alpha, (0, 0, new_size, new_size))
-        
-        self.screen.blit(temp_surface, new_rect)
+    def update_animation(self):
+        """推进特殊色块共享动画时钟"""
+        self.animation_clock += 1
     
-    def draw_gold_effects(self, rect):
-        """绘制黄金色块的动态闪光效果"""
-        import math
-        
+    def draw_elimination_effects(self, region: pygame.Rect = None):
+        """绘制消除效果（只绘制与区域相交的粒子）"""
+        self.elimination_effects.draw(self.screen, region)
+    
+    def get_effect_frame(self, color: Color) -> pygame.Surface:
+        """按共享动画时钟取出特殊色块效果帧，首次用到时渲染并缓存"""
+        if self.effect_atlas_size != self.CELL_SIZE:
+            self.effect_atlas.clear()
+            self.effect_atlas_size = self.CELL_SIZE
+        
+        loop_length, _, step = EFFECT_LOOPS[color]
+        frames = self.effect_atlas.get(color)
+        if frames is None:
+            frames = [None] * (loop_length // step)
+            self.effect_atlas[color] = frames
+        
+        index = effect_frame_index(color, self.animation_clock)
+        if frames[index] is None:
+            frames[index] = self.render_effect_frame(color, index * step)
+        return frames[index]
+    
+    def render_effect_frame(self, color: Color, index: int) -> pygame.Surface:
+        """渲染效果循环中第 index 个动画帧（预乘alpha，四周留出光晕空间）"""
+        frame_count, cycles, _ = EFFECT_LOOPS[color]
+        intensity = (math.sin(2 * math.pi * cycles * index / frame_count) + 1) * 0.5  # 0-1之间
+        
+        pad = EFFECT_PADDING
+        frame = pygame.Surface((self.CELL_SIZE + pad * 2, self.CELL_SIZE + pad * 2), pygame.SRCALPHA)
+        rect = pygame.Rect(pad, pad, self.CELL_SIZE, self.CELL_SIZE)
+        
+        if color == Color.GOLD:
+            self.render_gold_effects(frame, rect, intensity, index)
+        elif color == Color.DIAMOND:
+            self.render_diamond_effects(frame, rect, intensity, index)
+        elif color == Color.COLORFUL:
+            self.render_colorful_effects(frame, rect, intensity, index)
+        elif color == Color.PEARL:
+            self.render_pearl_effects(frame, rect, intensity, index)
+        
+        return frame.convert_alpha()
+    
+    def draw_block_effects(self, rect, color: Color):
+        """绘制特殊色块的动态效果（使用效果图集）"""
+        frame = self.get_effect_frame(color)
+        self.screen.blit(frame, (rect.x - EFFECT_PADDING, rect.y - EFFECT_PADDING),
+                         special_flags=pygame.BLEND_PREMULTIPLIED)
+    
+    def blit_layer(self, surface, layer, dest):
+        """把straight alpha图层按预乘alpha叠加到效果帧上"""
+        surface.blit(layer.premul_alpha(), dest, special_flags=pygame.BLEND_PREMULTIPLIED)
+    
+    def render_gold_effects(self, surface, rect, intensity: float, timer: int):
+        """绘制黄金色块的动态闪光效果（一帧）"""
         # 计算当前闪光强度 (0.3-1.0之间变化)
-        glow_alpha = int(255 * (0.3 + 0.7 * self.gold_glow_intensity))
+        glow_alpha = int(255 * (0.3 + 0.7 * intensity))
         
         # 第一层：外部光晕效果
-        glow_size = int(8 + 6 * self.gold_glow_intensity)  # 8-14像素的光晕
+        glow_size = int(8 + 6 * intensity)  # 8-14像素的光晕
         outer_rect = pygame.Rect(
             rect.x - glow_size // 2, 
             rect.y - glow_size // 2, 
@@ -774,17 +735,17 @@ class MatchThreeGame:
         glow_surface = pygame.Surface((outer_rect.width, outer_rect.height), pygame.SRCALPHA)
         glow_color = (255, 215, 0, max(50, glow_alpha // 4))  # 半透明黄金色光晕
         pygame.draw.rect(glow_surface, glow_color, (0, 0, outer_rect.width, outer_rect.height))
-        self.screen.blit(glow_surface, outer_rect)
+        self.blit_layer(surface, glow_surface, outer_rect)
         
         # 第二层：动态闪烁的白色边框
         border_alpha = max(180, glow_alpha)
         border_color = (255, 255, 255, border_alpha)
         border_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
         pygame.draw.rect(border_surface, border_color, (0, 0, rect.width, rect.height), 4)
-        self.screen.blit(border_surface, rect)
+        self.blit_layer(surface, border_surface, rect)
         
         # 第三层：内部动态高光
-        inner_size = max(8, int(16 * self.gold_glow_intensity))  # 动态大小的内部高光
+        inner_size = max(8, int(16 * intensity))  # 动态大小的内部高光
         inner_rect = pygame.Rect(
             rect.x + (rect.width - inner_size) // 2,
             rect.y + (rect.height - inner_size) // 2,
@@ -792,13 +753,13 @@ class MatchThreeGame:
             inner_size
         )
         inner_surface = pygame.Surface((inner_size, inner_size), pygame.SRCALPHA)
-        inner_alpha = max(100, int(200 * self.gold_glow_intensity))
+        inner_alpha = max(100, int(200 * intensity))
         inner_color = (255, 255, 200, inner_alpha)
         pygame.draw.ellipse(inner_surface, inner_color, (0, 0, inner_size, inner_size))
-        self.screen.blit(inner_surface, inner_rect)
+        self.blit_layer(surface, inner_surface, inner_rect)
         
         # 第四层：闪烁的角落星光效果
-        if self.gold_glow_intensity > 0.8:  # 只在高强度时显示
+        if intensity > 0.8:  # 只在高强度时显示
             star_points = [
                 (rect.x + 5, rect.y + 5),           # 左上
                 (rect.x + rect.width - 5, rect.y + 5),    # 右上
@@ -808,20 +769,18 @@ class MatchThreeGame:
             
             for point in star_points:
                 star_surface = pygame.Surface((8, 8), pygame.SRCALPHA)
-                star_alpha = int(255 * (self.gold_glow_intensity - 0.8) * 5)  # 只在峰值时显示
+                star_alpha = int(255 * (intensity - 0.8) * 5)  # 只在峰值时显示
                 pygame.draw.circle(star_surface, (255, 255, 255, star_alpha), (4, 4), 3)
-                self.screen.blit(star_surface, (point[0] - 4, point[1] - 4))
+                self.blit_layer(surface, star_surface, (point[0] - 4, point[1] - 4))
     
-    def draw_diamond_effects(self, rect):
-        """绘制钻石色块的超华丽动态效果"""
-        import math
-        
+    def render_diamond_effects(self, surface, rect, intensity: float, timer: int):
+        """绘制钻石色块的超华丽动态效果（一帧）"""
         # 计算当前闪光强度 (0.2-1.0之间变化，比黄金更强)
-        glow_alpha = int(255 * (0.2 + 0.8 * self.diamond_glow_intensity))
+        glow_alpha = int(255 * (0.2 + 0.8 * intensity))
         
         # 第一层：多重外部光晕效果
         for i in range(3):  # 三层光晕
-            glow_size = int(12 + 8 * self.diamond_glow_intensity + i * 4)  # 更大的光晕
+            glow_size = int(12 + 8 * intensity + i * 4)  # 更大的光晕
             outer_rect = pygame.Rect(
                 rect.x - glow_size // 2, 
                 rect.y - glow_size // 2, 
@@ -833,7 +792,7 @@ class MatchThreeGame:
             alpha = max(30, glow_alpha // (4 + i * 2))
             glow_color = (185, 242, 255, alpha)
             pygame.draw.rect(glow_surface, glow_color, (0, 0, outer_rect.width, outer_rect.height))
-            self.screen.blit(glow_surface, outer_rect)
+            self.blit_layer(surface, glow_surface, outer_rect)
         
         # 第二层：彩虹色动态边框
         border_colors = [
@@ -847,37 +806,37 @@ class MatchThreeGame:
             border_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
             border_color = (*color, alpha)
             pygame.draw.rect(border_surface, border_color, (0, 0, rect.width, rect.height), 2 + i)
-            self.screen.blit(border_surface, rect)
+            self.blit_layer(surface, border_surface, rect)
         
         # 第三层：动态钻石切面效果
         center_x, center_y = rect.centerx, rect.centery
-        diamond_size = int(20 + 15 * self.diamond_glow_intensity)
+        diamond_size = int(20 + 15 * intensity)
         
         # 钻石形状的多个切面
         for angle in [0, 45, 90, 135]:  # 四个切面
-            radians = math.radians(angle + self.diamond_animation_timer * 2)  # 慢速旋转
+            radians = math.radians(angle + timer * 2)  # 慢速旋转
             offset_x = int(math.cos(radians) * diamond_size // 4)
             offset_y = int(math.sin(radians) * diamond_size // 4)
             
             facet_surface = pygame.Surface((diamond_size, diamond_size), pygame.SRCALPHA)
-            facet_alpha = max(80, int(180 * self.diamond_glow_intensity))
+            facet_alpha = max(80, int(180 * intensity))
             facet_color = (255, 255, 255, facet_alpha)
             pygame.draw.ellipse(facet_surface, facet_color, (0, 0, diamond_size, diamond_size))
             
-            self.screen.blit(facet_surface, 
+            self.blit_layer(surface, facet_surface, 
                            (center_x - diamond_size // 2 + offset_x, 
                             center_y - diamond_size // 2 + offset_y))
         
         # 第四层：超级星光爆发效果
-        if self.diamond_glow_intensity > 0.7:  # 更频繁的星光
+        if intensity > 0.7:  # 更频繁的星光
             # 8个方向的星光射线
             for angle in range(0, 360, 45):
                 radians = math.radians(angle)
-                length = int(25 + 10 * self.diamond_glow_intensity)
+                length = int(25 + 10 * intensity)
                 end_x = center_x + int(math.cos(radians) * length)
                 end_y = center_y + int(math.sin(radians) * length)
                 
-                star_alpha = int(255 * (self.diamond_glow_intensity - 0.7) * 3.33)
+                star_alpha = int(255 * (intensity - 0.7) * 3.33)
                 for thickness in range(1, 4):
                     line_surface = pygame.Surface((rect.width * 2, rect.height * 2), pygame.SRCALPHA)
                     line_alpha = star_alpha // thickness
@@ -885,24 +844,22 @@ class MatchThreeGame:
                                    (rect.width, rect.height), 
                                    (end_x - rect.x + rect.width, end_y - rect.y + rect.height), 
                                    thickness)
-                    self.screen.blit(line_surface, (rect.x - rect.width, rect.y - rect.height))
+                    self.blit_layer(surface, line_surface, (rect.x - rect.width, rect.y - rect.height))
         
         # 第五层：中心爆发光点（最高强度时）
-        if self.diamond_glow_intensity > 0.9:  # 只在最高强度时
-            burst_size = int(30 * (self.diamond_glow_intensity - 0.9) * 10)
+        if intensity > 0.9:  # 只在最高强度时
+            burst_size = int(30 * (intensity - 0.9) * 10)
             burst_surface = pygame.Surface((burst_size, burst_size), pygame.SRCALPHA)
-            burst_alpha = int(255 * (self.diamond_glow_intensity - 0.9) * 10)
+            burst_alpha = int(255 * (intensity - 0.9) * 10)
             pygame.draw.circle(burst_surface, (255, 255, 255, burst_alpha), 
                              (burst_size // 2, burst_size // 2), burst_size // 2)
-            self.screen.blit(burst_surface, 
+            self.blit_layer(surface, burst_surface, 
                            (center_x - burst_size // 2, center_y - burst_size // 2))
     
-    def draw_colorful_effects(self, rect):
-        """绘制彩色万能色块的彩虹动态效果"""
-        import math
-        
+    def render_colorful_effects(self, surface, rect, intensity: float, timer: int):
+        """绘制彩色万能色块的彩虹动态效果（一帧）"""
         # 计算当前闪光强度 (0.3-1.0之间变化)
-        glow_alpha = int(255 * (0.3 + 0.7 * self.colorful_glow_intensity))
+        glow_alpha = int(255 * (0.3 + 0.7 * intensity))
         
         # 第一层：彩虹光晕效果
         rainbow_colors = [
@@ -916,8 +873,8 @@ class MatchThreeGame:
         ]
         
         for i, color in enumerate(rainbow_colors):
-            angle_offset = (self.colorful_animation_timer + i * 15) % 360
-            glow_size = int(10 + 8 * self.colorful_glow_intensity + i * 2)
+            angle_offset = (timer + i * 15) % 360
+            glow_size = int(10 + 8 * intensity + i * 2)
             
             outer_rect = pygame.Rect(
                 rect.x - glow_size // 2, 
@@ -930,51 +887,49 @@ class MatchThreeGame:
             alpha = max(20, glow_alpha // (4 + i))
             glow_color = (*color, alpha)
             pygame.draw.rect(glow_surface, glow_color, (0, 0, outer_rect.width, outer_rect.height))
-            self.screen.blit(glow_surface, outer_rect)
+            self.blit_layer(surface, glow_surface, outer_rect)
         
         # 第二层：旋转彩虹边框
         for i in range(4):
             border_thickness = 3 - i
-            color_index = (self.colorful_animation_timer // 10 + i) % len(rainbow_colors)
+            color_index = (timer // 10 + i) % len(rainbow_colors)
             border_color = rainbow_colors[color_index]
             border_alpha = max(150, int(glow_alpha * (1 - i * 0.1)))
             
             border_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
             pygame.draw.rect(border_surface, (*border_color, border_alpha), 
                            (0, 0, rect.width, rect.height), border_thickness)
-            self.screen.blit(border_surface, rect)
+            self.blit_layer(surface, border_surface, rect)
         
         # 第三层：中心彩虹漩涡
         center_x, center_y = rect.centerx, rect.centery
-        spiral_size = int(15 + 10 * self.colorful_glow_intensity)
+        spiral_size = int(15 + 10 * intensity)
         
         for angle in range(0, 360, 45):
-            color_index = (angle // 45 + self.colorful_animation_timer // 5) % len(rainbow_colors)
+            color_index = (angle // 45 + timer // 5) % len(rainbow_colors)
             spiral_color = rainbow_colors[color_index]
             
-            radians = math.radians(angle + self.colorful_animation_timer * 3)
+            radians = math.radians(angle + timer * 3)
             offset_x = int(math.cos(radians) * spiral_size // 3)
             offset_y = int(math.sin(radians) * spiral_size // 3)
             
             spiral_surface = pygame.Surface((spiral_size, spiral_size), pygame.SRCALPHA)
-            spiral_alpha = max(100, int(180 * self.colorful_glow_intensity))
+            spiral_alpha = max(100, int(180 * intensity))
             pygame.draw.circle(spiral_surface, (*spiral_color, spiral_alpha), 
                              (spiral_size // 2, spiral_size // 2), spiral_size // 4)
             
-            self.screen.blit(spiral_surface, 
+            self.blit_layer(surface, spiral_surface, 
                            (center_x - spiral_size // 2 + offset_x, 
                             center_y - spiral_size // 2 + offset_y))
     
-    def draw_pearl_effects(self, rect):
-        """绘制珍珠色块的优雅光泽效果"""
-        import math
-        
+    def render_pearl_effects(self, surface, rect, intensity: float, timer: int):
+        """绘制珍珠色块的优雅光泽效果（一帧）"""
         # 计算当前闪光强度 (0.4-1.0之间变化，更稳定)
-        glow_alpha = int(255 * (0.4 + 0.6 * self.pearl_glow_intensity))
+        glow_alpha = int(255 * (0.4 + 0.6 * intensity))
         
         # 第一层：珍珠光泽外晕
         for i in range(5):  # 五层渐变光晕
-            glow_size = int(6 + 4 * self.pearl_glow_intensity + i * 2)
+            glow_size = int(6 + 4 * intensity + i * 2)
             outer_rect = pygame.Rect(
                 rect.x - glow_size // 2, 
                 rect.y - glow_size // 2, 
@@ -988,7 +943,7 @@ class MatchThreeGame:
             alpha = max(15, glow_alpha // (3 + i * 2))
             glow_color = (*pearl_colors[i % len(pearl_colors)], alpha)
             pygame.draw.ellipse(glow_surface, glow_color, (0, 0, outer_rect.width, outer_rect.height))
-            self.screen.blit(glow_surface, outer_rect)
+            self.blit_layer(surface, glow_surface, outer_rect)
         
         # 第二层：珍珠质感边框
         for thickness in range(1, 4):
@@ -996,27 +951,27 @@ class MatchThreeGame:
             border_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
             border_color = (255, 255, 255, border_alpha)
             pygame.draw.rect(border_surface, border_color, (0, 0, rect.width, rect.height), thickness)
-            self.screen.blit(border_surface, rect)
+            self.blit_layer(surface, border_surface, rect)
         
         # 第三层：珍珠光泽移动高光
         center_x, center_y = rect.centerx, rect.centery
-        highlight_angle = self.pearl_animation_timer * 2  # 缓慢移动
+        highlight_angle = timer * 2  # 缓慢移动
         
         for i in range(3):  # 三道高光
             angle = highlight_angle + i * 120
             radians = math.radians(angle)
-            highlight_size = int(12 + 8 * self.pearl_glow_intensity)
+            highlight_size = int(12 + 8 * intensity)
             
             offset_x = int(math.cos(radians) * highlight_size // 4)
             offset_y = int(math.sin(radians) * highlight_size // 4)
             
             highlight_surface = pygame.Surface((highlight_size, highlight_size), pygame.SRCALPHA)
-            highlight_alpha = max(120, int(200 * self.pearl_glow_intensity))
+            highlight_alpha = max(120, int(200 * intensity))
             highlight_color = (255, 255, 255, highlight_alpha)
             pygame.draw.ellipse(highlight_surface, highlight_color, 
                               (0, 0, highlight_size, highlight_size))
             
-            self.screen.blit(highlight_surface, 
+            self.blit_layer(surface, highlight_surface, 
                            (center_x - highlight_size // 2 + offset_x, 
                             center_y - highlight_size // 2 + offset_y))
         
@@ -1026,16 +981,46 @@ class MatchThreeGame:
             pattern_size = int(rect.width - 10 - i * 6)
             if pattern_size > 0:
                 pattern_surface = pygame.Surface((pattern_size, pattern_size), pygame.SRCALPHA)
-                pattern_alpha = max(80, int(150 * self.pearl_glow_intensity))
+                pattern_alpha = max(80, int(150 * intensity))
                 pygame.draw.ellipse(pattern_surface, (*color, pattern_alpha), 
                                   (0, 0, pattern_size, pattern_size), 2)
                 
-                self.screen.blit(pattern_surface, 
+                self.blit_layer(surface, pattern_surface, 
                                (center_x - pattern_size // 2, 
                                 center_y - pattern_size // 2))
     
+    def get_block_tile(self, color: Color) -> pygame.Surface:
+        """获取预渲染的色块图块，CELL_SIZE变化时自动重建缓存"""
+        if self.tile_cache_size != self.CELL_SIZE:
+            self.tile_cache.clear()
+            self.tile_cache_size = self.CELL_SIZE
+        
+        key = (color, self.CELL_SIZE)
+        tile = self.tile_cache.get(key)
+        if tile is None:
+            tile = self.render_block_tile(color, self.CELL_SIZE)
+            self.tile_cache[key] = tile
+        return tile
+    
+    def render_block_tile(self, color: Color, size: int) -> pygame.Surface:
+        """渲染单个色块图块（转换为显示格式），图块比单元格大2像素以容纳阴影"""
+        tile = pygame.Surface((size + 2, size + 2), pygame.SRCALPHA)
+        rect = pygame.Rect(0, 0, size, size)
+        
+        # 普通色块使用立体圆角效果，特殊色块保持纯色方块
+        if color in [Color.RED, Color.GREEN, Color.BLUE, Color.ORANGE, Color.PINK]:
+            self.render_rounded_3d_block(tile, rect, color)
+        else:
+            pygame.draw.rect(tile, color.value, rect)
+        
+        return tile.convert_alpha()
+    
     def draw_rounded_3d_block(self, rect, color):
-        """绘制立体圆角色块"""
+        """绘制立体圆角色块（使用缓存图块）"""
+        self.screen.blit(self.get_block_tile(color), rect.topleft)
+    
+    def render_rounded_3d_block(self, surface, rect, color):
+        """在指定表面上绘制立体圆角色块"""
         # 圆角半径
         corner_radius = 8
         
@@ -1046,74 +1031,199 @@ class MatchThreeGame:
         
         # 绘制阴影 (右下偏移)
         shadow_rect = pygame.Rect(rect.x + 2, rect.y + 2, rect.width, rect.height)
-        pygame.draw.rect(self.screen, shadow_color, shadow_rect, border_radius=corner_radius)
+        pygame.draw.rect(surface, shadow_color, shadow_rect, border_radius=corner_radius)
         
         # 绘制主体色块
-        pygame.draw.rect(self.screen, base_color, rect, border_radius=corner_radius)
+        pygame.draw.rect(surface, base_color, rect, border_radius=corner_radius)
         
         # 绘制高光 (左上角)
         highlight_rect = pygame.Rect(rect.x + 3, rect.y + 3, rect.width - 12, rect.height - 12)
         highlight_surface = pygame.Surface((highlight_rect.width, highlight_rect.height), pygame.SRCALPHA)
         pygame.draw.rect(highlight_surface, (*highlight_color, 120), (0, 0, highlight_rect.width, highlight_rect.height), border_radius=corner_radius-2)
-        self.screen.blit(highlight_surface, highlight_rect)
+        surface.blit(highlight_surface, highlight_rect)
         
         # 绘制顶部高光条
         top_highlight = pygame.Rect(rect.x + 6, rect.y + 6, rect.width - 12, 8)
         top_surface = pygame.Surface((top_highlight.width, top_highlight.height), pygame.SRCALPHA)
         pygame.draw.rect(top_surface, (*highlight_color, 80), (0, 0, top_highlight.width, top_highlight.height), border_radius=corner_radius-3)
-        self.screen.blit(top_surface, top_highlight)
+        surface.blit(top_surface, top_highlight)
         
         # 绘制左侧高光条
         left_highlight = pygame.Rect(rect.x + 6, rect.y + 6, 8, rect.height - 12)
         left_surface = pygame.Surface((left_highlight.width, left_highlight.height), pygame.SRCALPHA)
         pygame.draw.rect(left_surface, (*highlight_color, 60), (0, 0, left_highlight.width, left_highlight.height), border_radius=corner_radius-3)
-        self.screen.blit(left_surface, left_highlight)
+        surface.blit(left_surface, left_highlight)
+    
+    def draw_cell(self, row: int, col: int):
+        """绘制单个网格单元（色块、特效、边框、选中和提示）"""
+        if row <= self.falling.columns.get(col, -1):
+            return  # 由掉落竖条绘制
+        
+        rect = self.get_cell_rect(row, col)
+        color = self.grid[row][col]
+        
+        # 绘制背景
+        if color is None:
+            pygame.draw.rect(self.screen, Color.BLACK.value, rect)
+        else:
+            # 普通色块和特殊色块底色都使用缓存图块
+            self.draw_rounded_3d_block(rect, color)
+            
+            # 特殊色块动态效果
+            if color in EFFECT_LOOPS:
+                self.draw_block_effects(rect, color)
+        
+        # 绘制边框
+        self.draw_cell_frame(rect, Color.GRAY.value, 2)
+        
+        # 绘制悬停预览
+        if (row, col) in self.hover_cells:
+            self.draw_cell_frame(rect, Color.BLACK.value, 3)
+        
+        # 绘制选中状态
+        if (row, col) in self.selected_cells:
+            self.draw_cell_frame(rect, Color.WHITE.value, 4)
+        
+        # 绘制提示
+        if (row, col) in self.hint_cells:
+            self.draw_cell_frame(rect, Color.GOLD.value, 4)
+    
+    def draw_cell_frame(self, rect: pygame.Rect, color, width: int):
+        """绘制单元格边框：用四条填充矩形，被脏矩形裁剪时不会在裁剪边缘多画一条边"""
+        self.screen.fill(color, (rect.left, rect.top, rect.width, width))
+        self.screen.fill(color, (rect.left, rect.bottom - width, rect.width, width))
+        self.screen.fill(color, (rect.left, rect.top, width, rect.height))
+        self.screen.fill(color, (rect.right - width, rect.top, width, rect.height))
     
     def draw(self):
         """绘制游戏画面"""
+        if self.use_dirty_rects and not self.full_redraw:
+            self.draw_dirty()
+            return
+        
         self.screen.fill(Color.WHITE.value)
         
-        # 绘制网格
-        for row in range(self.GRID_SIZE):
-            for col in range(self.GRID_SIZE):
-                rect = self.get_cell_rect(row, col)
-                
-                # 绘制背景
-                if self.grid[row][col] is None:
-                    pygame.draw.rect(self.screen, Color.BLACK.value, rect)
-                else:
-                    # 普通色块使用立体圆角效果，特殊色块保持原有绘制
-                    if self.grid[row][col] in [Color.RED, Color.GREEN, Color.BLUE, Color.ORANGE, Color.PINK]:
-                        self.draw_rounded_3d_block(rect, self.grid[row][col])
-                    else:
-                        pygame.draw.rect(self.screen, self.grid[row][col].value, rect)
-                    
-                    # 特殊色块动态效果
-                    if self.grid[row][col] == Color.GOLD:
-                        self.draw_gold_effects(rect)
-                    elif self.grid[row][col] == Color.DIAMOND:
-                        self.draw_diamond_effects(rect)
-                    elif self.grid[row][col] == Color.COLORFUL:
-                        self.draw_colorful_effects(rect)
-                    elif self.grid[row][col] == Color.PEARL:
-                        self.draw_pearl_effects(rect)
-                
-                # 绘制边框
-                pygame.draw.rect(self.screen, Color.GRAY.value, rect, 2)
-                
-                # 绘制选中状态
-                if (row, col) in self.selected_cells:
-                    pygame.draw.rect(self.screen, Color.WHITE.value, rect, 4)
+        # 只绘制视口内可见的单元格，特效裁剪在棋盘区域内
+        self.screen.set_clip(self.board_rect())
+        for row, col in self.visible_cells():
+            self.draw_cell(row, col)
+        self.draw_falling()
         
         # 绘制消除效果
-        for effect in self.elimination_effects:
-            self.draw_elimination_effect(effect)
+        self.draw_elimination_effects()
+        self.screen.set_clip(None)
         
         # 绘制UI信息
         self.draw_ui()
         
+        self.remember_drawn_state()
+        self.full_redraw = False
         pygame.display.flip()
     
+    def draw_dirty(self):
+        """只重绘发生变化的区域，并用display.update提交这些矩形"""
+        dirty_rects = self.collect_dirty_rects()
+        self.remember_drawn_state()
+        if not dirty_rects:
+            return
+        
+        # 脏矩形太多时整屏重绘更省
+        if len(dirty_rects) > self.MAX_DIRTY_RECTS:
+            self.full_redraw = True
+            self.draw()
+            return
+        
+        for region in dirty_rects:
+            self.redraw_region(region)
+        pygame.display.update(dirty_rects)
+    
+    def cell_draw_state(self, row: int, col: int):
+        """单元格的可见状态：颜色、是否选中、是否提示、是否在悬停预览中"""
+        return (self.grid[row][col], (row, col) in self.selected_cells, (row, col) in self.hint_cells,
+                (row, col) in self.hover_cells)
+    
+    def ui_draw_state(self):
+        """计分区和道具区的可见状态"""
+        return (self.score, self.eliminated_count, self.state, self.no_moves,
+                self.hammer_count, self.is_hammer_mode, self.hover_points)
+    
+    def remember_drawn_state(self):
+        """记录本帧绘制的内容，供下一帧比较"""
+        self.drawn_cells = {cell: self.cell_draw_state(*cell) for cell in self.visible_cells()}
+        self.drawn_ui_state = self.ui_draw_state()
+        self.drawn_effect_bounds = self.elimination_effects.bounds()
+        self.drawn_fall_regions = self.fall_regions()
+        self.drawn_animation_clock = self.animation_clock
+    
+    def collect_dirty_rects(self) -> List[pygame.Rect]:
+        """比较上一帧的绘制状态，收集需要重绘的矩形"""
+        dirty_rects = []
+        pad = EFFECT_PADDING
+        drawn_clock = self.drawn_animation_clock
+        # 特殊色块只在图集帧切换时重绘
+        effect_changed = {color: (effect_frame_index(color, drawn_clock) !=
+                                  effect_frame_index(color, self.animation_clock))
+                          for color in EFFECT_LOOPS}
+        
+        # 视口内消除、掉落、选中、提示和动画中的特殊色块（特效会溢出到相邻单元格）
+        for row, col in self.visible_cells():
+            state = self.cell_draw_state(row, col)
+            if state != self.drawn_cells.get((row, col)) or effect_changed.get(state[0], False):
+                dirty_rects.append(self.get_cell_rect(row, col).inflate(pad * 2, pad * 2))
+        
+        # 消除效果：上一帧和这一帧所有粒子覆盖区域的外接矩形（一次大面积消除只产生一个矩形）
+        for bounds in (self.drawn_effect_bounds, self.elimination_effects.bounds()):
+            if bounds is not None:
+                dirty_rects.append(bounds)
+        
+        # 掉落竖条：上一帧和这一帧每列的掉落路径（落地那一帧按单元格重绘）
+        dirty_rects.extend(self.drawn_fall_regions)
+        dirty_rects.extend(self.fall_regions())
+        
+        # 计分区和道具区（包括锤子模式切换）
+        if self.ui_draw_state() != self.drawn_ui_state:
+            dirty_rects.append(self.score_area_rect())
+            dirty_rects.append(self.tool_area_rect())
+        
+        return dirty_rects
+    
+    def redraw_region(self, region: pygame.Rect):
+        """按整屏绘制的顺序重绘一个区域（裁剪到该区域）"""
+        self.screen.set_clip(region)
+        self.screen.fill(Color.WHITE.value)
+        
+        # 只绘制特效可能覆盖到该区域的可见单元格，裁剪在棋盘区域内
+        self.screen.set_clip(region.clip(self.board_rect()))
+        pad = EFFECT_PADDING
+        step = self.CELL_SIZE + self.GRID_MARGIN
+        first_row, last_row, first_col, last_col = self.visible_range()
+        board_left = self.GRID_MARGIN - self.view_x
+        board_top = self.SCORE_HEIGHT + self.GRID_MARGIN - self.view_y
+        first_col = max(first_col, (region.left - pad - board_left) // step - 1)
+        last_col = min(last_col, (region.right + pad - board_left) // step + 1)
+        first_row = max(first_row, (region.top - pad - board_top) // step - 1)
+        last_row = min(last_row, (region.bottom + pad - board_top) // step + 1)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                self.draw_cell(row, col)
+        
+        self.draw_falling(region)
+        self.draw_elimination_effects(region)
+        self.screen.set_clip(region)
+        
+        if region.colliderect(self.score_area_rect()) or region.colliderect(self.tool_area_rect()):
+            self.draw_ui()
+        
+        self.screen.set_clip(None)
+    
+    def score_area_rect(self) -> pygame.Rect:
+        """上方计分区域"""
+        return pygame.Rect(0, 0, self.WINDOW_WIDTH, self.SCORE_HEIGHT)
+    
+    def tool_area_rect(self) -> pygame.Rect:
+        """下方道具区域"""
+        return pygame.Rect(0, self.SCORE_HEIGHT + self.BOARD_PIXELS, self.WINDOW_WIDTH, self.TOOL_HEIGHT)
+    
     def draw_ui(self):
         """绘制UI信息"""
         # 上方计分区域
@@ -1133,13 +1243,24 @@ class MatchThreeGame:
         if self.state == GameState.FALLING:
             status_text = self.font.render("Falling...", True, Color.BLACK.value)
             self.screen.blit(status_text, (450, score_y))
+        elif self.state == GameState.GAME_OVER:
+            status_text = self.font.render("Game Over", True, Color.BLACK.value)
+            self.screen.blit(status_text, (450, score_y))
+        elif self.no_moves:
+            status_text = self.font.render("No moves!", True, Color.BLACK.value)
+            self.screen.blit(status_text, (450, score_y))
+        
+        # 悬停预览的分数
+        if self.hover_points:
+            preview_text = self.font.render(f"+{self.hover_points}", True, Color.BLACK.value)
+            self.screen.blit(preview_text, (10, score_y + 35))
         
         # 下方道具区域
         self.draw_tools()
     
     def draw_tools(self):
         """绘制道具区域"""
-        tool_area_start_y = self.SCORE_HEIGHT + self.GRID_SIZE * (self.CELL_SIZE + self.GRID_MARGIN) + self.GRID_MARGIN
+        tool_area_start_y = self.tool_area_rect().y
         
         # 绘制道具区域背景
         tool_rect = pygame.Rect(0, tool_area_start_y, self.WINDOW_WIDTH, self.TOOL_HEIGHT)
@@ -1220,53 +1341,141 @@ class MatchThreeGame:
         )
         pygame.draw.rect(self.screen, (220, 220, 220), highlight)
     
-    def handle_events(self):
+    def handle_events(self, events=None):
         """处理游戏事件"""
-        for event in pygame.event.get():
+        if events is None:
+            events = pygame.event.get()
+        
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
             
+            elif event.type in (pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+                # 失去焦点或最小化时暂停渲染
+                self.window_active = False
+                logger.info("窗口失去焦点，暂停渲染")
+            
+            elif event.type in (pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED, pygame.WINDOWSHOWN):
+                if not self.window_active:
+                    self.window_active = True
+                    self.full_redraw = True
+                    logger.info("窗口恢复焦点，继续渲染")
+            
+            elif event.type == pygame.MOUSEMOTION:
+                self.update_hover(event.pos)
+            
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # 左键点击
                     self.handle_click(event.pos)
             
-            elif event.type == pygame.USEREVENT + 1:
-                # 掉落动画完成
-                self.state = GameState.PLAYING
-                pygame.time.set_timer(pygame.USEREVENT + 1, 0)  # 取消定时器
-                logger.info("掉落动画完成")
+            elif event.type == pygame.MOUSEWHEEL:
+                # 滚轮滚动视口，按住Ctrl时缩放
+                if pygame.key.get_mods() & pygame.KMOD_CTRL:
+                    self.zoom_view(event.y * 4)
+                else:
+                    step = self.CELL_SIZE + self.GRID_MARGIN
+                    self.scroll_view(event.x * step * 3, -event.y * step * 3)
+            
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                # 窗口被遮挡后重新显示，需要整屏重绘
+                self.full_redraw = True
             
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     # 重置游戏
                     self.reset_game()
+                elif event.key == pygame.K_h:
+                    # 显示提示
+                    self.show_hint()
+                elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+                    # Ctrl+Z撤销，Ctrl+Shift+Z重做
+                    if event.mod & pygame.KMOD_SHIFT:
+                        self.redo()
+                    else:
+                        self.undo()
+                elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+                    self.redo()
+                elif event.key in self.SCROLL_KEYS:
+                    # 方向键按单元格滚动视口
+                    dx, dy = self.SCROLL_KEYS[event.key]
+                    step = self.CELL_SIZE + self.GRID_MARGIN
+                    self.scroll_view(dx * step, dy * step)
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                    self.zoom_view(4)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self.zoom_view(-4)
         
         return True
     
+    def load_next_board(self):
+        """从棋盘库载入下一个棋盘，用完后从头循环"""
+        board = self.boards[self.board_index % len(self.boards)]
+        self.board_index += 1
+        codes = board.codes()
+        self.engine.load_board(codes, board.seed, board.score)
+        if self.replay is not None:
+            self.replay.board(codes, board.seed, board.score)
+    
     def reset_game(self):
-        """重置游戏"""
-        self.generate_grid()
+        """重置游戏（有棋盘库时换下一个棋盘）"""
+        if self.boards is not None:
+            self.load_next_board()
+        else:
+            self.engine.reset()
+            if self.replay is not None:
+                self.replay.reset()
+        self.full_redraw = True
         self.selected_cells.clear()
-        self.score = 0
-        self.eliminated_count = 0
+        self.hint_cells.clear()
+        self.no_moves = False
         self.state = GameState.PLAYING
+        self.falling.clear()
+        self.pending_clicks.clear()
         self.elimination_effects.clear()
-        self.gold_animation_timer = 0       # 重置黄金动画计时器
-        self.gold_glow_intensity = 0
-        self.diamond_animation_timer = 0    # 重置钻石动画计时器
-        self.diamond_glow_intensity = 0
-        self.colorful_animation_timer = 0   # 重置彩色动画计时器
-        self.colorful_glow_intensity = 0
-        self.pearl_animation_timer = 0      # 重置珍珠动画计时器
-        self.pearl_glow_intensity = 0
+        self.animation_clock = 0            # 重置特殊色块动画时钟
         
         # 重置道具状态
-        self.hammer_count = 3
         self.is_hammer_mode = False
         self.create_finger_cursor()  # 恢复普通鼠标
+        self.update_hover()
         
         logger.info("游戏重置")
     
+    def update_bot(self):
+        """让机器人推进思考，得到操作后像玩家一样点击"""
+        if self.bot is None or self.state != GameState.PLAYING or self.elimination_effects:
+            return
+        
+        move = self.bot.poll(self.engine)
+        if move is None:
+            return
+        
+        kind, row, col = move
+        # 大棋盘上目标可能在视口外，先滚动过去，确认点击能落在目标单元格上再切换锤子模式
+        self.scroll_to_cell(row, col)
+        pos = self.get_cell_rect(row, col).center
+        if self.get_cell_at_pos(pos) != (row, col):
+            logger.warning(f"🤖 机器人操作的单元格不在视口内: ({row}, {col})")
+            return
+        if (kind == 'hammer') != self.is_hammer_mode:
+            self.toggle_hammer_mode()
+        logger.debug("🤖 机器人操作: %s (%d, %d)", kind, row, col)
+        self.handle_click(pos)
+    
+    def is_animating(self) -> bool:
+        """是否有消除效果、掉落或特殊色块动画需要按60 FPS刷新"""
+        if self.elimination_effects or self.state == GameState.FALLING:
+            return True
+        grid = self.grid
+        return any(grid[row][col] in EFFECT_LOOPS for row, col in self.visible_cells())
+    
+    def wait_for_events(self, timeout: int) -> list:
+        """阻塞等待下一个事件（timeout为0时一直等待），返回收到的全部事件"""
+        event = pygame.event.wait(timeout)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events.extend(pygame.event.get())
+        return events
+    
     def run(self):
         """游戏主循环"""
         clock = pygame.time.Clock()
@@ -1275,23 +1484,63 @@ class MatchThreeGame:
         logger.info("游戏开始")
         
         while running:
-            running = self.handle_events()
+            if not self.window_active:
+                # 失去焦点：阻塞等待事件，不更新也不渲染
+                events = self.wait_for_events(0)
+            elif not self.is_animating() and self.bot is None:
+                # 画面静止：阻塞等待输入，最多每IDLE_WAIT_MS毫秒醒来一次
+                events = self.wait_for_events(self.IDLE_WAIT_MS)
+            else:
+                events = None
+            
+            running = self.handle_events(events)
+            if not running or not self.window_active:
+                continue
+            
             self.update_elimination_effects()
-            self.update_gold_animation()     # 更新黄金色块动画
-            self.update_diamond_animation()  # 更新钻石色块动画
-            self.update_colorful_animation() # 更新彩色色块动画
-            self.update_pearl_animation()    # 更新珍珠色块动画
+            self.update_falling()
+            self.update_animation()          # 更新特殊色块动画时钟
+            self.update_bot()
             self.draw()
             clock.tick(60)  # 60 FPS
         
         logger.info("游戏结束")
+        if self.engine.journal is not None:
+            try:
+                self.engine.journal.close()
+            except RuntimeError as e:
+                # 日志写入失败不影响保存回放
+                logger.error(f"{e}: {e.__cause__!r}")
+        if self.bot is not None:
+            self.bot.close()
+        if self.replay is not None:
+            from match_three_replay import save_replay
+            self.replay.finish(self.engine)
+            save_replay(self.replay_path, self.replay)
+            logger.info(f"回放已保存: {self.replay_path}")
         pygame.quit()
         sys.exit()
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="三消游戏")
+    parser.add_argument('--seed', type=int, default=None, help="随机数种子")
+    parser.add_argument('--size', type=int, default=10, help="棋盘边长（100到1000的大棋盘可滚动和缩放）")
+    parser.add_argument('--boards', default=None, help="从棋盘库文件依次载入开局棋盘（棋盘尺寸由文件决定）")
+    parser.add_argument('--journal', default=None, help="把事件写入二进制日志文件")
+    parser.add_argument('--record', default=None, help="把对局回放追加到回放库文件")
+    parser.add_argument('--bot', choices=['random', 'greedy', 'rollout'], default=None, help="由机器人自动游玩")
+    parser.add_argument('--bot-budget', type=float, default=0.5, help="蒙特卡洛机器人每步的时间预算（秒）")
+    args = parser.parse_args()
+    
     try:
-        game = MatchThreeGame()
+        bot = None
+        if args.bot:
+            from match_three_bot import create_bot
+            bot = create_bot(args.bot, args.seed, args.bot_budget)
+        game = MatchThreeGame(seed=args.seed, journal_path=args.journal,
+                              replay_path=args.record, bot=bot, grid_size=args.size,
+                              boards_path=args.boards)
         game.run()
     except Exception as e:
         logger.error(f"游戏运行错误: {e}")
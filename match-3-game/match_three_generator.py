@@ -0,0 +1,207 @@
+"""满足约束的三消棋盘批量生成
+
+引擎的 generate_grid 逐格随机取色，不保证棋盘好玩。这里按约束生成开局棋盘：
+    - 颜色分布：每种颜色的格子数按目标比例精确分配（最大余数取整），再整批随机打乱位置
+    - 最少可消除组数：至少2个色块的同色连通组的数量
+    - 最大连通组：最大同色连通组的色块数上限
+
+每次生成一批（默认4096个）棋盘，用整批数组运算标记所有棋盘的连通分量（最小标签传播加指针跳跃），
+一次算出每个棋盘的组数和最大组，不满足约束的整批剔除。各批分配到进程池，结果按棋盘库格式
+（match_three_boards）写出，每个棋盘的种子互不相同，载入后的新色块由种子决定。
+
+命令行生成每日挑战棋盘库：
+    python3 match_three_generator.py daily.m3b --count 200000 --min-groups 20 --max-group 6 \\
+        --colors RED=0.3 GREEN=0.2 BLUE=0.2 ORANGE=0.15 PINK=0.15
+    python3 match_three_game.py --boards daily.m3b
+需要numpy（已列在requirements.txt中）。
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from match_three_boards import BoardWriter
+from match_three_engine import COLOR_CODES, NORMAL_COLORS, Color
+
+BATCH_SIZE = 4096    # 每次整批检查的棋盘数
+CHUNK_SIZE = 16384   # 每个进程池任务产出的棋盘数
+MAX_ATTEMPTS = 1000  # 一个任务连续这么多批都没有棋盘满足约束时放弃
+
+
+class BoardConstraints:
+    """开局棋盘的约束：颜色分布、最少可消除组数和最大连通组"""
+
+    def __init__(self, rows: int = 10, cols: int = 10, colors: Optional[Dict[Color, float]] = None,
+                 min_groups: int = 0, max_group_size: Optional[int] = None):
+        colors = colors or {color: 1.0 for color in NORMAL_COLORS}
+        if Color.COLORFUL in colors:
+            # 彩色万能色块与所有颜色相连，同色连通组的约束对它没有意义
+            raise ValueError("颜色分布不能包含彩色万能色块")
+        if any(weight < 0 for weight in colors.values()) or sum(colors.values()) <= 0:
+            raise ValueError(f"颜色比例必须非负且不全为0: {colors}")
+        self.rows = rows
+        self.cols = cols
+        self.colors = dict(colors)
+        self.min_groups = min_groups
+        self.max_group_size = max_group_size
+
+    def color_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """每种颜色的 (编码, 格子数)，格子数按比例最大余数取整，总和正好是格子数"""
+        cells = self.rows * self.cols
+        codes = np.array([COLOR_CODES[color] for color in self.colors], dtype=np.uint8)
+        weights = np.array(list(self.colors.values()), dtype=np.float64)
+        exact = weights / weights.sum() * cells
+        counts = np.floor(exact).astype(np.int64)
+        remainder = cells - counts.sum()
+        counts[np.argsort(counts - exact, kind='stable')[:remainder]] += 1
+        return codes, counts
+
+
+def _propagate(labels: np.ndarray, down: np.ndarray, right: np.ndarray, cells: int) -> np.ndarray:
+    """一轮标签传播：与同色邻居取较小的标签，再做一次指针跳跃"""
+    new = labels.copy()
+    np.minimum(new[:, 1:, :], np.where(down, labels[:, :-1, :], cells), out=new[:, 1:, :])
+    np.minimum(new[:, :-1, :], np.where(down, labels[:, 1:, :], cells), out=new[:, :-1, :])
+    np.minimum(new[:, :, 1:], np.where(right, labels[:, :, :-1], cells), out=new[:, :, 1:])
+    np.minimum(new[:, :, :-1], np.where(right, labels[:, :, 1:], cells), out=new[:, :, :-1])
+    # 标签是同一分量中某个格子的索引，直接取那个格子的标签
+    flat = new.reshape(len(new), cells)
+    offsets = (np.arange(len(new), dtype=np.int64) * cells)[:, None]
+    flat[:] = flat.ravel()[(flat + offsets).ravel()].reshape(flat.shape)
+    return new
+
+
+def label_components(codes: np.ndarray) -> np.ndarray:
+    """(棋盘数, 行, 列) 的同色4邻域连通分量标签：每个格子标为所在分量中最小的扁平索引"""
+    boards, rows, cols = codes.shape
+    cells = rows * cols
+    dtype = np.int16 if cells < 2 ** 15 else np.int32
+    labels = np.broadcast_to(np.arange(cells, dtype=dtype).reshape(rows, cols), codes.shape).copy()
+    down = codes[:, 1:, :] == codes[:, :-1, :]
+    right = codes[:, :, 1:] == codes[:, :, :-1]
+
+    # 大多数棋盘几轮就收敛，只继续传播上一轮还有变化的棋盘
+    changing = np.arange(boards)
+    while changing.size:
+        if changing.size == boards:
+            current, new = labels, _propagate(labels, down, right, cells)
+            labels = new
+        else:
+            current = labels[changing]
+            new = _propagate(current, down[changing], right[changing], cells)
+            labels[changing] = new
+        changing = changing[(new != current).reshape(len(new), -1).any(axis=1)]
+    return labels
+
+
+def board_stats(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """每个棋盘的 (可消除组数, 最大连通组的色块数)"""
+    boards, rows, cols = codes.shape
+    cells = rows * cols
+    labels = label_components(codes).reshape(boards, cells)
+    offsets = (np.arange(boards, dtype=np.int64) * cells)[:, None]
+    sizes = np.bincount((labels + offsets).ravel(), minlength=boards * cells).reshape(boards, cells)
+    return (sizes >= 2).sum(axis=1), sizes.max(axis=1)
+
+
+def accepted(codes: np.ndarray, constraints: BoardConstraints) -> np.ndarray:
+    """整批检查约束，返回每个棋盘是否满足"""
+    groups, largest = board_stats(codes)
+    mask = groups >= constraints.min_groups
+    if constraints.max_group_size is not None:
+        mask &= largest <= constraints.max_group_size
+    return mask
+
+
+def random_boards(rng: np.random.Generator, constraints: BoardConstraints, count: int) -> np.ndarray:
+    """按颜色分布生成 (数量, 行, 列) 的棋盘：每个棋盘的颜色格子数相同，位置随机"""
+    codes, counts = constraints.color_counts()
+    base = np.repeat(codes, counts)
+    boards = rng.permuted(np.broadcast_to(base, (count, base.size)), axis=1)
+    return boards.reshape(count, constraints.rows, constraints.cols)
+
+
+def generate_chunk(constraints: BoardConstraints, seed, count: int,
+                   batch_size: int = BATCH_SIZE) -> Tuple[np.ndarray, int]:
+    """在进程池中执行：生成 count 个满足约束的棋盘，返回 (棋盘, 检查过的棋盘总数)"""
+    rng = np.random.default_rng(seed)
+    found = []
+    total = 0
+    tried = 0
+    attempts = 0
+    while total < count:
+        boards = random_boards(rng, constraints, batch_size)
+        good = boards[accepted(boards, constraints)]
+        tried += batch_size
+        attempts = attempts + 1 if not len(good) else 0
+        if attempts >= MAX_ATTEMPTS:
+            raise RuntimeError(f"连续 {MAX_ATTEMPTS * batch_size} 个棋盘都不满足约束，请放宽约束")
+        found.append(good[:count - total])
+        total += len(found[-1])
+    return np.concatenate(found), tried
+
+
+def generate_boards(constraints: BoardConstraints, count: int, seed: int = 0,
+                    workers: Optional[int] = None) -> Iterator[Tuple[np.ndarray, int]]:
+    """按任务顺序产出 (棋盘, 检查过的棋盘数)，相同的种子和数量得到相同的棋盘（与进程数无关）"""
+    chunks = [min(CHUNK_SIZE, count - start) for start in range(0, count, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        for chunk_seed, size in zip(seeds, chunks):
+            yield generate_chunk(constraints, chunk_seed, size)
+        return
+    with ProcessPoolExecutor(min(workers, len(chunks)), mp_context=multiprocessing.get_context('spawn')) as pool:
+        yield from pool.map(generate_chunk, [constraints] * len(chunks), seeds, chunks)
+
+
+def write_corpus(path: str, constraints: BoardConstraints, count: int, seed: int = 0,
+                 workers: Optional[int] = None) -> int:
+    """生成 count 个棋盘写入棋盘库，棋盘的种子是 seed + 序号，返回检查过的棋盘总数"""
+    tried = 0
+    with BoardWriter(path, constraints.rows, constraints.cols) as writer:
+        for boards, chunk_tried in generate_boards(constraints, count, seed, workers):
+            start = seed + writer.count
+            writer.write_batch(boards, np.arange(start, start + len(boards), dtype=np.uint64))
+            tried += chunk_tried
+    return tried
+
+
+def _parse_colors(items) -> Optional[Dict[Color, float]]:
+    if not items:
+        return None
+    colors = {}
+    for item in items:
+        name, value = item.split('=')
+        colors[Color[name.upper()]] = float(value)
+    return colors
+
+
+def main():
+    """命令行：生成满足约束的棋盘库"""
+    parser = argparse.ArgumentParser(description="按约束批量生成三消棋盘库")
+    parser.add_argument('corpus_path')
+    parser.add_argument('--count', type=int, default=100000, help="棋盘数量")
+    parser.add_argument('--size', type=int, default=10, help="棋盘边长")
+    parser.add_argument('--min-groups', type=int, default=1, help="最少可消除组数")
+    parser.add_argument('--max-group', type=int, default=None, help="最大连通组的色块数上限")
+    parser.add_argument('--colors', nargs='*', metavar='COLOR=P', help="颜色比例，例如 RED=0.3 GOLD=0.02")
+    parser.add_argument('--seed', type=int, default=0, help="随机数种子，也是第一个棋盘的种子")
+    parser.add_argument('--workers', type=int, default=None, help="进程池大小，默认CPU核数")
+    args = parser.parse_args()
+
+    constraints = BoardConstraints(args.size, args.size, _parse_colors(args.colors),
+                                   args.min_groups, args.max_group)
+    start = time.perf_counter()
+    tried = write_corpus(args.corpus_path, constraints, args.count, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"生成 {args.count} 个棋盘到 {args.corpus_path}，检查 {tried} 个（通过率 {args.count / max(tried, 1) * 100:.1f}%），"
+          f"用时 {elapsed:.2f}s（{args.count / max(elapsed, 1e-9):.0f} 个/秒）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+"""三消游戏的二进制事件日志
+
+EventJournal 把点击、消除、新色块填充、特殊色块生成等事件放进队列，由后台线程打包写入文件，
+游戏线程只做一次入队操作。read_journal 用内存映射流式读取日志，convert_log 把旧的
+match_three_game.log 文本日志转换为同样的二进制格式。
+
+文件格式（小端）：
+    文件头  <4sHd   魔数 b'M3JL'、版本号、开始时间（Unix秒）
+    记录头  <BII    记录类型、载荷字节数、相对开始时间的毫秒数
+    载荷    见下方各记录类型
+
+版本1的消除分数是 <I、锤子数量是 <H，大棋盘上会溢出；版本2放宽为 <Q 和 <I。read_journal 两个版本都能读取。
+"""
+import argparse
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+
+from match_three_engine import CODE_COLORS, COLOR_CODES, EMPTY_CODE, Color
+
+MAGIC = b'M3JL'
+VERSION = 2
+FILE_HEADER = struct.Struct('<4sHd')
+RECORD_HEADER = struct.Struct('<BII')
+
+# 记录类型
+CLICK = 1          # <HH 行, 列
+ELIMINATE = 2      # <BQI 首个色块颜色编码, 分数, 色块数量 + 数量 × <HH 行, 列
+SPAWN = 3          # <HH 列, 数量 + 数量 × 颜色编码（从第0行开始）
+SPECIAL = 4        # <HHBB 行, 列, 特殊色块编码, 原色块编码
+HAMMER = 5         # <HHB 行, 列, 被敲碎的颜色编码
+NEW_GRID = 6       # <HH 行数, 列数 + 行数 × 列数 个颜色编码（转换的旧日志没有网格内容，行列数为0）
+HAMMER_REFILL = 7  # <I 锤子数量
+
+RECORD_NAMES = {
+    CLICK: 'click',
+    ELIMINATE: 'eliminate',
+    SPAWN: 'spawn',
+    SPECIAL: 'special',
+    HAMMER: 'hammer',
+    NEW_GRID: 'new_grid',
+    HAMMER_REFILL: 'hammer_refill',
+}
+
+CELL = struct.Struct('<HH')
+_ELIMINATE_HEAD = struct.Struct('<BQI')
+_SPECIAL = struct.Struct('<HHBB')
+_HAMMER = struct.Struct('<HHB')
+_HAMMER_REFILL = struct.Struct('<I')
+
+# 版本1的消除和锤子数量记录
+_ELIMINATE_HEAD_V1 = struct.Struct('<BII')
+_HAMMER_REFILL_V1 = struct.Struct('<H')
+
+JournalRecord = namedtuple('JournalRecord', ['kind', 'time_ms', 'data'])
+
+_STOP = object()
+
+
+def _code(color: Optional[Color]) -> int:
+    return COLOR_CODES[color] if color is not None else EMPTY_CODE
+
+
+def pack_record(kind: int, time_ms: int, payload: bytes) -> bytes:
+    """打包一条完整记录"""
+    return RECORD_HEADER.pack(kind, len(payload), time_ms) + payload
+
+
+def pack_eliminate(color: Optional[Color], points: int, cells: Sequence[Tuple[int, int]]) -> bytes:
+    payload = bytearray(_ELIMINATE_HEAD.pack(_code(color), points, len(cells)))
+    for row, col in cells:
+        payload += CELL.pack(row, col)
+    return bytes(payload)
+
+
+def pack_spawn(col: int, codes: Sequence[int]) -> bytes:
+    return CELL.pack(col, len(codes)) + bytes(codes)
+
+
+def pack_new_grid(codes: Sequence[Sequence[int]]) -> bytes:
+    rows = len(codes)
+    cols = len(codes[0]) if rows else 0
+    return CELL.pack(rows, cols) + b''.join(bytes(row) for row in codes)
+
+
+class EventJournal:
+    """后台线程写入的二进制事件日志
+
+    后台线程写入失败后不再写文件（继续取出队列中的记录丢弃，避免队列无限增长），
+    异常在下一次 flush() 或 close() 时在调用方线程重新抛出。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._queue = queue.SimpleQueue()
+        self._error: Optional[BaseException] = None
+        self._file = open(path, 'wb')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, self.start_time))
+        self._writer = threading.Thread(target=self._write_loop, name='match3-journal', daemon=True)
+        self._writer.start()
+
+    def _now(self) -> int:
+        return int((time.perf_counter() - self._start) * 1000)
+
+    # 游戏线程只入队原始数据，打包和写入都在后台线程完成
+    def click(self, row: int, col: int):
+        self._queue.put((CLICK, self._now(), (row, col)))
+
+    def eliminate(self, color: Color, points: int, cells: Set[Tuple[int, int]]):
+        self._queue.put((ELIMINATE, self._now(), (color, points, list(cells))))
+
+    def spawn(self, col: int, codes: List[int]):
+        self._queue.put((SPAWN, self._now(), (col, codes)))
+
+    def special(self, row: int, col: int, special: Color, replaced: Optional[Color]):
+        self._queue.put((SPECIAL, self._now(), (row, col, special, replaced)))
+
+    def hammer(self, row: int, col: int, color: Color):
+        self._queue.put((HAMMER, self._now(), (row, col, color)))
+
+    def new_grid(self, codes: List[List[int]]):
+        self._queue.put((NEW_GRID, self._now(), codes))
+
+    def hammer_refill(self, count: int):
+        self._queue.put((HAMMER_REFILL, self._now(), count))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, threading.Event):
+                # flush() 的标记：之前的记录都已处理
+                self._flush_file()
+                item.set()
+                continue
+            if self._error is not None:
+                continue
+            kind, time_ms, data = item
+            try:
+                self._file.write(pack_record(kind, time_ms, self._pack(kind, data)))
+            except Exception as e:
+                self._error = e
+        self._flush_file()
+
+    def _flush_file(self):
+        if self._error is None:
+            try:
+                self._file.flush()
+            except Exception as e:
+                self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"写入事件日志失败: {self.path}") from self._error
+
+    @staticmethod
+    def _pack(kind: int, data) -> bytes:
+        if kind == CLICK:
+            return CELL.pack(*data)
+        if kind == ELIMINATE:
+            return pack_eliminate(*data)
+        if kind == SPAWN:
+            return pack_spawn(*data)
+        if kind == SPECIAL:
+            row, col, special, replaced = data
+            return _SPECIAL.pack(row, col, _code(special), _code(replaced))
+        if kind == HAMMER:
+            row, col, color = data
+            return _HAMMER.pack(row, col, _code(color))
+        if kind == NEW_GRID:
+            return pack_new_grid(data)
+        if kind == HAMMER_REFILL:
+            return _HAMMER_REFILL.pack(data)
+        raise ValueError(f"未知的日志记录类型: {kind}")
+
+    def flush(self):
+        """等待队列中已有的记录写入文件，后台线程写入失败时抛出 RuntimeError"""
+        if self._file.closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        self._raise_error()
+
+    def close(self):
+        """写完队列中剩余的记录并关闭文件，后台线程写入失败时抛出 RuntimeError"""
+        if self._file.closed:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._file.close()
+        self._raise_error()
+
+
+def _unpack_payload(kind: int, buffer, offset: int, length: int, version: int = VERSION):
+    if kind == CLICK:
+        return CELL.unpack_from(buffer, offset)
+    if kind == ELIMINATE:
+        head = _ELIMINATE_HEAD if version >= 2 else _ELIMINATE_HEAD_V1
+        code, points, count = head.unpack_from(buffer, offset)
+        start = offset + head.size
+        cells = [CELL.unpack_from(buffer, start + i * CELL.size) for i in range(count)]
+        return CODE_COLORS[code], points, cells
+    if kind == SPAWN:
+        col, count = CELL.unpack_from(buffer, offset)
+        start = offset + CELL.size
+        return col, [CODE_COLORS[code] for code in buffer[start:start + count]]
+    if kind == SPECIAL:
+        row, col, special, replaced = _SPECIAL.unpack_from(buffer, offset)
+        return row, col, CODE_COLORS[special], CODE_COLORS[replaced]
+    if kind == HAMMER:
+        row, col, code = _HAMMER.unpack_from(buffer, offset)
+        return row, col, CODE_COLORS[code]
+    if kind == NEW_GRID:
+        rows, cols = CELL.unpack_from(buffer, offset)
+        start = offset + CELL.size
+        codes = buffer[start:start + rows * cols]
+        return [[CODE_COLORS[code] for code in codes[row * cols:(row + 1) * cols]] for row in range(rows)]
+    if kind == HAMMER_REFILL:
+        refill = _HAMMER_REFILL if version >= 2 else _HAMMER_REFILL_V1
+        return refill.unpack_from(buffer, offset)[0]
+    return bytes(buffer[offset:offset + length])
+
+
+def read_journal(path: str) -> Iterator[JournalRecord]:
+    """内存映射日志文件，逐条产出记录（不会一次性读入整个文件）"""
+    if os.path.getsize(path) < FILE_HEADER.size:
+        return
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        magic, version, _ = FILE_HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是三消事件日志文件: {path}")
+        if not 1 <= version <= VERSION:
+            raise ValueError(f"不支持的日志版本: {version}")
+
+        offset = FILE_HEADER.size
+        end = len(buffer)
+        while offset + RECORD_HEADER.size <= end:
+            kind, length, time_ms = RECORD_HEADER.unpack_from(buffer, offset)
+            offset += RECORD_HEADER.size
+            if offset + length > end:
+                break  # 最后一条记录未写完整
+            yield JournalRecord(kind, time_ms, _unpack_payload(kind, buffer, offset, length, version))
+            offset += length
+
+
+# 旧文本日志的解析规则
+_LOG_LINE = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - \w+ - (.*)$')
+_LOG_CLICK = re.compile(r'^点击坐标: \((\d+), (\d+)\)')
+_LOG_ELIMINATE = re.compile(r'消除了 (\d+) 个 ?(\w+?) ?色块，获得 (\d+) 分')
+_LOG_ELIMINATED_CELLS = re.compile(r'^消除坐标: \[(.*)\]')
+_LOG_CELL = re.compile(r'\((\d+), (\d+)\)')
+_LOG_SPAWN = re.compile(r'^在位置 \((\d+), (\d+)\) 生成新色块: (\w+)')
+_LOG_SPECIAL = re.compile(r'在位置 \((\d+), (\d+)\) 生成(黄金|钻石|彩色万能|珍珠)色块 \(原色块: (\w+)\)')
+_LOG_HAMMER = re.compile(r'使用锤子消除坐标 \((\d+), (\d+)\) 的 (\w+) 色块')
+_LOG_HAMMER_REFILL = re.compile(r'锤子数量重置为(\d+)个')
+
+# 日志中的中文名和旧版本颜色名（黄色、紫色后来换成了橙色、粉色）
+_COLOR_NAMES = {
+    '黄金': Color.GOLD,
+    '钻石': Color.DIAMOND,
+    '彩色': Color.COLORFUL,
+    '彩色万能': Color.COLORFUL,
+    '珍珠': Color.PEARL,
+    'YELLOW': Color.ORANGE,
+    'PURPLE': Color.PINK,
+    'None': None,
+}
+
+
+def _parse_color(name: str) -> Optional[Color]:
+    if name in _COLOR_NAMES:
+        return _COLOR_NAMES[name]
+    return Color[name]
+
+
+def convert_log(log_path: str, journal_path: str) -> int:
+    """把 match_three_game.log 文本日志转换为二进制事件日志，返回写入的记录数"""
+    start = None
+    count = 0
+
+    # 旧日志每个新色块一行，同一列连续的行合并成一条 SPAWN 记录
+    spawn_col = None
+    spawn_time = 0
+    spawn_colors = {}
+
+    # 文本日志先记消除分数、再记特殊色块和新色块，最后才记消除坐标；
+    # 消除记录等拿到坐标后再写出，之间的记录先缓存
+    pending_eliminate = None
+    pending_records = []
+
+    with open(log_path, encoding='utf-8') as log, open(journal_path, 'wb') as out:
+
+        def emit(kind, time_ms, payload):
+            nonlocal count
+            if pending_eliminate is not None:
+                pending_records.append((kind, time_ms, payload))
+            else:
+                out.write(pack_record(kind, time_ms, payload))
+                count += 1
+
+        def flush_spawn():
+            nonlocal spawn_col
+            if spawn_col is not None:
+                codes = [_code(spawn_colors[row]) for row in sorted(spawn_colors)]
+                emit(SPAWN, spawn_time, pack_spawn(spawn_col, codes))
+                spawn_col = None
+                spawn_colors.clear()
+
+        def flush_eliminate(cells):
+            nonlocal pending_eliminate, count
+            if pending_eliminate is None:
+                return
+            time_ms, color, points = pending_eliminate
+            pending_eliminate = None
+            out.write(pack_record(ELIMINATE, time_ms, pack_eliminate(color, points, cells)))
+            count += 1
+            for kind, record_ms, payload in pending_records:
+                out.write(pack_record(kind, record_ms, payload))
+                count += 1
+            pending_records.clear()
+
+        for line in log:
+            match = _LOG_LINE.match(line.rstrip('\n'))
+            if not match:
+                continue
+
+            timestamp = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S,%f').timestamp()
+            if start is None:
+                start = timestamp
+                out.write(FILE_HEADER.pack(MAGIC, VERSION, start))
+            time_ms = int((timestamp - start) * 1000)
+            message = match.group(2)
+
+            spawn = _LOG_SPAWN.match(message)
+            if spawn:
+                row, col = int(spawn.group(1)), int(spawn.group(2))
+                if col != spawn_col:
+                    flush_spawn()
+                    spawn_col = col
+                    spawn_time = time_ms
+                spawn_colors[row] = _parse_color(spawn.group(3))
+                continue
+            flush_spawn()
+
+            click = _LOG_CLICK.match(message)
+            hammer = _LOG_HAMMER.search(message)
+            eliminate = _LOG_ELIMINATE.search(message)
+            special = _LOG_SPECIAL.search(message)
+            refill = _LOG_HAMMER_REFILL.search(message)
+
+            if _LOG_ELIMINATED_CELLS.match(message):
+                flush_eliminate([(int(r), int(c)) for r, c in _LOG_CELL.findall(message)])
+            elif click:
+                flush_eliminate([])
+                emit(CLICK, time_ms, CELL.pack(int(click.group(1)), int(click.group(2))))
+            elif hammer:
+                flush_eliminate([])
+                row, col, name = hammer.groups()
+                emit(HAMMER, time_ms, _HAMMER.pack(int(row), int(col), _code(_parse_color(name))))
+            elif eliminate:
+                flush_eliminate([])
+                _, name, points = eliminate.groups()
+                pending_eliminate = (time_ms, _parse_color(name), int(points))
+            elif special:
+                row, col, name, replaced = special.groups()
+                emit(SPECIAL, time_ms, _SPECIAL.pack(int(row), int(col), _code(_parse_color(name)),
+                                                      _code(_parse_color(replaced))))
+            elif refill:
+                emit(HAMMER_REFILL, time_ms, _HAMMER_REFILL.pack(int(refill.group(1))))
+            elif '生成了新的游戏网格' in message:
+                flush_eliminate([])
+                emit(NEW_GRID, time_ms, CELL.pack(0, 0))
+
+        flush_spawn()
+        flush_eliminate([])
+        if start is None:
+            out.write(FILE_HEADER.pack(MAGIC, VERSION, time.time()))
+
+    return count
+
+
+def main():
+    """命令行：转换旧文本日志或打印二进制日志内容"""
+    parser = argparse.ArgumentParser(description="三消游戏二进制事件日志工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="把 match_three_game.log 转换为二进制日志")
+    convert_parser.add_argument('log_path')
+    convert_parser.add_argument('journal_path')
+
+    dump_parser = subparsers.add_parser('dump', help="逐条打印二进制日志")
+    dump_parser.add_argument('journal_path')
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        count = convert_log(args.log_path, args.journal_path)
+        print(f"写入 {count} 条记录到 {args.journal_path}")
+    else:
+        for record in read_journal(args.journal_path):
+            print(f"{record.time_ms:>10} {RECORD_NAMES.get(record.kind, record.kind)} {record.data}")
+
+
+if __name__ == '__main__':
+    main()
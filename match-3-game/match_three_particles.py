@@ -0,0 +1,126 @@
+"""三消消除效果的粒子池
+
+每个被消除的色块产生一个粒子：从单元格大小放大到1.5倍并逐渐淡出。ParticlePool 用结构数组
+（中心坐标、尺寸、剩余帧数、颜色各一个数组）保存粒子，容量用完时整体翻倍，活跃粒子始终紧凑地
+排在前 count 个位置，消失时和最后一个交换删除，每帧不分配新对象。每种 (颜色, 尺寸) 的各帧精灵
+预先缩放、预先乘好透明度并缓存，绘制时只有 blit。
+"""
+from array import array
+from typing import List, Optional
+
+import pygame
+
+LIFETIME = 30   # 效果持续帧数
+GROWTH = 0.5    # 结束时放大到 1 + GROWTH 倍
+
+
+class ParticlePool:
+    """结构数组保存的消除效果粒子池，容量不够时翻倍"""
+
+    def __init__(self, capacity: int = 1024, lifetime: int = LIFETIME):
+        self.capacity = capacity
+        self.lifetime = lifetime
+        self.count = 0
+
+        # 结构数组：第 i 个粒子的中心、原始尺寸、剩余帧数和颜色
+        self.center_x = array('i', [0]) * capacity
+        self.center_y = array('i', [0]) * capacity
+        self.size = array('i', [0]) * capacity
+        self.timer = array('i', [0]) * capacity
+        self.color = [None] * capacity
+
+        # (颜色, 尺寸) -> 按剩余帧数索引的精灵列表
+        self.sprites = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def grow(self):
+        """容量翻倍（大棋盘一次消除上千个色块时），已有粒子保持原位"""
+        extra = self.capacity
+        for column in (self.center_x, self.center_y, self.size, self.timer):
+            column.extend(array('i', [0]) * extra)
+        self.color.extend([None] * extra)
+        self.capacity += extra
+
+    def spawn(self, rect: pygame.Rect, color):
+        """在单元格位置生成一个粒子，池已满时先扩容"""
+        i = self.count
+        if i >= self.capacity:
+            self.grow()
+        self.center_x[i] = rect.centerx
+        self.center_y[i] = rect.centery
+        self.size[i] = rect.width
+        self.timer[i] = self.lifetime
+        self.color[i] = color
+        self.count = i + 1
+
+    def update(self):
+        """所有粒子前进一帧，结束的粒子与末尾交换后删除"""
+        timer = self.timer
+        i = 0
+        while i < self.count:
+            timer[i] -= 1
+            if timer[i] > 0:
+                i += 1
+                continue
+            last = self.count - 1
+            self.center_x[i] = self.center_x[last]
+            self.center_y[i] = self.center_y[last]
+            self.size[i] = self.size[last]
+            timer[i] = timer[last]
+            self.color[i] = self.color[last]
+            self.color[last] = None
+            self.count = last
+
+    def clear(self):
+        for i in range(self.count):
+            self.color[i] = None
+        self.count = 0
+
+    def shift(self, dx: int, dy: int):
+        """视口滚动时平移所有粒子"""
+        for i in range(self.count):
+            self.center_x[i] += dx
+            self.center_y[i] += dy
+
+    def sprite(self, color, size: int, timer: int) -> pygame.Surface:
+        """取出预缩放、预淡出的精灵，首次用到该颜色和尺寸时渲染整套帧"""
+        key = (color, size)
+        frames = self.sprites.get(key)
+        if frames is None:
+            frames = [None] + [self.render_sprite(color, size, t) for t in range(1, self.lifetime + 1)]
+            self.sprites[key] = frames
+        return frames[timer]
+
+    def render_sprite(self, color, size: int, timer: int) -> pygame.Surface:
+        alpha = int(255 * (timer / self.lifetime))
+        new_size = int(size * (1 + (self.lifetime - timer) / self.lifetime * GROWTH))
+        surface = pygame.Surface((new_size, new_size), pygame.SRCALPHA)
+        surface.fill((*color.value, alpha))
+        return surface.convert_alpha()
+
+    def region(self, i: int) -> pygame.Rect:
+        """第 i 个粒子放大到最大时覆盖的区域"""
+        size = self.size[i]
+        rect = pygame.Rect(0, 0, size, size)
+        rect.center = (self.center_x[i], self.center_y[i])
+        return rect.inflate(size // 2 + 2, size // 2 + 2)
+
+    def bounds(self) -> Optional[pygame.Rect]:
+        """所有粒子覆盖区域的外接矩形，没有粒子时返回None"""
+        if not self.count:
+            return None
+        return self.region(0).unionall([self.region(i) for i in range(1, self.count)])
+
+    def draw(self, surface: pygame.Surface, region: Optional[pygame.Rect] = None):
+        """绘制所有粒子（指定区域时跳过与该区域不相交的粒子）"""
+        blits: List = []
+        for i in range(self.count):
+            sprite = self.sprite(self.color[i], self.size[i], self.timer[i])
+            half = sprite.get_width() // 2
+            dest = (self.center_x[i] - half, self.center_y[i] - half)
+            if region is not None and not region.colliderect(dest, sprite.get_size()):
+                continue
+            blits.append((sprite, dest))
+        surface.blits(blits, doreturn=False)
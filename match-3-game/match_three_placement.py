@@ -0,0 +1,92 @@
+"""特殊色块的放置
+
+消除后在消除区域的8邻域中随机选一个位置生成特殊色块。SpecialPlacer 为每种棋盘尺寸预先计算
+8邻域表（扁平索引 -> 相邻扁平索引），候选位置整批查表、去重、去掉被消除的格子，再按放置规则
+过滤颜色；安装numpy时这些步骤都是数组运算，大棋盘上的大面积消除没有逐格的Python开销。
+
+放置规则：特殊色块 -> 它可以替换的颜色。默认每种特殊色块都只替换非特殊色块。
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from match_three_engine import CODE_COLORS, SPECIAL_COLORS, Color
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 8邻域偏移（不含中心）
+NEIGHBOR_OFFSETS_8 = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0)]
+
+# 默认放置规则：特殊色块只替换非特殊色块
+DEFAULT_PLACEMENT_RULES: Dict[Color, Set[Color]] = {
+    special: {color for color in Color if color not in SPECIAL_COLORS} for special in SPECIAL_COLORS
+}
+
+
+@lru_cache(maxsize=4)
+def neighbor_table(rows: int, cols: int):
+    """每种棋盘尺寸的8邻域表：numpy可用时是 (rows*cols, 8) 的int32数组（棋盘外为-1），否则是元组表"""
+    if np is not None:
+        index = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols)
+        table = np.full((rows, cols, 8), -1, dtype=np.int32)
+        for k, (dr, dc) in enumerate(NEIGHBOR_OFFSETS_8):
+            target = table[max(0, -dr):rows - max(0, dr), max(0, -dc):cols - max(0, dc), k]
+            target[:] = index[max(0, dr):rows - max(0, -dr), max(0, dc):cols - max(0, -dc)]
+        return table.reshape(rows * cols, 8)
+
+    return tuple(
+        tuple((row + dr) * cols + col + dc for dr, dc in NEIGHBOR_OFFSETS_8
+              if 0 <= row + dr < rows and 0 <= col + dc < cols)
+        for row in range(rows) for col in range(cols)
+    )
+
+
+class SpecialPlacer:
+    """按放置规则在消除区域附近挑选特殊色块的候选位置"""
+
+    def __init__(self, rows: int, cols: int, rules: Optional[Dict[Color, Iterable[Color]]] = None):
+        self.rows = rows
+        self.cols = cols
+        self.table = neighbor_table(rows, cols)
+        self.rules = {special: set(colors) for special, colors in (rules or DEFAULT_PLACEMENT_RULES).items()}
+
+        self._marks = None
+
+        # 颜色编码 -> 是否可以被该特殊色块替换，供紧凑网格整批过滤
+        if np is not None:
+            self.replaceable_codes = {
+                special: np.array([color in colors for color in CODE_COLORS], dtype=bool)
+                for special, colors in self.rules.items()
+            }
+
+    def candidates(self, grid, cells: Iterable[Tuple[int, int]], special: Color) -> List[int]:
+        """消除区域8邻域中可以放置该特殊色块的位置（扁平索引，按行优先排序）"""
+        cols = self.cols
+        replaceable = self.rules.get(special)
+        flat = [row * cols + col for row, col in cells]
+        if not flat or not replaceable:
+            return []
+
+        if np is None:
+            around = set().union(*map(self.table.__getitem__, flat))
+            around.difference_update(flat)
+            return [i for i in sorted(around) if grid[i // cols][i % cols] in replaceable]
+
+        # 用常驻的标记数组去掉被消除的格子，耗时与消除的格子数成正比
+        if self._marks is None:
+            self._marks = np.zeros(self.rows * self.cols, dtype=bool)
+        marks = self._marks
+        eliminated = np.array(flat, dtype=np.int32)
+        around = self.table[eliminated].ravel()
+        around = around[around >= 0]
+        marks[around] = True
+        marks[eliminated] = False
+        around = np.unique(around[marks[around]])
+        marks[around] = False
+        codes = getattr(grid, 'codes', None)
+        if codes is not None:
+            # 紧凑网格：按颜色编码整批过滤
+            return around[self.replaceable_codes[special][codes.ravel()[around]]].tolist()
+        return [i for i in around.tolist() if grid[i // cols][i % cols] in replaceable]
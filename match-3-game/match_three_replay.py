@@ -0,0 +1,246 @@
+"""三消对局的确定性回放
+
+一局对局由随机数种子和有序的操作序列（点击、锤子、作弊补充锤子、重开、载入棋盘、撤销、重做）完全确定。
+Replay 在窗口游戏中记录操作，replay_session 用无界面引擎全速重新模拟（没有绘制和掉落定时器），
+verify_replay 断言最终分数和消除数量与记录一致。
+
+回放库是 JSON Lines 文件，每行一局：
+    {"version": 2, "seed": ..., "grid_size": 10, "colors": [...], "hammer_count": 3,
+     "compact": false, "moves": [["click", 行, 列], ["hammer", 行, 列], ["refill", 数量], ["reset"],
+                                 ["board", 种子, 分数, 打包棋盘的十六进制], ["undo"], ["redo"]],
+     "score": ..., "eliminated_count": ...}
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from typing import Iterator, List, Optional
+
+from match_three_boards import pack_codes, unpack_codes
+from match_three_engine import NORMAL_COLORS, Color, MatchThreeEngine
+from match_three_undo import UndoHistory
+
+# 版本2：特殊色块按行优先的候选位置放置（match_three_placement），版本1的回放无法重现
+REPLAY_VERSION = 2
+
+# 操作类型
+CLICK = 'click'
+HAMMER = 'hammer'
+REFILL = 'refill'   # 作弊功能：把锤子数量重置为指定值
+RESET = 'reset'     # 重开一局（引擎继续使用同一个随机数生成器）
+BOARD = 'board'     # 从棋盘库载入一个棋盘重开（棋盘按 match_three_boards 的4位格式打包）
+UNDO = 'undo'       # 撤销上一步（需要引擎挂着默认预算的撤销栈，与窗口游戏一致）
+REDO = 'redo'
+
+
+class ReplayMismatch(AssertionError):
+    """重新模拟的结果与记录不一致"""
+
+
+class Replay:
+    """一局对局的回放：初始参数、操作序列和最终结果"""
+
+    def __init__(self, seed: int, grid_size: int = 10, colors: Optional[List[Color]] = None,
+                 hammer_count: int = 3, compact: bool = False, moves: Optional[list] = None,
+                 score: Optional[int] = None, eliminated_count: Optional[int] = None):
+        self.seed = seed
+        self.grid_size = grid_size
+        self.colors = list(colors) if colors else list(NORMAL_COLORS)
+        self.hammer_count = hammer_count
+        self.compact = compact
+        self.moves = moves if moves is not None else []
+        self.score = score
+        self.eliminated_count = eliminated_count
+
+    @classmethod
+    def for_engine(cls, engine: MatchThreeEngine, seed: int) -> 'Replay':
+        """按引擎的初始参数创建空回放（引擎必须用同一个种子创建）"""
+        return cls(seed, engine.GRID_SIZE, engine.COLORS, engine.INITIAL_HAMMER_COUNT, engine.compact)
+
+    def click(self, row: int, col: int):
+        self.moves.append((CLICK, row, col))
+
+    def hammer(self, row: int, col: int):
+        self.moves.append((HAMMER, row, col))
+
+    def refill(self, count: int):
+        self.moves.append((REFILL, count))
+
+    def reset(self):
+        self.moves.append((RESET,))
+
+    def board(self, codes, seed: int, score: int = 0):
+        self.moves.append((BOARD, seed, score, pack_codes(codes).hex()))
+
+    def undo(self):
+        self.moves.append((UNDO,))
+
+    def redo(self):
+        self.moves.append((REDO,))
+
+    def finish(self, engine: MatchThreeEngine):
+        """记录最终分数和消除数量"""
+        self.score = engine.score
+        self.eliminated_count = engine.eliminated_count
+
+    def create_engine(self) -> MatchThreeEngine:
+        engine = MatchThreeEngine(self.grid_size, self.colors, seed=self.seed,
+                                  hammer_count=self.hammer_count, compact=self.compact)
+        if any(move[0] in (UNDO, REDO) for move in self.moves):
+            # 撤销栈必须从第一步开始记录
+            UndoHistory(engine)
+        return engine
+
+    def to_dict(self) -> dict:
+        return {
+            'version': REPLAY_VERSION,
+            'seed': self.seed,
+            'grid_size': self.grid_size,
+            'colors': [color.name for color in self.colors],
+            'hammer_count': self.hammer_count,
+            'compact': self.compact,
+            'moves': [list(move) for move in self.moves],
+            'score': self.score,
+            'eliminated_count': self.eliminated_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Replay':
+        version = data.get('version')
+        if version == 1:
+            raise ValueError("回放版本1录制于特殊色块放置规则统一之前，无法重现，需要重新生成回放库")
+        if version != REPLAY_VERSION:
+            raise ValueError(f"不支持的回放版本: {version}")
+        return cls(data['seed'], data['grid_size'], [Color[name] for name in data['colors']],
+                   data['hammer_count'], data['compact'], [tuple(move) for move in data['moves']],
+                   data['score'], data['eliminated_count'])
+
+
+def apply_move(engine: MatchThreeEngine, move: tuple):
+    """在引擎上执行一个操作，结算方式与窗口游戏相同"""
+    kind = move[0]
+    if kind == CLICK:
+        engine.click(move[1], move[2])
+    elif kind == HAMMER:
+        if engine.use_hammer(move[1], move[2]) is not None:
+            engine.settle()
+    elif kind == REFILL:
+        engine.hammer_count = move[1]
+    elif kind == RESET:
+        engine.reset()
+    elif kind == BOARD:
+        codes = unpack_codes(bytes.fromhex(move[3]), 0, engine.GRID_SIZE * engine.GRID_SIZE)
+        engine.load_board(codes, move[1], move[2])
+    elif kind in (UNDO, REDO):
+        if engine.history is None:
+            raise ValueError("回放撤销/重做需要引擎挂着撤销栈")
+        if kind == UNDO:
+            engine.history.undo()
+        else:
+            engine.history.redo()
+    else:
+        raise ValueError(f"未知的回放操作: {move!r}")
+
+
+def replay_session(replay: Replay) -> MatchThreeEngine:
+    """用无界面引擎重新模拟整局，返回结束时的引擎"""
+    engine = replay.create_engine()
+    for move in replay.moves:
+        apply_move(engine, move)
+    return engine
+
+
+def verify_replay(replay: Replay) -> MatchThreeEngine:
+    """重新模拟并断言最终分数和消除数量，不一致时抛出 ReplayMismatch"""
+    engine = replay_session(replay)
+    if engine.score != replay.score or engine.eliminated_count != replay.eliminated_count:
+        raise ReplayMismatch(
+            f"种子 {replay.seed}: 记录分数 {replay.score} 消除 {replay.eliminated_count}，"
+            f"重新模拟分数 {engine.score} 消除 {engine.eliminated_count}")
+    return engine
+
+
+def save_replay(path: str, replay: Replay):
+    """把一局回放追加到回放库文件"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(replay.to_dict(), separators=(',', ':')) + '\n')
+
+
+def load_replays(path: str) -> Iterator[Replay]:
+    """逐行读取回放库"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield Replay.from_dict(json.loads(line))
+
+
+def record_random_session(seed: int, moves: int, hammer_rate: float = 0.05,
+                          compact: bool = False) -> Replay:
+    """用随机点击生成一局回放，用于构建回归测试回放库"""
+    engine = MatchThreeEngine(seed=seed, compact=compact)
+    replay = Replay.for_engine(engine, seed)
+    rng = random.Random(seed)
+    size = engine.GRID_SIZE
+
+    for _ in range(moves):
+        if not engine.has_moves() and engine.hammer_count == 0:
+            break
+        row, col = rng.randrange(size), rng.randrange(size)
+        if engine.hammer_count > 0 and (rng.random() < hammer_rate or not engine.has_moves()):
+            move = (HAMMER, row, col)
+        else:
+            move = (CLICK, row, col)
+        replay.moves.append(move)
+        apply_move(engine, move)
+
+    replay.finish(engine)
+    return replay
+
+
+def main():
+    """命令行：生成随机回放库或全速校验回放库"""
+    parser = argparse.ArgumentParser(description="三消对局回放工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help="用随机点击生成回放库")
+    generate_parser.add_argument('corpus_path')
+    generate_parser.add_argument('--count', type=int, default=1000, help="对局数量")
+    generate_parser.add_argument('--moves', type=int, default=200, help="每局最多操作数")
+    generate_parser.add_argument('--seed', type=int, default=0, help="第一局的种子")
+    generate_parser.add_argument('--compact', action='store_true', help="使用uint8紧凑网格")
+
+    verify_parser = subparsers.add_parser('verify', help="重新模拟回放库并校验分数和消除数量")
+    verify_parser.add_argument('corpus_path')
+
+    args = parser.parse_args()
+
+    # 全速模拟时不输出引擎的逐步日志
+    logging.getLogger('match_three_engine').setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    if args.command == 'generate':
+        for seed in range(args.seed, args.seed + args.count):
+            save_replay(args.corpus_path, record_random_session(seed, args.moves, compact=args.compact))
+        print(f"生成 {args.count} 局回放到 {args.corpus_path}，用时 {time.perf_counter() - start:.2f}s")
+        return
+
+    sessions = moves = failures = 0
+    for replay in load_replays(args.corpus_path):
+        sessions += 1
+        moves += len(replay.moves)
+        try:
+            verify_replay(replay)
+        except ReplayMismatch as e:
+            failures += 1
+            print(f"❌ {e}")
+
+    elapsed = time.perf_counter() - start
+    print(f"校验 {sessions} 局、{moves} 个操作，失败 {failures} 局，用时 {elapsed:.2f}s"
+          f"（{moves / elapsed if elapsed else 0:.0f} 操作/秒）")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""三消引擎的增量撤销/重做
+
+每一步（点击或锤子，到掉落填充结束为止）只记录被改动的格子在这一步之前的颜色编码、分数变化和
+这一步开始时的随机数状态，不复制整个网格。撤销时把记录的编码和随机数状态与当前值交换，条目里
+就变成了重做需要的值，重做再交换回来，两者都只与改动的格子数成正比。
+
+所有条目的总字节数受预算限制，超出时丢弃最旧的撤销条目。
+
+挂到引擎上后由引擎在修改网格前通知：
+    history = UndoHistory(engine)
+    engine.click(row, col)
+    history.undo()
+    history.redo()
+"""
+from array import array
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+from match_three_engine import CODE_COLORS, COLOR_CODES, EMPTY_CODE
+
+DEFAULT_BUDGET = 16 * 1024 * 1024  # 撤销和重做条目的总字节数上限
+ENTRY_OVERHEAD = 256               # 每个条目的对象和分数字段的大致开销
+
+
+def pack_rng_state(rng) -> Tuple[int, array, Optional[float]]:
+    """把 random.Random 的状态压缩成uint32数组"""
+    version, internal, gauss_next = rng.getstate()
+    return version, array('I', internal), gauss_next
+
+
+def unpack_rng_state(rng, state: Tuple[int, array, Optional[float]]):
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
+
+
+class UndoEntry:
+    """一步的增量：改动格子的扁平索引和颜色编码、分数变化、随机数状态"""
+    __slots__ = ('indices', 'codes', 'score', 'eliminated_count', 'hammer_count', 'rng_state', 'np_rng_state')
+
+    def __init__(self, indices: array, codes: bytearray, score: int, eliminated_count: int,
+                 hammer_count: int, rng_state, np_rng_state: Optional[dict]):
+        self.indices = indices
+        self.codes = codes
+        self.score = score
+        self.eliminated_count = eliminated_count
+        self.hammer_count = hammer_count
+        self.rng_state = rng_state
+        self.np_rng_state = np_rng_state
+
+    def nbytes(self) -> int:
+        return (self.indices.itemsize * len(self.indices) + len(self.codes)
+                + self.rng_state[1].itemsize * len(self.rng_state[1]) + ENTRY_OVERHEAD)
+
+
+class UndoHistory:
+    """挂在引擎上的撤销/重做栈，只能在两步之间（掉落填充完成后）撤销或重做"""
+
+    def __init__(self, engine, budget: int = DEFAULT_BUDGET):
+        self.engine = engine
+        self.budget = budget
+        self.undo_entries = deque()
+        self.redo_entries = []
+        self.nbytes = 0
+
+        # 进行中的一步：扁平索引 -> 这一步之前的颜色编码（每个格子只记第一次改动前的值）
+        self._pending: Optional[Dict[int, int]] = None
+        self._start = None
+        engine.history = self
+
+    def __len__(self) -> int:
+        return len(self.undo_entries)
+
+    @property
+    def in_move(self) -> bool:
+        return self._pending is not None
+
+    def _begin(self):
+        engine = self.engine
+        self._pending = {}
+        np_rng_state = engine.np_rng.bit_generator.state if engine.compact else None
+        self._start = (engine.score, engine.eliminated_count, engine.hammer_count,
+                       pack_rng_state(engine.rng), np_rng_state)
+
+    def touch(self, row: int, col: int):
+        """格子即将被修改"""
+        if self._pending is None:
+            self._begin()
+        i = row * self.engine.GRID_SIZE + col
+        if i not in self._pending:
+            color = self.engine.grid[row][col]
+            self._pending[i] = COLOR_CODES[color] if color is not None else EMPTY_CODE
+
+    def touch_cells(self, cells: Iterable[Tuple[int, int]]):
+        for row, col in cells:
+            self.touch(row, col)
+
+    def touch_columns(self, columns: Iterable[int]):
+        """这些列即将掉落：从顶部到最下面一个空位的格子都会改变"""
+        grid = self.engine.grid
+        for col in columns:
+            for lowest in range(self.engine.GRID_SIZE - 1, -1, -1):
+                if grid[lowest][col] is None:
+                    break
+            else:
+                continue
+            for row in range(lowest + 1):
+                self.touch(row, col)
+
+    def commit(self):
+        """一步结束（掉落填充完成）：保存条目，清空重做栈，超出预算时丢弃最旧的条目"""
+        if self._pending is None:
+            return
+        engine = self.engine
+        score, eliminated_count, hammer_count, rng_state, np_rng_state = self._start
+        entry = UndoEntry(array('I', self._pending.keys()), bytearray(self._pending.values()),
+                          engine.score - score, engine.eliminated_count - eliminated_count,
+                          engine.hammer_count - hammer_count, rng_state, np_rng_state)
+        self._pending = None
+        self._start = None
+
+        for redo in self.redo_entries:
+            self.nbytes -= redo.nbytes()
+        self.redo_entries.clear()
+        self.undo_entries.append(entry)
+        self.nbytes += entry.nbytes()
+        while self.nbytes > self.budget and self.undo_entries:
+            self.nbytes -= self.undo_entries.popleft().nbytes()
+
+    def clear(self):
+        """整盘重新生成后旧的增量全部失效"""
+        self.undo_entries.clear()
+        self.redo_entries.clear()
+        self.nbytes = 0
+        self._pending = None
+        self._start = None
+
+    def _swap(self, entry: UndoEntry, sign: int):
+        """把条目里的颜色编码和随机数状态与引擎当前值交换，分数按符号加减"""
+        engine = self.engine
+        cols = engine.GRID_SIZE
+        if engine.compact:
+            import numpy as np
+            flat = engine.grid.codes.reshape(-1)
+            indices = np.frombuffer(entry.indices, dtype=np.uint32)
+            current = bytearray(flat[indices].tobytes())
+            flat[indices] = np.frombuffer(entry.codes, dtype=np.uint8)
+            entry.codes = current
+            entry.np_rng_state, engine.np_rng.bit_generator.state = engine.np_rng.bit_generator.state, entry.np_rng_state
+        else:
+            grid = engine.grid
+            codes = entry.codes
+            for k, i in enumerate(entry.indices):
+                row, col = divmod(i, cols)
+                color = grid[row][col]
+                grid[row][col] = CODE_COLORS[codes[k]]
+                codes[k] = COLOR_CODES[color] if color is not None else EMPTY_CODE
+
+        rng_state = pack_rng_state(engine.rng)
+        unpack_rng_state(engine.rng, entry.rng_state)
+        entry.rng_state = rng_state
+
+        engine.score += sign * entry.score
+        engine.eliminated_count += sign * entry.eliminated_count
+        engine.hammer_count += sign * entry.hammer_count
+        engine.components.invalidate_columns({i % cols for i in entry.indices})
+
+    def undo(self) -> bool:
+        """撤销最近一步，没有可撤销的步骤或一步还没结束时返回False"""
+        if self._pending is not None or not self.undo_entries:
+            return False
+        entry = self.undo_entries.pop()
+        self._swap(entry, -1)
+        self.redo_entries.append(entry)
+        return True
+
+    def redo(self) -> bool:
+        """重做最近撤销的一步"""
+        if self._pending is not None or not self.redo_entries:
+            return False
+        entry = self.redo_entries.pop()
+        self._swap(entry, 1)
+        self.undo_entries.append(entry)
+        return True
@@ -0,0 +1,60 @@
+"""uint8紧凑网格的批量掉落填充"""
+import numpy as np
+
+from match_three_array import CompactGrid, encode_colors
+from match_three_engine import EMPTY_CODE, NORMAL_COLORS, MatchThreeEngine
+
+
+def test_settle_compacts_columns_and_fills_holes():
+    rng = np.random.default_rng(0)
+    palette = encode_colors(NORMAL_COLORS)
+    grid = CompactGrid(6, 4)
+    grid.fill_random(rng, palette)
+    grid.codes[[0, 2, 3], 1] = EMPTY_CODE
+    grid.codes[5, 3] = EMPTY_CODE
+    before = grid.codes.copy()
+
+    changed, fill_counts = grid.settle(rng, palette)
+
+    assert changed.tolist() == [1, 3]
+    assert fill_counts.tolist() == [3, 1]
+    assert not (grid.codes == EMPTY_CODE).any()
+    assert np.isin(grid.codes, palette).all()
+    # 没有空位的列不动，有空位的列非空色块保持上下顺序落到底部
+    assert (grid.codes[:, [0, 2]] == before[:, [0, 2]]).all()
+    for col, count in zip(changed.tolist(), fill_counts.tolist()):
+        kept = before[:, col][before[:, col] != EMPTY_CODE]
+        assert grid.codes[count:, col].tolist() == kept.tolist()
+
+
+def test_settle_only_given_columns():
+    rng = np.random.default_rng(1)
+    palette = encode_colors(NORMAL_COLORS)
+    grid = CompactGrid(5, 5)
+    grid.fill_random(rng, palette)
+    grid.codes[4, 0] = grid.codes[4, 2] = EMPTY_CODE
+
+    changed, _ = grid.settle(rng, palette, [2])
+
+    assert changed.tolist() == [2]
+    assert grid.codes[4, 0] == EMPTY_CODE
+
+
+def test_compact_engine_matches_list_engine_gravity():
+    """同一棋盘敲掉同样的色块，两种网格掉落后保留下来的色块位置相同（新色块的随机数来源不同）"""
+    engine = MatchThreeEngine(seed=4, hammer_count=3)
+    compact = MatchThreeEngine(seed=4, hammer_count=3, compact=True)
+    codes = [code for row in engine.snapshot()['codes'] for code in row]
+    compact.load_board(codes, 4)
+    hits = [(9, 2), (5, 2), (0, 7)]
+    for row, col in hits:
+        assert compact.use_hammer(row, col) == engine.use_hammer(row, col)
+
+    assert compact.settle() == engine.settle() == [2, 7]
+    assert compact.score == engine.score
+    fills = {2: 2, 7: 1}
+    for col in range(engine.GRID_SIZE):
+        for row in range(fills.get(col, 0), engine.GRID_SIZE):
+            assert compact.grid[row][col] == engine.grid[row][col]
+    assert all(color is not None for grid_row in compact.grid for color in grid_row)
+    assert compact.find_connected_cells(9, 2) == compact.flood_fill_connected_cells(9, 2)
@@ -0,0 +1,65 @@
+"""批量引擎的连通组和计分与 MatchThreeEngine 一致"""
+import numpy as np
+
+from match_three_batch import BatchEngine
+from match_three_engine import COLOR_CODES, Color, MatchThreeEngine
+
+SEEDS = range(8)
+
+
+def make_engines():
+    engines = [MatchThreeEngine(seed=seed) for seed in SEEDS]
+    # 加几个特殊色块，覆盖彩色万能色块的连接规则
+    for i, engine in enumerate(engines):
+        engine.grid[i][3] = Color.COLORFUL
+        engine.grid[5][i] = Color.GOLD
+        engine.components.invalidate_all()
+    return engines
+
+
+def batch_for(engines):
+    codes = np.array([engine.snapshot()['codes'] for engine in engines], dtype=np.uint8)
+    return BatchEngine(len(engines), codes=codes, seed=0)
+
+
+def test_groups_match_engine():
+    engines = make_engines()
+    batch = batch_for(engines)
+    size = batch.GRID_SIZE
+    clicking = np.ones(batch.boards, dtype=bool)
+    for row in range(size):
+        for col in range(size):
+            rows = np.full(batch.boards, row)
+            cols = np.full(batch.boards, col)
+            group = batch.groups(rows, cols, clicking)
+            for board, engine in enumerate(engines):
+                expected = engine.find_connected_cells(row, col)
+                assert {tuple(cell) for cell in np.argwhere(group[board])} == expected, (board, row, col)
+
+
+def test_movable_matches_group_size():
+    engines = make_engines()
+    movable = batch_for(engines).movable()
+    for board, engine in enumerate(engines):
+        size = engine.GRID_SIZE
+        expected = [[engine.group_size(row, col) >= 2 for col in range(size)] for row in range(size)]
+        assert movable[board].tolist() == expected
+
+
+def test_step_scores_like_engine():
+    """点击不含彩色色块的组时，分数和消除数量与引擎逐局点击相同"""
+    engines = [MatchThreeEngine(seed=seed) for seed in SEEDS]
+    batch = batch_for(engines)
+    moves = [engine.find_best_move() for engine in engines]
+    rows = np.array([move[0] for move in moves])
+    cols = np.array([move[1] for move in moves])
+
+    batch.step(rows, cols)
+
+    for board, (engine, (row, col, points)) in enumerate(zip(engines, moves)):
+        eliminated = engine.click(row, col)
+        assert batch.score[board] == engine.score == points
+        assert batch.eliminated_count[board] == len(eliminated)
+        assert batch.specials_created[board].sum() == 1  # 普通消除生成一个黄金色块
+    assert not (batch.codes == 0).any()
+    assert (batch.codes == COLOR_CODES[Color.GOLD]).sum(axis=(1, 2)).min() >= 1
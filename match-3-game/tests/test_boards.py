@@ -0,0 +1,43 @@
+"""棋盘的4位打包和棋盘库读写"""
+import random
+
+import pytest
+
+from match_three_boards import (BoardCorpus, BoardWriter, engine_codes, load_board, pack_codes,
+                                packed_size, save_board, unpack_codes)
+from match_three_engine import CODE_COLORS, MatchThreeEngine
+
+
+@pytest.mark.parametrize('cells', [1, 2, 9, 100, 101])
+def test_pack_unpack(cells):
+    rng = random.Random(cells)
+    codes = [rng.randrange(len(CODE_COLORS)) for _ in range(cells)]
+    packed = pack_codes(codes)
+    assert len(packed) == packed_size(cells)
+    assert unpack_codes(b'\xff' + packed, 1, cells) == codes
+
+
+def test_corpus_round_trip(tmp_path):
+    path = str(tmp_path / 'boards.m3b')
+    rng = random.Random(0)
+    boards = [[rng.randrange(1, 6) for _ in range(9)] for _ in range(5)]
+    with BoardWriter(path, 3, 3) as writer:
+        for seed, codes in enumerate(boards):
+            writer.write(codes, seed=seed, score=seed * 10)
+
+    with BoardCorpus(path) as corpus:
+        assert len(corpus) == len(boards)
+        for index, view in enumerate(corpus):
+            assert (view.codes(), view.seed, view.score) == (boards[index], index, index * 10)
+        assert corpus[-1].codes() == boards[-1]
+
+
+def test_save_and_load_engine(tmp_path):
+    path = str(tmp_path / 'board.m3b')
+    engine = MatchThreeEngine(seed=12)
+    engine.click(*engine.find_best_move()[:2])
+    save_board(path, engine, seed=99)
+
+    loaded = load_board(path)
+    assert engine_codes(loaded) == engine_codes(engine)
+    assert loaded.score == engine.score
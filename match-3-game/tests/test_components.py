@@ -0,0 +1,39 @@
+"""ComponentIndex 的查表结果必须与洪水填充一致"""
+import pytest
+
+from match_three_engine import SPECIAL_COLORS, MatchThreeEngine
+
+
+def assert_matches_flood_fill(engine):
+    size = engine.GRID_SIZE
+    for row in range(size):
+        for col in range(size):
+            expected = engine.flood_fill_connected_cells(row, col)
+            assert engine.find_connected_cells(row, col) == expected, (row, col)
+            assert engine.group_size(row, col) == len(expected), (row, col)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_fresh_grid(seed):
+    assert_matches_flood_fill(MatchThreeEngine(seed=seed))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_after_clicks(seed):
+    """点击后只按列增量重新标记，结果仍与洪水填充一致（包括生成的特殊色块）"""
+    engine = MatchThreeEngine(seed=seed)
+    for _ in range(15):
+        move = engine.find_best_move()
+        if move is None:
+            break
+        engine.click(move[0], move[1])
+        assert_matches_flood_fill(engine)
+
+
+def test_colorful_blocks():
+    engine = MatchThreeEngine(seed=2)
+    # 放几块彩色万能色块，其中两块相邻
+    for row, col in ((0, 0), (3, 3), (3, 4), (7, 2)):
+        engine.grid[row][col] = SPECIAL_COLORS[2]
+    engine.components.invalidate_all()
+    assert_matches_flood_fill(engine)
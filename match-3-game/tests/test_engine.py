@@ -0,0 +1,77 @@
+"""MatchThreeEngine 的点击结算、确定性和快照"""
+from match_three_engine import NORMAL_POINTS, MatchThreeEngine
+
+
+def click_best_moves(engine, count):
+    for _ in range(count):
+        move = engine.find_best_move()
+        if move is None:
+            break
+        engine.click(move[0], move[1])
+
+
+def test_same_seed_same_game():
+    first = MatchThreeEngine(seed=7)
+    second = MatchThreeEngine(seed=7)
+    assert first.grid == second.grid
+
+    click_best_moves(first, 20)
+    click_best_moves(second, 20)
+    assert first.grid == second.grid
+    assert (first.score, first.eliminated_count) == (second.score, second.eliminated_count)
+
+
+def test_click_eliminates_group_and_settles():
+    engine = MatchThreeEngine(seed=3)
+    row, col, points = engine.find_best_move()
+    group = engine.find_connected_cells(row, col)
+
+    eliminated = engine.click(row, col)
+
+    assert eliminated == group
+    assert engine.score == points
+    assert engine.eliminated_count == len(group)
+    # 掉落和填充同步完成，网格没有空位
+    assert all(color is not None for grid_row in engine.grid for color in grid_row)
+
+
+def test_click_single_cell_does_nothing():
+    engine = MatchThreeEngine(seed=1)
+    for row in range(engine.GRID_SIZE):
+        for col in range(engine.GRID_SIZE):
+            if engine.group_size(row, col) == 1:
+                before = [list(grid_row) for grid_row in engine.grid]
+                assert engine.click(row, col) == set()
+                assert engine.grid == before
+                assert engine.score == 0
+                return
+
+
+def test_hammer_scores_and_consumes_hammer():
+    engine = MatchThreeEngine(seed=5)
+    color = engine.grid[4][4]
+    assert engine.use_hammer(4, 4) == color
+    engine.settle()
+    assert engine.hammer_count == engine.INITIAL_HAMMER_COUNT - 1
+    assert engine.score > 0
+
+
+def test_best_move_points_match_group_points():
+    engine = MatchThreeEngine(seed=11)
+    row, col, points = engine.find_best_move()
+    assert points == engine.group_points(row, col)
+    assert points >= 2 * NORMAL_POINTS
+
+
+def test_snapshot_round_trip():
+    engine = MatchThreeEngine(seed=9)
+    click_best_moves(engine, 5)
+
+    copy = MatchThreeEngine.from_snapshot(engine.snapshot(), seed=1)
+
+    assert copy.grid == engine.grid
+    assert copy.score == engine.score
+    assert copy.eliminated_count == engine.eliminated_count
+    assert copy.hammer_count == engine.hammer_count
+    # 同分的点击之间先选哪个取决于分量编号，只比较分数
+    assert copy.find_best_move()[2] == engine.find_best_move()[2]
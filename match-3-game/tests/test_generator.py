@@ -0,0 +1,71 @@
+"""约束棋盘生成：整批连通分量标记、颜色分布和约束过滤"""
+import numpy as np
+import pytest
+
+import match_three_generator
+from match_three_boards import BoardCorpus
+from match_three_engine import COLOR_CODES, Color, MatchThreeEngine
+from match_three_generator import BoardConstraints, board_stats, generate_boards, random_boards, write_corpus
+
+
+def engine_stats(codes):
+    """用引擎的洪水填充统计可消除组数和最大组"""
+    size = codes.shape[0]
+    engine = MatchThreeEngine(size, seed=0)
+    engine.load_board(codes.ravel().tolist(), 0)
+    seen = set()
+    groups = largest = 0
+    for row in range(size):
+        for col in range(size):
+            if (row, col) in seen:
+                continue
+            cells = engine.flood_fill_connected_cells(row, col)
+            seen |= cells
+            groups += len(cells) >= 2
+            largest = max(largest, len(cells))
+    return groups, largest
+
+
+def test_board_stats_match_flood_fill():
+    constraints = BoardConstraints(rows=8, cols=8)
+    boards = random_boards(np.random.default_rng(0), constraints, 50)
+    groups, largest = board_stats(boards)
+    for i, codes in enumerate(boards):
+        assert (groups[i], largest[i]) == engine_stats(codes)
+
+
+def test_color_counts_follow_ratio():
+    colors = {Color.RED: 0.5, Color.GREEN: 0.3, Color.BLUE: 0.2}
+    constraints = BoardConstraints(rows=7, cols=7, colors=colors)
+    codes, counts = constraints.color_counts()
+    assert counts.sum() == 49
+    assert counts.tolist() == [24, 15, 10]  # 24.5、14.7、9.8 按最大余数取整
+    for board in random_boards(np.random.default_rng(1), constraints, 5):
+        assert np.bincount(board.ravel(), minlength=16)[codes].tolist() == counts.tolist()
+
+
+def test_colorful_not_allowed():
+    with pytest.raises(ValueError):
+        BoardConstraints(colors={Color.RED: 1.0, Color.COLORFUL: 1.0})
+
+
+def test_corpus_satisfies_constraints(tmp_path):
+    path = str(tmp_path / 'daily.m3b')
+    constraints = BoardConstraints(min_groups=20, max_group_size=6)
+    write_corpus(path, constraints, 300, seed=5, workers=1)
+    with BoardCorpus(path) as corpus:
+        assert len(corpus) == 300
+        boards = corpus.arrays()
+        assert corpus[0].seed == 5 and corpus[-1].seed == 304
+    groups, largest = board_stats(boards)
+    assert (groups >= 20).all() and (largest <= 6).all()
+    assert not np.isin(boards, [COLOR_CODES[Color.COLORFUL], 0]).any()
+
+
+def test_same_seed_same_boards_regardless_of_workers(monkeypatch):
+    monkeypatch.setattr(match_three_generator, 'CHUNK_SIZE', 64)
+    constraints = BoardConstraints(min_groups=15)
+    serial = np.concatenate([boards for boards, _ in generate_boards(constraints, 200, seed=3, workers=1)])
+    parallel = np.concatenate([boards for boards, _ in generate_boards(constraints, 200, seed=3, workers=2)])
+    assert serial.shape == (200, 10, 10)
+    assert (serial == parallel).all()
@@ -0,0 +1,91 @@
+"""事件日志写入后按原样读回"""
+import struct
+
+import pytest
+
+from match_three_engine import Color, MatchThreeEngine
+from match_three_journal import (CLICK, ELIMINATE, HAMMER, HAMMER_REFILL, NEW_GRID, SPAWN, SPECIAL,
+                                 FILE_HEADER, MAGIC, RECORD_HEADER, EventJournal, read_journal)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'events.m3j')
+    journal = EventJournal(path)
+    journal.click(2, 3)
+    journal.eliminate(Color.RED, 30, {(2, 3), (2, 4), (3, 3)})
+    journal.spawn(4, [1, 2])
+    journal.special(5, 6, Color.GOLD, Color.BLUE)
+    journal.hammer(7, 8, Color.PINK)
+    journal.new_grid([[1, 2], [3, 0]])
+    journal.hammer_refill(3)
+    journal.close()
+
+    records = list(read_journal(path))
+
+    assert [record.kind for record in records] == [CLICK, ELIMINATE, SPAWN, SPECIAL, HAMMER,
+                                                   NEW_GRID, HAMMER_REFILL]
+    assert records[0].data == (2, 3)
+    color, points, cells = records[1].data
+    assert (color, points, sorted(cells)) == (Color.RED, 30, [(2, 3), (2, 4), (3, 3)])
+    assert records[2].data == (4, [Color.RED, Color.GREEN])
+    assert records[3].data == (5, 6, Color.GOLD, Color.BLUE)
+    assert records[4].data == (7, 8, Color.PINK)
+    assert records[5].data == [[Color.RED, Color.GREEN], [Color.BLUE, None]]
+    assert records[6].data == 3
+    assert all(a.time_ms <= b.time_ms for a, b in zip(records, records[1:]))
+
+
+def test_engine_events(tmp_path):
+    path = str(tmp_path / 'engine.m3j')
+    engine = MatchThreeEngine(seed=6)
+    engine.journal = EventJournal(path)
+    grid = [list(row) for row in engine.grid]
+    engine.journal_new_grid()
+    row, col, points = engine.find_best_move()
+    engine.click(row, col)
+    engine.journal.close()
+
+    records = list(read_journal(path))
+    assert records[0].kind == NEW_GRID and records[0].data == grid
+    assert records[1].kind == CLICK and records[1].data == (row, col)
+    assert records[2].kind == ELIMINATE and records[2].data[1] == points
+
+
+def test_large_values_round_trip(tmp_path):
+    """超大棋盘上的消除分数和作弊锤子数量超出版本1的字段，按原值写入"""
+    path = str(tmp_path / 'large.m3j')
+    journal = EventJournal(path)
+    journal.eliminate(Color.COLORFUL, 10 ** 10, {(0, 0), (0, 1)})
+    journal.hammer_refill(100000)
+    journal.close()
+
+    eliminate, refill = read_journal(path)
+    assert eliminate.data[1] == 10 ** 10
+    assert refill.data == 100000
+
+
+def test_reads_version_1(tmp_path):
+    path = tmp_path / 'v1.m3j'
+    eliminate = struct.pack('<BII', 1, 30, 1) + struct.pack('<HH', 2, 3)
+    refill = struct.pack('<H', 99)
+    path.write_bytes(FILE_HEADER.pack(MAGIC, 1, 0.0)
+                     + RECORD_HEADER.pack(ELIMINATE, len(eliminate), 5) + eliminate
+                     + RECORD_HEADER.pack(HAMMER_REFILL, len(refill), 6) + refill)
+
+    records = list(read_journal(str(path)))
+    assert records[0].data == (Color.RED, 30, [(2, 3)])
+    assert records[1].data == 99
+
+
+def test_writer_error_raised_on_flush_and_close(tmp_path):
+    path = str(tmp_path / 'broken.m3j')
+    journal = EventJournal(path)
+    journal.click(1, 1)
+    journal.click(100000, 0)  # 超出 <H，后台线程打包失败
+    with pytest.raises(RuntimeError):
+        journal.flush()
+    with pytest.raises(RuntimeError):
+        journal.close()
+
+    # 出错之前的记录仍然完整
+    assert [record.data for record in read_journal(path)] == [(1, 1)]
@@ -0,0 +1,52 @@
+"""死局检测和最佳点击提示"""
+import pytest
+
+from match_three_engine import COLOR_CODES, Color, MatchThreeEngine
+
+
+def scan_best_points(engine):
+    size = engine.GRID_SIZE
+    best = 0
+    for row in range(size):
+        for col in range(size):
+            cells = engine.flood_fill_connected_cells(row, col)
+            if len(cells) >= 2:
+                best = max(best, engine.score_cells(cells))
+    return best
+
+
+def checkerboard(size, first=Color.RED, second=Color.BLUE):
+    return [COLOR_CODES[first if (row + col) % 2 == 0 else second]
+            for row in range(size) for col in range(size)]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_has_moves_and_best_move_match_scan(seed):
+    engine = MatchThreeEngine(seed=seed)
+    for _ in range(30):
+        best_points = scan_best_points(engine)
+        assert engine.has_moves() == (best_points > 0)
+        move = engine.find_best_move()
+        if move is None:
+            assert best_points == 0
+            break
+        assert move[2] == best_points
+        assert len(engine.find_connected_cells(move[0], move[1])) >= 2
+        engine.click(move[0], move[1])
+
+
+def test_dead_board():
+    engine = MatchThreeEngine(4, seed=0)
+    engine.load_board(checkerboard(4), 0)
+    assert not engine.has_moves()
+    assert engine.find_best_move() is None
+
+
+def test_colorful_block_with_neighbour_is_a_move():
+    engine = MatchThreeEngine(4, seed=0)
+    codes = checkerboard(4)
+    codes[5] = COLOR_CODES[Color.COLORFUL]
+    engine.load_board(codes, 0)
+    assert engine.has_moves()
+    row, col, points = engine.find_best_move()
+    assert points == engine.score_cells(engine.find_connected_cells(row, col))
@@ -0,0 +1,68 @@
+"""特殊色块候选位置：8邻域、去掉被消除的格子、按放置规则过滤、按行优先排序"""
+import random
+
+import pytest
+
+import match_three_placement
+from match_three_array import CompactGrid
+from match_three_engine import SPECIAL_COLORS, Color, MatchThreeEngine
+from match_three_placement import NEIGHBOR_OFFSETS_8, SpecialPlacer, neighbor_table
+
+
+def expected_candidates(grid, cells, replaceable):
+    size = len(grid)
+    around = set()
+    for row, col in cells:
+        for dr, dc in NEIGHBOR_OFFSETS_8:
+            r, c = row + dr, col + dc
+            if 0 <= r < size and 0 <= c < size and (r, c) not in cells and grid[r][c] in replaceable:
+                around.add(r * size + c)
+    return sorted(around)
+
+
+def sample_groups(engine, count):
+    rng = random.Random(0)
+    size = engine.GRID_SIZE
+    for _ in range(count):
+        yield engine.flood_fill_connected_cells(rng.randrange(size), rng.randrange(size))
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    """分别测试numpy数组路径和纯Python元组表路径"""
+    if request.param == 'python':
+        monkeypatch.setattr(match_three_placement, 'np', None)
+    neighbor_table.cache_clear()
+    yield request.param
+    neighbor_table.cache_clear()
+
+
+def test_candidates_row_major(backend):
+    engine = MatchThreeEngine(seed=3)
+    for i, special in enumerate(SPECIAL_COLORS):
+        engine.grid[2][i] = special
+    placer = SpecialPlacer(engine.GRID_SIZE, engine.GRID_SIZE)
+    replaceable = {color for color in Color if color not in SPECIAL_COLORS}
+    for cells in sample_groups(engine, 40):
+        assert placer.candidates(engine.grid, cells, Color.GOLD) == \
+            expected_candidates(engine.grid, cells, replaceable)
+
+
+def test_compact_grid_matches_list_grid():
+    engine = MatchThreeEngine(seed=5)
+    engine.grid[4][4] = Color.DIAMOND
+    compact = CompactGrid.from_grid(engine.grid)
+    placer = SpecialPlacer(engine.GRID_SIZE, engine.GRID_SIZE)
+    for cells in sample_groups(engine, 40):
+        assert placer.candidates(compact, cells, Color.COLORFUL) == \
+            placer.candidates(engine.grid, cells, Color.COLORFUL)
+
+
+def test_custom_rules(backend):
+    engine = MatchThreeEngine(seed=7)
+    rules = {Color.GOLD: {Color.RED}}
+    placer = SpecialPlacer(engine.GRID_SIZE, engine.GRID_SIZE, rules)
+    for cells in sample_groups(engine, 20):
+        assert placer.candidates(engine.grid, cells, Color.GOLD) == \
+            expected_candidates(engine.grid, cells, {Color.RED})
+        assert placer.candidates(engine.grid, cells, Color.PEARL) == []
@@ -0,0 +1,39 @@
+"""回放的录制、保存和校验"""
+import pytest
+
+from match_three_replay import (Replay, ReplayMismatch, load_replays, record_random_session,
+                                save_replay, verify_replay)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_recorded_session_verifies(seed):
+    replay = record_random_session(seed, 100, hammer_rate=0.2)
+    engine = verify_replay(replay)
+    assert engine.score == replay.score
+    assert engine.eliminated_count == replay.eliminated_count
+
+
+def test_tampered_score_raises():
+    replay = record_random_session(0, 50)
+    replay.score += 10
+    with pytest.raises(ReplayMismatch):
+        verify_replay(replay)
+
+
+def test_saved_replays_verify(tmp_path):
+    path = str(tmp_path / 'replays.jsonl')
+    recorded = [record_random_session(seed, 60) for seed in range(3)]
+    for replay in recorded:
+        save_replay(path, replay)
+
+    loaded = list(load_replays(path))
+    assert [replay.moves for replay in loaded] == [replay.moves for replay in recorded]
+    for replay in loaded:
+        verify_replay(replay)
+
+
+def test_version_1_rejected():
+    data = record_random_session(0, 10).to_dict()
+    data['version'] = 1
+    with pytest.raises(ValueError, match='重新生成'):
+        Replay.from_dict(data)
@@ -0,0 +1,69 @@
+"""增量撤销/重做：网格、分数、道具和随机数状态都回到原样"""
+import pytest
+
+from match_three_engine import MatchThreeEngine
+from match_three_undo import UndoHistory
+
+
+def state(engine):
+    return (engine.snapshot(), engine.rng.getstate(),
+            engine.np_rng.bit_generator.state if engine.compact else None)
+
+
+def play(engine, moves):
+    for _ in range(moves):
+        move = engine.find_best_move()
+        if move is None:
+            break
+        engine.click(move[0], move[1])
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_undo_redo_round_trip(compact):
+    engine = MatchThreeEngine(seed=2, compact=compact)
+    history = UndoHistory(engine)
+    states = [state(engine)]
+    for _ in range(6):
+        play(engine, 1)
+        states.append(state(engine))
+    if engine.use_hammer(0, 0) is not None:
+        engine.settle()
+        states.append(state(engine))
+
+    for expected in reversed(states[:-1]):
+        assert history.undo()
+        assert state(engine) == expected
+    assert not history.undo()
+
+    for expected in states[1:]:
+        assert history.redo()
+        assert state(engine) == expected
+    assert not history.redo()
+
+    # 分量索引随撤销增量失效，结果仍与洪水填充一致
+    assert engine.find_connected_cells(5, 5) == engine.flood_fill_connected_cells(5, 5)
+
+
+def test_undo_then_same_click_reproduces_redo():
+    """撤销恢复了随机数状态，再点同一处得到与重做相同的新色块"""
+    engine = MatchThreeEngine(seed=8)
+    history = UndoHistory(engine)
+    row, col, _ = engine.find_best_move()
+    engine.click(row, col)
+    after = state(engine)
+
+    history.undo()
+    engine.click(row, col)
+    assert state(engine) == after
+    assert not history.redo()  # 新的一步清空了重做栈
+
+
+def test_budget_drops_oldest_entries():
+    engine = MatchThreeEngine(seed=1)
+    history = UndoHistory(engine, budget=3000)
+    play(engine, 20)
+    assert 0 < len(history) < 20
+    assert history.nbytes <= 3000
+    while history.undo():
+        pass
+    assert history.nbytes == sum(entry.nbytes() for entry in history.redo_entries)
@@ -0,0 +1,339 @@
+"""可选的数组实体后端：炸弹、水雷、导弹、潜艇的状态按列存放在连续的 numpy 数组里
+
+每种实体一个列存储（EntityArrays 的子类），位置、速度、计时器和状态标志各占一列，每个实体占一个槽位。
+每帧的移动、上浮、离开屏幕和冷却计时对整列做一次数组运算，不再逐个调用实体的 update()，
+只有发生事件的实体（触底、浮出水面、布雷、发射导弹）才逐个处理。
+
+碰撞检测、连环爆炸和绘制仍然使用实体对象：array_view 生成原实体类的子类，列中的属性读写数组里
+自己的槽位，其余属性（配置、名称等）照常放在实例里，所以游戏的其他代码不需要区分两种后端。
+被标记为不活跃的实体在 collect() 时整体压缩掉，存活的实体保持创建顺序，槽位顺序与游戏列表的顺序一致。
+水雷和导弹的事件输出只在 update(verbose=True) 时打印（游戏传入 verbose_logging）。
+
+需要numpy（已列在requirements.txt中），未安装时导入本模块会抛出ImportError。
+"""
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+MINE_SURFACE_FRAMES = 300  # 水雷在水面停留的帧数（与 Mine.update 相同）
+MAX_MINES = 3              # 每艘布雷潜艇最多发射的水雷数（与 Submarine.should_deploy_mine 相同）
+MAX_MISSILES = 2           # 每艘导弹潜艇最多发射的导弹数（与 Submarine.should_fire_missile 相同）
+
+# 潜艇特殊能力的编码
+SPECIAL_NONE = 0
+SPECIAL_MINELAYER = 1
+SPECIAL_MISSILE = 2
+SPECIAL_CODES = {None: SPECIAL_NONE, 'minelayer': SPECIAL_MINELAYER, 'missile': SPECIAL_MISSILE}
+
+
+class EntityArrays(ABC):
+    """一种实体的列存储：COLUMNS 是 {列名: dtype}，active 列同时表示槽位上的实体是否存活"""
+    COLUMNS = {}
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.size = 0                   # 已占用的槽位数，实体依次占用 [0, size)
+        self.views = []                 # 槽位 -> 实体对象
+        self.active = np.zeros(capacity, dtype=bool)
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.snapshot = None            # build() 时的包围盒
+
+    def allocate(self, view):
+        """为实体分配末尾的槽位，容量不够时整体翻倍"""
+        if self.size == self.capacity:
+            self.grow()
+        slot = self.size
+        self.size += 1
+        self.views.append(view)
+        return slot
+
+    def grow(self):
+        capacity = self.capacity * 2
+        for name in ('active', *self.COLUMNS):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def adopt(self, slot, entity):
+        """实体初始化完成后调用，子类用来填写不对应实体属性的列"""
+
+    def collect(self):
+        """去掉不活跃的实体：存活实体的各列整体前移（保持顺序）并重新编号槽位，有实体被去掉时返回True"""
+        alive = np.flatnonzero(self.active[:self.size])
+        if alive.size == self.size:
+            return False
+        count = alive.size
+        for name in ('active', *self.COLUMNS):
+            column = getattr(self, name)
+            column[:count] = column[alive]
+        self.views = self.views_at(alive)
+        for slot, view in enumerate(self.views):
+            view.slot = slot
+        self.size = count
+        return True
+
+    def live(self):
+        """存活的实体（按槽位顺序，即创建顺序）"""
+        return list(self.views)
+
+    def views_at(self, slots):
+        views = self.views
+        return [views[slot] for slot in slots.tolist()]
+
+    def on_surface(self, bounds=None):
+        """浮上水面的存活实体（按槽位顺序），给出 bounds 时只取与之相交的"""
+        mask = self.active[:self.size] & self.is_on_surface[:self.size]
+        if bounds is not None:
+            mask &= self.overlaps(self.bounds(), bounds)
+        return self.views_at(np.flatnonzero(mask))
+
+    @abstractmethod
+    def bounds(self):
+        """所有槽位的包围盒列 (左, 上, 右, 下)，与实体的 get_bounds() 相同"""
+
+    def build(self, entities):
+        """与 SpatialHash.build 相同的接口：记下当前所有槽位的包围盒（实体就是本存储的存活实体）"""
+        self.snapshot = self.bounds()
+
+    def first_overlap(self, bounds):
+        """与 SpatialHash.first_overlap 相同：列表中第一个（槽位最小的）仍然存活且与包围盒相交的实体，没有时返回None"""
+        hits = np.flatnonzero(self.active[:self.size] & self.overlaps(self.snapshot, bounds))
+        return self.views[hits[0]] if hits.size else None
+
+    @staticmethod
+    def overlaps(columns, bounds):
+        """每个槽位的包围盒是否与 bounds 相交（与 bounds_overlap 相同，贴边不算相交）"""
+        left, top, right, bottom = columns
+        return (left < bounds[2]) & (bounds[0] < right) & (top < bounds[3]) & (bounds[1] < bottom)
+
+
+def truncate(values):
+    """与 int() 相同，向0取整"""
+    return np.trunc(values).astype(np.int64)
+
+
+class BombArrays(EntityArrays):
+    """炸弹和高爆炸弹"""
+    COLUMNS = {'x': np.float64, 'y': np.float64, 'speed': np.float64,
+               'width': np.int32, 'height': np.int32}
+
+    def __init__(self, seabed_y, capacity=256):
+        super().__init__(capacity)
+        self.seabed_y = seabed_y
+
+    def update(self):
+        """所有炸弹下沉，返回到达海底的炸弹（已标记为不活跃）"""
+        n = self.size
+        active = self.active[:n]
+        y = self.y[:n]
+        np.add(y, self.speed[:n], out=y, where=active)
+        seabed = np.flatnonzero(active & (y >= self.seabed_y))
+        active[seabed] = False
+        return self.views_at(seabed)
+
+    def bounds(self):
+        n = self.size
+        width, height = self.width[:n], self.height[:n]
+        left = truncate(self.x[:n] - width // 2)
+        top = truncate(self.y[:n] - height // 2)
+        return left, top, left + width, top + height
+
+
+class MineArrays(EntityArrays):
+    COLUMNS = {'x': np.float64, 'y': np.float64, 'speed': np.float64, 'radius': np.int32,
+               'surface_timer': np.int32, 'is_on_surface': bool}
+
+    def __init__(self, surface_y, screen_width, capacity=256):
+        super().__init__(capacity)
+        self.surface_y = surface_y
+        self.screen_width = screen_width
+
+    def update(self, verbose=False):
+        """水下的水雷上浮，水面上的水雷漂向屏幕中心，停留够久或漂出屏幕时消失"""
+        n = self.size
+        active = self.active[:n]
+        on_surface = self.is_on_surface[:n]
+        x, y = self.x[:n], self.y[:n]
+        rising = active & ~on_surface
+        drifting = active & on_surface
+
+        np.subtract(y, self.speed[:n], out=y, where=rising)
+        surfaced = np.flatnonzero(rising & (y <= self.surface_y))
+        on_surface[surfaced] = True
+        y[surfaced] = self.surface_y
+        if verbose:
+            for mine_x, mine_y in zip(x[surfaced].tolist(), y[surfaced].tolist()):
+                print(f"⚠️ Mine surfaced at position: ({mine_x}, {mine_y})")
+
+        timer = self.surface_timer[:n]
+        np.add(timer, 1, out=timer, where=drifting)
+        np.add(x, np.where(x < self.screen_width // 2, 0.3, -0.3), out=x, where=drifting)
+        expired = drifting & (timer >= MINE_SURFACE_FRAMES)
+        drifted = drifting & ~expired & ((x < -20) | (x > self.screen_width + 20))
+        active[expired | drifted] = False
+        if verbose:
+            for _ in range(np.count_nonzero(expired)):
+                print(f"🌊 Mine disappeared from surface")
+            for _ in range(np.count_nonzero(drifted)):
+                print(f"🌊 Mine drifted off screen")
+
+    def bounds(self):
+        n = self.size
+        radius = self.radius[:n]
+        left = truncate(self.x[:n] - radius)
+        top = truncate(self.y[:n] - radius)
+        return left, top, left + radius * 2, top + radius * 2
+
+
+class MissileArrays(EntityArrays):
+    COLUMNS = {'x': np.float64, 'y': np.float64, 'direction': np.int8, 'speed': np.float64,
+               'phase': np.int8, 'horizontal_distance': np.float64, 'target_horizontal_distance': np.float64,
+               'turn_timer': np.int32, 'max_turn_timer': np.int32, 'angle': np.float64,
+               'surface_timer': np.int32, 'is_on_surface': bool}
+
+    def __init__(self, surface_y, capacity=256):
+        super().__init__(capacity)
+        self.surface_y = surface_y
+
+    def update(self, verbose=False):
+        """三个飞行阶段分别整列更新：水平飞行、转向、垂直上升"""
+        n = self.size
+        active = self.active[:n]
+        phase = self.phase[:n]
+        x, y, speed = self.x[:n], self.y[:n], self.speed[:n]
+        # 每个导弹每帧只执行一个阶段，先按更新前的阶段分组
+        horizontal = active & (phase == 1)
+        turning = active & (phase == 2)
+        climbing = active & (phase == 3)
+
+        # 水平飞行阶段
+        distance = self.horizontal_distance[:n]
+        np.add(x, speed * self.direction[:n], out=x, where=horizontal)
+        np.add(distance, speed, out=distance, where=horizontal)
+        turned = np.flatnonzero(horizontal & (distance >= self.target_horizontal_distance[:n]))
+        phase[turned] = 2
+        if verbose:
+            for missile_x, missile_y in zip(x[turned].tolist(), y[turned].tolist()):
+                print(f"🚀 Missile turning upward at ({missile_x}, {missile_y})")
+
+        # 转向阶段
+        timer = self.turn_timer[:n]
+        np.add(timer, 1, out=timer, where=turning)
+        progress = np.minimum(timer / self.max_turn_timer[:n], 1.0)
+        angle = np.where(self.direction[:n] == 1, progress * -90, 180 + progress * -90)
+        np.copyto(self.angle[:n], angle, where=turning)
+        phase[turning & (progress >= 1.0)] = 3
+
+        # 垂直上升阶段
+        on_surface = self.is_on_surface[:n]
+        np.subtract(y, speed, out=y, where=climbing)
+        surfaced = np.flatnonzero(climbing & (y <= self.surface_y) & ~on_surface)
+        on_surface[surfaced] = True
+        gone = climbing & (y < -50)
+        active[gone] = False
+        if verbose:
+            for missile_x, missile_y in zip(x[surfaced].tolist(), y[surfaced].tolist()):
+                print(f"🚀 Missile surfaced at position: ({missile_x}, {missile_y})")
+            for _ in range(np.count_nonzero(gone)):
+                print(f"💨 Missile disappeared into sky")
+
+    def bounds(self):
+        n = self.size
+        left = truncate(self.x[:n] - 8)
+        top = truncate(self.y[:n] - 3)
+        return left, top, left + 16, top + 6
+
+
+class SubmarineArrays(EntityArrays):
+    COLUMNS = {'x': np.float64, 'y': np.float64, 'speed': np.float64, 'direction': np.int8,
+               'width': np.int32, 'height': np.int32,
+               'mine_cooldown': np.int32, 'mines_deployed': np.int32,
+               'missile_cooldown': np.int32, 'missiles_fired': np.int32,
+               # 以下几列来自潜艇配置，不是潜艇的属性
+               'special': np.int8, 'mine_interval': np.int32, 'missile_interval': np.int32}
+
+    def __init__(self, screen_width, capacity=256):
+        super().__init__(capacity)
+        self.screen_width = screen_width
+
+    def adopt(self, slot, submarine):
+        config = submarine.config
+        self.special[slot] = SPECIAL_CODES[config.get('special')]
+        self.mine_interval[slot] = config.get('mine_cooldown', 240)
+        self.missile_interval[slot] = config.get('missile_cooldown', 300)
+
+    def update(self):
+        """所有潜艇移动、离开屏幕的标记为不活跃、冷却计时
+
+        返回 (离开屏幕的潜艇, 应该发射水雷的潜艇, 应该发射导弹的潜艇)，发射计数已经更新。
+        """
+        n = self.size
+        moving = self.active[:n].copy()
+        x = self.x[:n]
+        np.add(x, self.speed[:n], out=x, where=moving)
+        left_screen = moving & ((x < -self.width[:n] - 50) | (x > self.screen_width + 50))
+        self.active[:n][left_screen] = False
+
+        # 冷却计时（与 Submarine.update 相同，离开屏幕的这一帧也计时）
+        special = self.special[:n]
+        mine_cooldown = self.mine_cooldown[:n]
+        missile_cooldown = self.missile_cooldown[:n]
+        np.add(mine_cooldown, 1, out=mine_cooldown, where=moving & (special == SPECIAL_MINELAYER))
+        np.add(missile_cooldown, 1, out=missile_cooldown, where=moving & (special == SPECIAL_MISSILE))
+
+        staying = moving & ~left_screen
+        mines_deployed = self.mines_deployed[:n]
+        missiles_fired = self.missiles_fired[:n]
+        minelayers = np.flatnonzero(staying & (special == SPECIAL_MINELAYER)
+                                    & (mine_cooldown >= self.mine_interval[:n]) & (mines_deployed < MAX_MINES))
+        mine_cooldown[minelayers] = 0
+        mines_deployed[minelayers] += 1
+        launchers = np.flatnonzero(staying & (special == SPECIAL_MISSILE)
+                                   & (missile_cooldown >= self.missile_interval[:n]) & (missiles_fired < MAX_MISSILES))
+        missile_cooldown[launchers] = 0
+        missiles_fired[launchers] += 1
+        return self.views_at(np.flatnonzero(left_screen)), self.views_at(minelayers), self.views_at(launchers)
+
+    def bounds(self):
+        n = self.size
+        left = truncate(self.x[:n])
+        top = truncate(self.y[:n])
+        return left, top, left + self.width[:n], top + self.height[:n]
+
+
+_view_classes = {}
+
+
+def array_view(entity_class, store_class):
+    """entity_class 的数组视图子类：store_class 的列对应的属性读写存储中自己槽位的值
+
+    创建方式是 视图类(存储, 原构造参数...)：先分配槽位，再执行原来的 __init__。
+    """
+    key = (entity_class, store_class)
+    view_class = _view_classes.get(key)
+    if view_class is None:
+        def __init__(self, store, *args):
+            self.store = store
+            self.slot = store.allocate(self)
+            entity_class.__init__(self, *args)
+            store.adopt(self.slot, self)
+
+        namespace = {'__init__': __init__}
+        for name in ('active', *store_class.COLUMNS):
+            namespace[name] = _column_property(name)
+        view_class = type('Array' + entity_class.__name__, (entity_class,), namespace)
+        _view_classes[key] = view_class
+    return view_class
+
+
+def _column_property(name):
+    def get(self):
+        return getattr(self.store, name).item(self.slot)
+
+    def set(self, value):
+        getattr(self.store, name)[self.slot] = value
+
+    return property(get, set)
@@ -0,0 +1,35 @@
+"""炸弹、水雷、导弹和爆炸效果的对象池
+
+这些对象每次按键、每次命中都会创建，几十帧后又被丢弃。对象池把被移除的实例放回空闲列表，
+下次创建同类实体时重新执行 __init__ 复用它，持续连发时不再不断分配新对象，垃圾回收的压力也保持平稳。
+实体类用 __slots__ 声明属性，没有每个实例的 __dict__，复用时只是覆盖固定的几个槽位。
+
+被放回池中的实例不能再被任何地方引用（例如连环爆炸队列中的爆炸），否则会被之后的新实体覆盖。
+"""
+
+
+class EntityPool:
+    def __init__(self, entity_class):
+        self.entity_class = entity_class
+        self.free = []        # 可以复用的实例
+        self.in_use = 0       # 当前借出的实例数
+        self.high_water = 0   # 同时借出的最大实例数，即池实际需要的大小
+        self.created = 0      # 实际创建过的实例数
+
+    def acquire(self, *args):
+        """取一个实例：有空闲实例时用构造参数重新初始化，否则新建"""
+        if self.free:
+            entity = self.free.pop()
+            entity.__init__(*args)
+        else:
+            entity = self.entity_class(*args)
+            self.created += 1
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return entity
+
+    def release(self, entity):
+        """把不再使用的实例放回池中"""
+        self.in_use -= 1
+        self.free.append(entity)
@@ -0,0 +1,104 @@
+"""碰撞检测的粗筛：均匀网格空间哈希
+
+每帧把一类实体（导弹、水雷或潜艇）按包围盒登记到覆盖的网格单元里，炸弹只与自己所在单元里的
+实体做精确检测，检测次数与真正相邻的实体数成正比，而不是两个列表长度的乘积。连环爆炸按潜艇中心
+点登记，每个爆炸只检测半径覆盖的网格单元。
+
+包围盒是 (左, 上, 右, 下) 的整数元组，与 pygame.Rect 对浮点坐标的截断方式相同，
+bounds_overlap 的结果与 Rect.colliderect 一致，但不需要为每次检测创建 Rect 对象。
+"""
+
+CELL_SIZE = 64  # 网格单元边长（像素），略大于最大的潜艇高度和炸弹尺寸
+
+
+def bounds_overlap(a, b):
+    """两个包围盒是否相交（与 pygame.Rect.colliderect 相同，贴边不算相交）"""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}       # (列, 行) -> 登记在该单元的实体序号列表
+        self.entities = []    # 最近一次 build 的实体列表
+        self.bounds = []      # 实体序号 -> 包围盒（按点登记时是坐标）
+
+    def build(self, entities):
+        """按当前位置重新登记所有存活的实体（实体每帧都在移动，整体重建比逐个更新简单）"""
+        self.cells.clear()
+        self.entities = entities
+        self.bounds = [None] * len(entities)
+        size = self.cell_size
+        for index, entity in enumerate(entities):
+            if not entity.active:
+                continue
+            bounds = entity.get_bounds()
+            self.bounds[index] = bounds
+            for cx in range(bounds[0] // size, (bounds[2] - 1) // size + 1):
+                for cy in range(bounds[1] // size, (bounds[3] - 1) // size + 1):
+                    cell = self.cells.get((cx, cy))
+                    if cell is None:
+                        self.cells[(cx, cy)] = [index]
+                    else:
+                        cell.append(index)
+
+    def candidates(self, bounds):
+        """与包围盒位于相同网格单元的实体序号（升序，可能不相交）"""
+        size = self.cell_size
+        found = set()
+        for cx in range(bounds[0] // size, (bounds[2] - 1) // size + 1):
+            for cy in range(bounds[1] // size, (bounds[3] - 1) // size + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        return sorted(found)
+
+    def build_points(self, entities, points):
+        """按点登记存活的实体（points[i] 是第 i 个实体的 (x, y)），每个实体只落在一个网格单元"""
+        self.cells.clear()
+        self.entities = entities
+        self.bounds = points
+        size = self.cell_size
+        for index, entity in enumerate(entities):
+            if not entity.active:
+                continue
+            x, y = points[index]
+            key = (int(x // size), int(y // size))
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = [index]
+            else:
+                cell.append(index)
+
+    def within(self, x, y, radius):
+        """按点登记时，点到 (x, y) 的距离不超过 radius 的存活实体（按列表顺序，比较距离的平方）"""
+        size = self.cell_size
+        points = self.bounds
+        entities = self.entities
+        radius_squared = radius * radius
+        found = []
+        for cx in range(int((x - radius) // size), int((x + radius) // size) + 1):
+            for cy in range(int((y - radius) // size), int((y + radius) // size) + 1):
+                cell = self.cells.get((cx, cy))
+                if not cell:
+                    continue
+                for index in cell:
+                    px, py = points[index]
+                    dx = px - x
+                    dy = py - y
+                    if dx * dx + dy * dy <= radius_squared and entities[index].active:
+                        found.append(index)
+        found.sort()
+        return [entities[index] for index in found]
+
+    def first_overlap(self, bounds):
+        """列表中第一个仍然存活且与包围盒相交的实体，没有时返回None
+
+        按列表顺序取第一个，与原来逐个遍历列表时的命中顺序相同；登记后被击毁的实体
+        （active 为 False 的墓碑）直接跳过。
+        """
+        for index in self.candidates(bounds):
+            entity = self.entities[index]
+            if entity.active and bounds_overlap(bounds, self.bounds[index]):
+                return entity
+        return None
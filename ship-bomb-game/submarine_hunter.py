@@ -2,6 +2,10 @@ import pygame
 import sys
 import math
 import random
+from collections import deque
+
+from entity_pool import EntityPool
+from spatial_hash import SpatialHash, bounds_overlap
 
 # 初始化pygame
 pygame.init()
@@ -41,6 +45,10 @@ BOMB_EXPLOSION_RADIUS = 100      # 炸弹爆炸半径
 SUBMARINE_EXPLOSION_RADIUS = 80  # 潜艇爆炸半径
 HIGH_EXPLOSIVE_RADIUS = 200      # 高爆炸弹爆炸半径（2倍）
 
+# 分帧连环爆炸设置（C键开启）
+CHAIN_DELAY = 8                  # 潜艇爆炸多少帧后引爆附近的潜艇
+CHAIN_BUDGET = 32                # 每帧最多处理的潜艇爆炸数量
+
 # 高爆炸弹设置
 HIGH_EXPLOSIVE_COOLDOWN = 600    # 10秒生成一枚（60FPS * 10秒）
 MAX_HIGH_EXPLOSIVES = 3          # 最大存储数量
@@ -128,6 +136,11 @@ class Ship:
         # 返回驱逐舰的碰撞矩形
         return pygame.Rect(self.x, self.y, self.width, self.height)
     
+    def get_bounds(self):
+        # 碰撞包围盒 (左, 上, 右, 下)，与 get_rect() 相同但不创建 Rect
+        left, top = int(self.x), int(self.y)
+        return (left, top, left + self.width, top + self.height)
+    
     def is_invincible(self):
         return self.invincible_timer > 0
     
@@ -166,6 +179,8 @@ class Ship:
             ])
 
 class Bomb:
+    __slots__ = ('x', 'y', 'width', 'height', 'speed', 'active')
+    
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -188,6 +203,10 @@ class Bomb:
         return pygame.Rect(self.x - self.width//2, self.y - self.height//2, 
                           self.width, self.height)
     
+    def get_bounds(self):
+        left, top = int(self.x - self.width//2), int(self.y - self.height//2)
+        return (left, top, left + self.width, top + self.height)
+    
     def draw(self, screen):
         if self.active:
             # 绘制桶状深海炸弹
@@ -208,6 +227,8 @@ class Bomb:
                              (int(self.x), bomb_rect.y - 2), 3)
 
 class HighExplosiveBomb(Bomb):
+    __slots__ = ()
+    
     def __init__(self, x, y):
         super().__init__(x, y)
         # 高爆炸弹更大
@@ -237,6 +258,8 @@ class HighExplosiveBomb(Bomb):
                              (int(self.x), int(self.y)), 3)
 
 class Mine:
+    __slots__ = ('x', 'y', 'radius', 'speed', 'active', 'surface_timer', 'is_on_surface')
+    
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -246,7 +269,8 @@ class Mine:
         self.surface_timer = 0  # 在水面的计时器
         self.is_on_surface = False
         
-    def update(self):
+    def update(self, verbose=False):
+        """verbose 为 True 时打印上浮和消失事件（游戏传入 verbose_logging）"""
         if self.active:
             if not self.is_on_surface:
                 # 向上浮动
@@ -254,7 +278,8 @@ class Mine:
                 if self.y <= WATER_SURFACE_HEIGHT - 10:  # 浮到驱逐舰的水平线
                     self.is_on_surface = True
                     self.y = WATER_SURFACE_HEIGHT - 10   # 与驱逐舰在同一水平
-                    print(f"⚠️ Mine surfaced at position: ({self.x}, {self.y})")
+                    if verbose:
+                        print(f"⚠️ Mine surfaced at position: ({self.x}, {self.y})")
             else:
                 # 在水面停留，增加横向漂移
                 self.surface_timer += 1
@@ -264,10 +289,12 @@ class Mine:
                 # 延长停留时间到5秒，并检查边界
                 if self.surface_timer >= 300:  # 5秒后消失
                     self.active = False
-                    print(f"🌊 Mine disappeared from surface")
+                    if verbose:
+                        print(f"🌊 Mine disappeared from surface")
                 elif self.x < -20 or self.x > SCREEN_WIDTH + 20:
                     self.active = False
-                    print(f"🌊 Mine drifted off screen")
+                    if verbose:
+                        print(f"🌊 Mine drifted off screen")
         
         return not self.active
     
@@ -275,6 +302,10 @@ class Mine:
         return pygame.Rect(self.x - self.radius, self.y - self.radius, 
                           self.radius * 2, self.radius * 2)
     
+    def get_bounds(self):
+        left, top = int(self.x - self.radius), int(self.y - self.radius)
+        return (left, top, left + self.radius * 2, top + self.radius * 2)
+    
     def draw(self, screen):
         if self.active:
             # 水雷主体 - 黑色球形
@@ -375,6 +406,10 @@ class Submarine:
     def get_rect(self):
         # 返回潜艇的碰撞矩形
         return pygame.Rect(self.x, self.y, self.width, self.height)
+    
+    def get_bounds(self):
+        left, top = int(self.x), int(self.y)
+        return (left, top, left + self.width, top + self.height)
         
     def draw(self, screen):
         if self.active:
@@ -444,6 +479,8 @@ class Submarine:
                 ])
 
 class Explosion:
+    __slots__ = ('x', 'y', 'timer', 'max_timer', 'explosion_type', 'has_triggered_chain', 'max_radius', 'damage_radius')
+    
     def __init__(self, x, y, explosion_type='normal'):
         self.x = x
         self.y = y
@@ -488,6 +525,9 @@ class Explosion:
                     pygame.draw.circle(screen, (255, 255, 0), (int(self.x), int(self.y)), radius - 20)
 
 class Missile:
+    __slots__ = ('start_x', 'start_y', 'x', 'y', 'direction', 'speed', 'active', 'phase', 'horizontal_distance',
+                 'target_horizontal_distance', 'turn_timer', 'max_turn_timer', 'angle', 'surface_timer', 'is_on_surface')
+    
     def __init__(self, x, y, direction):
         self.start_x = x
         self.start_y = y
@@ -505,7 +545,8 @@ class Missile:
         self.surface_timer = 0  # 在水面的计时器
         self.is_on_surface = False
         
-    def update(self):
+    def update(self, verbose=False):
+        """verbose 为 True 时打印转向、出水和消失事件（游戏传入 verbose_logging）"""
         if self.active:
             if self.phase == 1:  # 水平飞行阶段
                 self.x += self.speed * self.direction
@@ -513,7 +554,8 @@ class Missile:
                 
                 if self.horizontal_distance >= self.target_horizontal_distance:
                     self.phase = 2  # 转向阶段
-                    print(f"🚀 Missile turning upward at ({self.x}, {self.y})")
+                    if verbose:
+                        print(f"🚀 Missile turning upward at ({self.x}, {self.y})")
                     
             elif self.phase == 2:  # 转向阶段
                 # 平滑转向动画
@@ -534,12 +576,14 @@ class Missile:
                 # 检查是否冲出水面，在驱逐舰高度停留
                 if self.y <= WATER_SURFACE_HEIGHT - 10 and not self.is_on_surface:
                     self.is_on_surface = True
-                    print(f"🚀 Missile surfaced at position: ({self.x}, {self.y})")
+                    if verbose:
+                        print(f"🚀 Missile surfaced at position: ({self.x}, {self.y})")
                 
                 # 导弹继续向上飞行直到完全离开屏幕
                 if self.y < -50:
                     self.active = False
-                    print(f"💨 Missile disappeared into sky")
+                    if verbose:
+                        print(f"💨 Missile disappeared into sky")
         
         return not self.active
     
@@ -550,6 +594,10 @@ class Missile:
         return pygame.Rect(self.x - missile_length//2, self.y - missile_width//2, 
                           missile_length, missile_width)
     
+    def get_bounds(self):
+        left, top = int(self.x - 8), int(self.y - 3)
+        return (left, top, left + 16, top + 6)
+    
     def draw(self, screen):
         if self.active:
             # 根据角度计算导弹的绘制方向
@@ -581,7 +629,7 @@ class Missile:
             # 导弹到达水面时去除圆形范围框，不绘制警告效果
 
 class SubmarineHunterGame:
-    def __init__(self):
+    def __init__(self, entity_arrays=False):
         # 根据调试模式调整窗口宽度
         window_width = SCREEN_WIDTH + DEBUG_PANEL_WIDTH if True else SCREEN_WIDTH
         self.screen = pygame.display.set_mode((window_width, SCREEN_HEIGHT))
@@ -597,6 +645,13 @@ class SubmarineHunterGame:
         self.mines = []  # 水雷列表
         self.missiles = []  # 导弹列表
         
+        # 碰撞检测粗筛：每帧把导弹、水雷、潜艇依次登记到空间哈希
+        self.collision_grid = SpatialHash()
+        # 连环爆炸的潜艇索引，每次连锁反应开始时重建
+        self.chain_grid = SpatialHash()
+        # 还没有引爆附近潜艇的潜艇爆炸（先进先出，即按波次顺序）
+        self.chain_queue = deque()
+        
         # 游戏状态
         self.running = True
         self.bombs_fired = 0
@@ -618,8 +673,28 @@ class SubmarineHunterGame:
             'missile': 0.002
         }
         
+        # 数组实体后端（需要numpy）：炸弹、水雷、导弹、潜艇的状态按列存放，每帧整列更新
+        self.entity_arrays = None
+        if entity_arrays:
+            from entity_arrays import BombArrays, MineArrays, MissileArrays, SubmarineArrays
+            bomb_arrays = BombArrays(SCREEN_HEIGHT - 20)
+            self.entity_arrays = {
+                Bomb: bomb_arrays,
+                HighExplosiveBomb: bomb_arrays,
+                Mine: MineArrays(WATER_SURFACE_HEIGHT - 10, SCREEN_WIDTH),
+                Missile: MissileArrays(WATER_SURFACE_HEIGHT - 10),
+                Submarine: SubmarineArrays(SCREEN_WIDTH),
+            }
+        
+        # 对象池：炸弹、水雷、导弹和爆炸效果移除后回收复用（数组后端的实体由列存储管理，不进对象池）
+        self.pools = {entity_class: EntityPool(entity_class)
+                      for entity_class in (Bomb, HighExplosiveBomb, Mine, Missile, Explosion)
+                      if self.entity_arrays is None or entity_class not in self.entity_arrays}
+        
         # 性能优化 - 减少调试输出
         self.verbose_logging = False  # 关闭详细调试输出
+        # 分帧连环爆炸：连锁反应分摊到多帧，默认关闭（整个连锁在当前帧内结算）
+        self.staggered_chains = False
         
         # 游戏正式开始，潜艇将随机生成
         
@@ -640,6 +715,9 @@ class SubmarineHunterGame:
                 elif event.key == pygame.K_g:
                     self.god_mode = not self.god_mode
                     print(f"🛡️ God mode: {'ON' if self.god_mode else 'OFF'}")
+                elif event.key == pygame.K_c:
+                    self.staggered_chains = not self.staggered_chains
+                    print(f"⏱️ Staggered chain reactions: {'ON' if self.staggered_chains else 'OFF'}")
                 # 潜艇生成概率调整
                 elif event.key == pygame.K_1:
                     self.spawn_rates['scout'] = min(0.02, self.spawn_rates['scout'] + 0.001)
@@ -667,10 +745,27 @@ class SubmarineHunterGame:
         if keys[pygame.K_RIGHT]:
             self.ship.move_right()
     
+    def create(self, entity_class, *args):
+        """创建实体；使用数组后端时创建该类的数组视图，状态存放在对应的列存储里，有对象池时从池中取"""
+        if self.entity_arrays is not None and entity_class in self.entity_arrays:
+            from entity_arrays import array_view
+            store = self.entity_arrays[entity_class]
+            return array_view(entity_class, type(store))(store, *args)
+        pool = self.pools.get(entity_class)
+        if pool is not None:
+            return pool.acquire(*args)
+        return entity_class(*args)
+    
+    def recycle(self, entity):
+        """把移除的实体放回对象池（没有对象池的实体直接丢弃）"""
+        pool = self.pools.get(type(entity))
+        if pool is not None:
+            pool.release(entity)
+    
     def fire_bomb(self):
         # 从驱逐舰发射炸弹
         bomb_x, bomb_y = self.ship.get_bomb_start_pos()
-        self.bombs.append(Bomb(bomb_x, bomb_y))
+        self.bombs.append(self.create(Bomb, bomb_x, bomb_y))
         self.bombs_fired += 1
         if self.verbose_logging:
             print(f"💣 Bomb fired! #{self.bombs_fired} at position: ({bomb_x}, {bomb_y})")
@@ -679,7 +774,7 @@ class SubmarineHunterGame:
         # 发射高爆炸弹
         if self.high_explosives > 0:
             bomb_x, bomb_y = self.ship.get_bomb_start_pos()
-            self.bombs.append(HighExplosiveBomb(bomb_x, bomb_y))
+            self.bombs.append(self.create(HighExplosiveBomb, bomb_x, bomb_y))
             self.high_explosives -= 1
             self.high_explosives_fired += 1
             if self.verbose_logging:
@@ -693,33 +788,83 @@ class SubmarineHunterGame:
         for sub_type, config in SUBMARINE_CONFIGS.items():
             spawn_chance = self.spawn_rates.get(sub_type, config['spawn_chance'])
             if random.random() < spawn_chance:
-                new_sub = Submarine(sub_type)
+                new_sub = self.create(Submarine, sub_type)
                 self.submarines.append(new_sub)
                 if self.verbose_logging:
                     print(f"✅ New {config['name']} spawned at depth: {new_sub.y:.1f}")
     
     def chain_explosion(self, explosion_x, explosion_y, explosion_radius, explosion_type='chain'):
-        """处理连环爆炸逻辑"""
-        chain_count = 0
-        submarines_hit = []
-        
-        # 检查爆炸范围内的潜艇
-        for submarine in self.submarines[:]:  # 使用切片避免修改列表时的问题
-            if submarine.active:
-                sub_center_x = submarine.x + submarine.width // 2
-                sub_center_y = submarine.y + submarine.height // 2
-                distance = math.sqrt((sub_center_x - explosion_x)**2 + (sub_center_y - explosion_y)**2)
-                
-                if distance <= explosion_radius:
-                    # 潜艇被炸毁
-                    submarine.active = False
-                    self.score += submarine.config['score']
-                    self.submarines_destroyed += 1
-                    submarines_hit.append(submarine)
-                    
-                    # 创建潜艇爆炸
-                    self.explosions.append(Explosion(sub_center_x, sub_center_y, 'submarine'))
-                    chain_count += 1
+        """处理连环爆炸逻辑，返回这次爆炸直接炸毁的潜艇数量
+
+        连锁反应按波次广度优先展开（不递归）：被炸毁的潜艇各自产生一个潜艇爆炸，排进 chain_queue，
+        每个爆炸只检测空间哈希中附近的潜艇。默认在当前帧内把队列处理完，所有得分最后一次性结算；
+        分帧模式下只结算这一次爆炸，后续的波次由 update_chain_reactions 逐帧处理。
+        """
+        self.build_chain_grid()
+        destroyed = self.blast_submarines(explosion_x, explosion_y, explosion_radius, explosion_type)
+        chain_count = len(destroyed)
+        
+        # 触发连锁反应
+        if not self.staggered_chains:
+            destroyed.extend(self.resolve_chain_queue())
+        
+        # 一次性结算所有被炸毁潜艇的得分
+        self.score_submarines(destroyed)
+        
+        return chain_count
+    
+    def update_chain_reactions(self):
+        """分帧模式：潜艇爆炸 CHAIN_DELAY 帧后才引爆附近的潜艇，每帧最多处理 CHAIN_BUDGET 个爆炸"""
+        if not self.chain_queue or self.chain_queue[0].timer < CHAIN_DELAY:
+            return
+        # 潜艇每帧都在移动，列表也会被清理，所以每帧重新登记
+        self.build_chain_grid()
+        self.score_submarines(self.resolve_chain_queue(CHAIN_BUDGET, CHAIN_DELAY))
+    
+    def build_chain_grid(self):
+        self.chain_grid.build_points(self.submarines, [(submarine.x + submarine.width // 2, submarine.y + submarine.height // 2)
+                                                       for submarine in self.submarines])
+    
+    def resolve_chain_queue(self, budget=None, delay=0):
+        """按顺序让队列中的潜艇爆炸引爆附近的潜艇（新的爆炸排到队尾），返回被炸毁的潜艇
+        
+        budget 为 None 时处理到队列为空；队首的爆炸不到 delay 帧时停止。
+        """
+        destroyed = []
+        processed = 0
+        while self.chain_queue and (budget is None or processed < budget):
+            explosion = self.chain_queue[0]
+            if explosion.timer < delay:
+                break
+            self.chain_queue.popleft()
+            explosion.has_triggered_chain = True
+            destroyed.extend(self.blast_submarines(explosion.x, explosion.y, explosion.damage_radius, 'chain'))
+            if explosion.timer >= explosion.max_timer:
+                # 动画已经结束、移出爆炸列表的爆炸，引爆后才能回收
+                self.recycle(explosion)
+            processed += 1
+        return destroyed
+    
+    def score_submarines(self, destroyed):
+        self.score += sum(submarine.config['score'] for submarine in destroyed)
+        self.submarines_destroyed += len(destroyed)
+    
+    def blast_submarines(self, explosion_x, explosion_y, explosion_radius, explosion_type):
+        """一个爆炸炸毁范围内的潜艇（中心距离不超过半径，只标记和创建爆炸效果，不计分），返回被炸毁的潜艇"""
+        submarines_hit = self.chain_grid.within(explosion_x, explosion_y, explosion_radius)
+        
+        for submarine in submarines_hit:
+            # 潜艇被炸毁
+            submarine.active = False
+            
+            # 创建潜艇爆炸，排队引爆附近的潜艇
+            sub_center_x = submarine.x + submarine.width // 2
+            sub_center_y = submarine.y + submarine.height // 2
+            explosion = self.create(Explosion, sub_center_x, sub_center_y, 'submarine')
+            self.explosions.append(explosion)
+            self.chain_queue.append(explosion)
+        
+        chain_count = len(submarines_hit)
         
         # 输出连环爆炸信息（减少冗余输出）
         if chain_count > 0:
@@ -736,178 +881,173 @@ class SubmarineHunterGame:
             if chain_count > 1:
                 print(f"🔗 Chain explosion triggered! {chain_count - 1} additional submarines destroyed!")
         
-        # 触发连锁反应
-        for submarine in submarines_hit:
-            sub_center_x = submarine.x + submarine.width // 2
-            sub_center_y = submarine.y + submarine.height // 2
-            self.chain_explosion(sub_center_x, sub_center_y, SUBMARINE_EXPLOSION_RADIUS, 'chain')
-        
-        return chain_count
+        return submarines_hit
     
     def check_collisions(self):
-        # 检查水雷与驱逐舰的碰撞（仅在水面时）
-        for mine in self.mines[:]:
-            if mine.active and mine.is_on_surface:
-                mine_rect = mine.get_rect()
-                ship_rect = self.ship.get_rect()
-                
-                # 添加调试信息
-                if self.verbose_logging:
-                    distance = math.sqrt((mine.x - self.ship.x)**2 + (mine.y - self.ship.y)**2)
-                    print(f"💣 Mine check: mine({mine.x:.1f}, {mine.y:.1f}) ship({self.ship.x:.1f}, {self.ship.y:.1f}) distance: {distance:.1f}")
-                
-                if mine_rect.colliderect(ship_rect):
-                    # 水雷击中驱逐舰
-                    if self.ship.take_damage(self.god_mode):
-                        print(f"💥 Mine hit ship! Lives: {self.ship.lives}")
-                        # 创建爆炸效果
-                        self.explosions.append(Explosion(mine.x, mine.y, 'bomb'))
-                        mine.active = False
-                        self.mines.remove(mine)
-                        
-                        # 检查游戏结束
-                        if self.ship.lives <= 0:
-                            print("💀 Game Over! Ship destroyed!")
-                            self.running = False
-                            return
+        if self.check_ship_collisions():
+            self.check_bomb_collisions()
+        # 检测过程中被击中的实体只标记为不活跃（墓碑），检测结束后每个列表一次性清理
+        self.remove_inactive_entities()
+    
+    def check_ship_collisions(self):
+        """浮上水面的水雷和导弹与驱逐舰的碰撞，驱逐舰被击沉时返回False"""
+        ship_bounds = self.ship.get_bounds()
         
-        # 检查导弹与驱逐舰的碰撞（仅在水面时）
-        for missile in self.missiles[:]:
-            if missile.active and missile.is_on_surface:
-                missile_rect = missile.get_rect()
-                ship_rect = self.ship.get_rect()
-                if missile_rect.colliderect(ship_rect):
-                    # 导弹击中驱逐舰
-                    if self.ship.take_damage(self.god_mode):
-                        print(f"🚀 Missile hit ship! Lives: {self.ship.lives}")
-                        # 创建爆炸效果
-                        self.explosions.append(Explosion(missile.x, missile.y, 'bomb'))
-                        missile.active = False
-                        self.missiles.remove(missile)
-                        
-                        # 检查游戏结束
-                        if self.ship.lives <= 0:
-                            print("💀 Game Over! Ship destroyed by missile!")
-                            self.running = False
-                            return
-        
-        # 检查炸弹与导弹的碰撞
-        for bomb in self.bombs[:]:
-            if not bomb.active:
-                continue
-            
-            bomb_rect = bomb.get_rect()
-            for missile in self.missiles[:]:
-                if missile.active:
-                    missile_rect = missile.get_rect()
-                    if bomb_rect.colliderect(missile_rect):
-                        # 炸弹击中导弹，提前引爆
-                        explosion_x = (bomb.x + missile.x) // 2
-                        explosion_y = (bomb.y + missile.y) // 2
-                        
-                        # 判断是否为高爆炸弹
-                        is_high_explosive = isinstance(bomb, HighExplosiveBomb)
-                        explosion_type = 'high_explosive' if is_high_explosive else 'bomb'
-                        explosion_radius = HIGH_EXPLOSIVE_RADIUS if is_high_explosive else BOMB_EXPLOSION_RADIUS
-                        
-                        # 创建爆炸效果
-                        self.explosions.append(Explosion(explosion_x, explosion_y, explosion_type))
-                        
-                        # 移除炸弹和导弹
-                        bomb.active = False
-                        missile.active = False
-                        self.bombs.remove(bomb)
-                        self.missiles.remove(missile)
-                        
-                        print(f"💥 Bomb intercepted missile at ({explosion_x}, {explosion_y})")
-                        
-                        # 触发连环爆炸
-                        chain_count = self.chain_explosion(explosion_x, explosion_y, explosion_radius)
-                        if chain_count > 0:
-                            print(f"🔗 Chain explosion triggered! {chain_count} submarines destroyed!")
-                        break
-        
-        # 检查炸弹与水雷的碰撞
-        for bomb in self.bombs[:]:
-            if not bomb.active:
-                continue
+        # 检查水雷与驱逐舰的碰撞（仅在水面时）
+        # 详细输出时需要检查每个浮上水面的水雷，否则只取可能与驱逐舰相交的
+        for mine in self.on_surface(self.mines, None if self.verbose_logging else ship_bounds):
+            # 添加调试信息
+            if self.verbose_logging:
+                distance = math.sqrt((mine.x - self.ship.x)**2 + (mine.y - self.ship.y)**2)
+                print(f"💣 Mine check: mine({mine.x:.1f}, {mine.y:.1f}) ship({self.ship.x:.1f}, {self.ship.y:.1f}) distance: {distance:.1f}")
             
-            bomb_rect = bomb.get_rect()
-            for mine in self.mines[:]:
-                if mine.active:
-                    mine_rect = mine.get_rect()
-                    if bomb_rect.colliderect(mine_rect):
-                        # 炸弹击中水雷，提前引爆
-                        explosion_x = (bomb.x + mine.x) // 2
-                        explosion_y = (bomb.y + mine.y) // 2
-                        
-                        # 判断是否为高爆炸弹
-                        is_high_explosive = isinstance(bomb, HighExplosiveBomb)
-                        explosion_type = 'high_explosive' if is_high_explosive else 'bomb'
-                        explosion_radius = HIGH_EXPLOSIVE_RADIUS if is_high_explosive else BOMB_EXPLOSION_RADIUS
-                        
-                        # 创建爆炸效果
-                        self.explosions.append(Explosion(explosion_x, explosion_y, explosion_type))
-                        
-                        # 移除炸弹和水雷
-                        bomb.active = False
-                        mine.active = False
-                        self.bombs.remove(bomb)
-                        self.mines.remove(mine)
-                        
-                        print(f"💥 Bomb destroyed mine at ({explosion_x}, {explosion_y})")
-                        
-                        # 触发连环爆炸
-                        chain_count = self.chain_explosion(explosion_x, explosion_y, explosion_radius)
-                        if chain_count > 0:
-                            print(f"🔗 Chain explosion triggered! {chain_count} submarines destroyed!")
-                        break
-        
-        # 检查炸弹与潜艇的碰撞
-        for bomb in self.bombs[:]:
-            if not bomb.active:
-                continue
-                
-            bomb_rect = bomb.get_rect()
-            for submarine in self.submarines[:]:
-                if not submarine.active:
-                    continue
-                    
-                sub_rect = submarine.get_rect()
-                if bomb_rect.colliderect(sub_rect):
-                    # 碰撞！炸弹和潜艇都爆炸
-                    explosion_x = (bomb.x + submarine.x + submarine.width // 2) // 2
-                    explosion_y = (bomb.y + submarine.y + submarine.height // 2) // 2
-                    
-                    # 判断是否为高爆炸弹
-                    is_high_explosive = isinstance(bomb, HighExplosiveBomb)
-                    explosion_type = 'high_explosive' if is_high_explosive else 'bomb'
-                    explosion_radius = HIGH_EXPLOSIVE_RADIUS if is_high_explosive else BOMB_EXPLOSION_RADIUS
-                    
+            if bounds_overlap(mine.get_bounds(), ship_bounds):
+                # 水雷击中驱逐舰
+                if self.ship.take_damage(self.god_mode):
+                    print(f"💥 Mine hit ship! Lives: {self.ship.lives}")
                     # 创建爆炸效果
-                    self.explosions.append(Explosion(explosion_x, explosion_y, explosion_type))
+                    self.explosions.append(self.create(Explosion, mine.x, mine.y, 'bomb'))
+                    mine.active = False
                     
-                    # 增加得分
-                    points = submarine.config['score']
-                    self.score += points
-                    self.submarines_destroyed += 1
-                    
-                    # 移除炸弹和潜艇
-                    bomb.active = False
-                    submarine.active = False
-                    self.bombs.remove(bomb)
-                    self.submarines.remove(submarine)
-                    
-                    hit_message = "🔥 HIGH EXPLOSIVE HIT!" if is_high_explosive else "🎯 Direct hit!"
-                    print(f"{hit_message} {submarine.config['name']} destroyed! +{points} points")
-                    
-                    # 立即触发连环爆炸
-                    chain_count = self.chain_explosion(explosion_x, explosion_y, explosion_radius)
-                    if chain_count > 0:
-                        chain_message = f"🌟 MASSIVE chain explosion! {chain_count} submarines destroyed!" if is_high_explosive else f"🔗 Chain explosion triggered! {chain_count} additional submarines destroyed!"
-                        print(chain_message)
+                    # 检查游戏结束
+                    if self.ship.lives <= 0:
+                        print("💀 Game Over! Ship destroyed!")
+                        self.running = False
+                        return False
+        
+        # 检查导弹与驱逐舰的碰撞（仅在水面时）
+        for missile in self.on_surface(self.missiles, ship_bounds):
+            if bounds_overlap(missile.get_bounds(), ship_bounds):
+                # 导弹击中驱逐舰
+                if self.ship.take_damage(self.god_mode):
+                    print(f"🚀 Missile hit ship! Lives: {self.ship.lives}")
+                    # 创建爆炸效果
+                    self.explosions.append(self.create(Explosion, missile.x, missile.y, 'bomb'))
+                    missile.active = False
                     
-                    break
+                    # 检查游戏结束
+                    if self.ship.lives <= 0:
+                        print("💀 Game Over! Ship destroyed by missile!")
+                        self.running = False
+                        return False
+        return True
+    
+    def on_surface(self, entities, bounds=None):
+        """浮上水面的存活实体，给出 bounds 时只取与之相交的；数组后端直接按列筛选，不逐个检查"""
+        if self.entity_arrays is not None and entities:
+            return entities[0].store.on_surface(bounds)
+        return [entity for entity in entities if entity.active and entity.is_on_surface
+                and (bounds is None or bounds_overlap(entity.get_bounds(), bounds))]
+    
+    def check_bomb_collisions(self):
+        """炸弹依次与导弹、水雷、潜艇检测：目标登记到空间哈希，每枚炸弹只检测同一网格单元里的目标"""
+        self.bomb_hits(self.missiles, self.bomb_hit_missile)
+        self.bomb_hits(self.mines, self.bomb_hit_mine)
+        self.bomb_hits(self.submarines, self.bomb_hit_submarine)
+    
+    def bomb_hits(self, targets, on_hit):
+        """每枚存活的炸弹最多击中一个目标（列表中第一个相交的），击中后调用 on_hit(炸弹, 目标)"""
+        if not self.bombs or not targets:
+            return
+        # 数组后端的列存储提供与空间哈希相同的接口，对整列包围盒做一次比较
+        index = targets[0].store if self.entity_arrays is not None else self.collision_grid
+        index.build(targets)
+        for bomb in self.bombs:
+            if not bomb.active:
+                continue
+            target = index.first_overlap(bomb.get_bounds())
+            if target is not None:
+                on_hit(bomb, target)
+    
+    def bomb_blast(self, bomb):
+        """炸弹的爆炸类型和伤害半径"""
+        if isinstance(bomb, HighExplosiveBomb):
+            return 'high_explosive', HIGH_EXPLOSIVE_RADIUS
+        return 'bomb', BOMB_EXPLOSION_RADIUS
+    
+    def bomb_hit_missile(self, bomb, missile):
+        # 炸弹击中导弹，提前引爆
+        explosion_x = (bomb.x + missile.x) // 2
+        explosion_y = (bomb.y + missile.y) // 2
+        explosion_type, explosion_radius = self.bomb_blast(bomb)
+        
+        # 创建爆炸效果
+        self.explosions.append(self.create(Explosion, explosion_x, explosion_y, explosion_type))
+        
+        # 炸弹和导弹标记为墓碑，检测结束后统一移除
+        bomb.active = False
+        missile.active = False
+        
+        print(f"💥 Bomb intercepted missile at ({explosion_x}, {explosion_y})")
+        
+        # 触发连环爆炸
+        chain_count = self.chain_explosion(explosion_x, explosion_y, explosion_radius)
+        if chain_count > 0:
+            print(f"🔗 Chain explosion triggered! {chain_count} submarines destroyed!")
+    
+    def bomb_hit_mine(self, bomb, mine):
+        # 炸弹击中水雷，提前引爆
+        explosion_x = (bomb.x + mine.x) // 2
+        explosion_y = (bomb.y + mine.y) // 2
+        explosion_type, explosion_radius = self.bomb_blast(bomb)
+        
+        # 创建爆炸效果
+        self.explosions.append(self.create(Explosion, explosion_x, explosion_y, explosion_type))
+        
+        # 炸弹和水雷标记为墓碑，检测结束后统一移除
+        bomb.active = False
+        mine.active = False
+        
+        print(f"💥 Bomb destroyed mine at ({explosion_x}, {explosion_y})")
+        
+        # 触发连环爆炸
+        chain_count = self.chain_explosion(explosion_x, explosion_y, explosion_radius)
+        if chain_count > 0:
+            print(f"🔗 Chain explosion triggered! {chain_count} submarines destroyed!")
+    
+    def bomb_hit_submarine(self, bomb, submarine):
+        # 碰撞！炸弹和潜艇都爆炸
+        explosion_x = (bomb.x + submarine.x + submarine.width // 2) // 2
+        explosion_y = (bomb.y + submarine.y + submarine.height // 2) // 2
+        explosion_type, explosion_radius = self.bomb_blast(bomb)
+        is_high_explosive = explosion_type == 'high_explosive'
+        
+        # 创建爆炸效果
+        self.explosions.append(self.create(Explosion, explosion_x, explosion_y, explosion_type))
+        
+        # 增加得分
+        points = submarine.config['score']
+        self.score += points
+        self.submarines_destroyed += 1
+        
+        # 炸弹和潜艇标记为墓碑，检测结束后统一移除
+        bomb.active = False
+        submarine.active = False
+        
+        hit_message = "🔥 HIGH EXPLOSIVE HIT!" if is_high_explosive else "🎯 Direct hit!"
+        print(f"{hit_message} {submarine.config['name']} destroyed! +{points} points")
+        
+        # 立即触发连环爆炸
+        chain_count = self.chain_explosion(explosion_x, explosion_y, explosion_radius)
+        if chain_count > 0:
+            chain_message = f"🌟 MASSIVE chain explosion! {chain_count} submarines destroyed!" if is_high_explosive else f"🔗 Chain explosion triggered! {chain_count} additional submarines destroyed!"
+            print(chain_message)
+    
+    def remove_inactive_entities(self):
+        # 每个列表只重建一次，代替逐个 list.remove 的O(n)删除
+        for entities in (self.bombs, self.mines, self.missiles, self.submarines):
+            if self.entity_arrays is not None:
+                # 数组后端：回收不活跃实体的槽位，列表换成存储中的存活实体
+                if entities and entities[0].store.collect():
+                    entities[:] = entities[0].store.live()
+            elif not all(entity.active for entity in entities):
+                alive = []
+                for entity in entities:
+                    if entity.active:
+                        alive.append(entity)
+                    else:
+                        self.recycle(entity)
+                entities[:] = alive
     
     def update(self):
         # 更新游戏对象
@@ -925,91 +1065,100 @@ class SubmarineHunterGame:
         # 生成新潜艇
         self.spawn_submarines()
         
-        # 更新炸弹
-        bombs_to_remove = []
-        for i, bomb in enumerate(self.bombs):
-            result = bomb.update()
-            if result == 'seabed':
-                # 海底爆炸
-                explosion_type = 'high_explosive' if isinstance(bomb, HighExplosiveBomb) else 'normal'
-                explosion_radius = HIGH_EXPLOSIVE_RADIUS if isinstance(bomb, HighExplosiveBomb) else BOMB_EXPLOSION_RADIUS
-                self.explosions.append(Explosion(bomb.x, bomb.y, explosion_type))
-                self.chain_explosion(bomb.x, bomb.y, explosion_radius, 'seabed')
-                bombs_to_remove.append(i)
-                if self.verbose_logging:
-                    explosion_name = "HIGH EXPLOSIVE" if isinstance(bomb, HighExplosiveBomb) else "Bomb"
-                    print(f"💣 {explosion_name} detonated on seabed! at: ({bomb.x}, {bomb.y})")
-            elif not bomb.active:
-                bombs_to_remove.append(i)
+        if self.entity_arrays is not None:
+            self.update_entity_arrays()
+        else:
+            self.update_entities()
         
-        # 性能优化：批量移除炸弹
-        for i in reversed(bombs_to_remove):
-            self.bombs.pop(i)
+        # 性能优化：每个列表一次性移除不活跃的实体
+        self.remove_inactive_entities()
+        
+        # 更新爆炸效果（update()返回True表示爆炸结束），结束的爆炸回收复用
+        explosions = []
+        for explosion in self.explosions:
+            if not explosion.update():
+                explosions.append(explosion)
+            elif explosion.explosion_type != 'submarine' or explosion.has_triggered_chain:
+                # 还在连环爆炸队列中的潜艇爆炸仍被引用，不能回收
+                self.recycle(explosion)
+        self.explosions[:] = explosions
+        
+        # 分帧模式下继续排队中的连锁反应
+        self.update_chain_reactions()
+        
+        # 碰撞检测
+        self.check_collisions()
+        
+        # 检查游戏结束
+        if self.ship.lives <= 0:
+            self.running = False
+    
+    def update_entities(self):
+        # 更新炸弹（爆炸或被击中的炸弹 active 为 False，更新结束后统一移除）
+        for bomb in self.bombs:
+            if bomb.update() == 'seabed':
+                self.detonate_on_seabed(bomb)
         
         # 更新潜艇
-        submarines_to_remove = []
-        for i, submarine in enumerate(self.submarines):
+        for submarine in self.submarines:
             submarine.update()
             if not submarine.active:
-                submarines_to_remove.append(i)
                 if self.verbose_logging:
                     print(f"🚫 Submarine removed (left screen): {submarine.config['name']}")
             else:
                 # 布雷潜艇部署水雷
                 if submarine.should_deploy_mine():
-                    mine_x, mine_y = submarine.get_mine_launch_pos()
-                    self.mines.append(Mine(mine_x, mine_y))
-                    if self.verbose_logging:
-                        print(f"💣 Minelayer deployed mine at ({mine_x}, {mine_y})")
+                    self.deploy_mine(submarine)
                 
                 # 导弹潜艇发射导弹
                 if submarine.should_fire_missile():
-                    missile_x, missile_y = submarine.get_missile_launch_pos()
-                    missile_direction = submarine.get_missile_direction()
-                    self.missiles.append(Missile(missile_x, missile_y, missile_direction))
-                    if self.verbose_logging:
-                        print(f"🚀 Missile submarine fired at ({missile_x}, {missile_y}) direction: {missile_direction}")
-        
-        # 性能优化：批量移除潜艇
-        for i in reversed(submarines_to_remove):
-            self.submarines.pop(i)
-        
-        # 更新水雷
-        mines_to_remove = []
-        for i, mine in enumerate(self.mines):
-            if mine.update():
-                mines_to_remove.append(i)
-        
-        # 性能优化：批量移除水雷
-        for i in reversed(mines_to_remove):
-            self.mines.pop(i)
-        
-        # 更新导弹
-        missiles_to_remove = []
-        for i, missile in enumerate(self.missiles):
-            if missile.update():
-                missiles_to_remove.append(i)
-        
-        # 性能优化：批量移除导弹
-        for i in reversed(missiles_to_remove):
-            self.missiles.pop(i)
-        
-        # 更新爆炸效果
-        explosions_to_remove = []
-        for i, explosion in enumerate(self.explosions):
-            if explosion.update():  # update()返回True表示爆炸结束
-                explosions_to_remove.append(i)
-        
-        # 性能优化：批量移除爆炸效果
-        for i in reversed(explosions_to_remove):
-            self.explosions.pop(i)
+                    self.launch_missile(submarine)
         
-        # 碰撞检测
-        self.check_collisions()
+        # 更新水雷和导弹（消失时 update() 返回True，同时 active 变为 False）
+        for mine in self.mines:
+            mine.update(self.verbose_logging)
+        for missile in self.missiles:
+            missile.update(self.verbose_logging)
+    
+    def update_entity_arrays(self):
+        """数组后端：每种实体整列更新一次，只对触底、离开屏幕、布雷和发射导弹的实体逐个处理"""
+        for bomb in self.entity_arrays[Bomb].update():
+            self.detonate_on_seabed(bomb)
         
-        # 检查游戏结束
-        if self.ship.lives <= 0:
-            self.running = False
+        left_screen, minelayers, launchers = self.entity_arrays[Submarine].update()
+        if self.verbose_logging:
+            for submarine in left_screen:
+                print(f"🚫 Submarine removed (left screen): {submarine.config['name']}")
+        for submarine in minelayers:
+            self.deploy_mine(submarine)
+        for submarine in launchers:
+            self.launch_missile(submarine)
+        
+        self.entity_arrays[Mine].update(self.verbose_logging)
+        self.entity_arrays[Missile].update(self.verbose_logging)
+    
+    def detonate_on_seabed(self, bomb):
+        # 海底爆炸
+        explosion_type = 'high_explosive' if isinstance(bomb, HighExplosiveBomb) else 'normal'
+        explosion_radius = HIGH_EXPLOSIVE_RADIUS if isinstance(bomb, HighExplosiveBomb) else BOMB_EXPLOSION_RADIUS
+        self.explosions.append(self.create(Explosion, bomb.x, bomb.y, explosion_type))
+        self.chain_explosion(bomb.x, bomb.y, explosion_radius, 'seabed')
+        if self.verbose_logging:
+            explosion_name = "HIGH EXPLOSIVE" if isinstance(bomb, HighExplosiveBomb) else "Bomb"
+            print(f"💣 {explosion_name} detonated on seabed! at: ({bomb.x}, {bomb.y})")
+    
+    def deploy_mine(self, submarine):
+        mine_x, mine_y = submarine.get_mine_launch_pos()
+        self.mines.append(self.create(Mine, mine_x, mine_y))
+        if self.verbose_logging:
+            print(f"💣 Minelayer deployed mine at ({mine_x}, {mine_y})")
+    
+    def launch_missile(self, submarine):
+        missile_x, missile_y = submarine.get_missile_launch_pos()
+        missile_direction = submarine.get_missile_direction()
+        self.missiles.append(self.create(Missile, missile_x, missile_y, missile_direction))
+        if self.verbose_logging:
+            print(f"🚀 Missile submarine fired at ({missile_x}, {missile_y}) direction: {missile_direction}")
     
     def draw_background(self):
         # 绘制天空背景
@@ -1062,6 +1211,23 @@ class SubmarineHunterGame:
         self.screen.blit(god_text, (debug_x, y_offset))
         y_offset += 25
         
+        # 连环爆炸模式
+        chain_status = f"STAGGERED ({len(self.chain_queue)})" if self.staggered_chains else "INSTANT"
+        chain_text = font_small.render(f"Chain: {chain_status}", True, (200, 200, 200))
+        self.screen.blit(chain_text, (debug_x, y_offset))
+        y_offset += 25
+        
+        # 对象池峰值（同时在用的最大实例数）
+        if self.pools:
+            pool_title = font_small.render("Pool Peak:", True, (255, 255, 100))
+            self.screen.blit(pool_title, (debug_x, y_offset))
+            y_offset += 20
+            for entity_class, pool in self.pools.items():
+                pool_text = font_small.render(f"{entity_class.__name__}: {pool.high_water}", True, (200, 200, 200))
+                self.screen.blit(pool_text, (debug_x + 5, y_offset))
+                y_offset += 18
+            y_offset += 7
+        
         # 潜艇生成概率
         spawn_title = font_small.render("Spawn Rates:", True, (255, 255, 100))
         self.screen.blit(spawn_title, (debug_x, y_offset))
@@ -1079,6 +1245,7 @@ class SubmarineHunterGame:
             "CONTROLS:",
             "D - Toggle Panel",
             "G - God Mode",
+            "C - Staggered Chain",
             "",
             "Scout Submarine:",
             "1 - Increase Rate",
@@ -1185,6 +1352,7 @@ class SubmarineHunterGame:
         print("- S Key: High Explosive Bomb")
         print("- D Key: Toggle Debug Panel")
         print("- G Key: God Mode")
+        print("- C Key: Staggered Chain Reactions")
         print("- ESC Key: Exit Game")
         print("=====================================")
         
@@ -1205,10 +1373,14 @@ class SubmarineHunterGame:
         print(f"🎯 Submarines Destroyed: {self.submarines_destroyed}")
         print(f"💣 Bombs Fired: {self.bombs_fired}")
         print(f"💥 High Explosives Used: {self.high_explosives_fired}")
+        if self.pools:
+            pool_peaks = ", ".join(f"{entity_class.__name__} {pool.high_water}" for entity_class, pool in self.pools.items())
+            print(f"♻️ Pool high-water marks: {pool_peaks}")
         
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    game = SubmarineHunterGame()
+    # --arrays：使用数组实体后端（需要numpy）
+    game = SubmarineHunterGame(entity_arrays='--arrays' in sys.argv[1:])
     game.run() 
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""测试直接导入游戏目录下的模块；游戏在导入时初始化pygame，测试中不打开真实窗口"""
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
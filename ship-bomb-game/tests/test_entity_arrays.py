@@ -0,0 +1,77 @@
+"""数组实体后端（--arrays）与默认对象后端从同一随机种子运行，结果逐帧相同"""
+import contextlib
+import io
+import random
+
+import pytest
+
+from submarine_hunter import SubmarineHunterGame
+
+FRAMES = 1500
+DENSE_RATES = {'scout': 0.3, 'minelayer': 0.2, 'missile': 0.2}
+NORMAL_RATES = {'scout': 0.06, 'minelayer': 0.05, 'missile': 0.05}
+
+
+def active(entities):
+    return sorted((type(entity).__name__.replace('Array', ''), round(entity.x, 6), round(entity.y, 6))
+                  for entity in entities if entity.active)
+
+
+def run(seed, entity_arrays, rates, god_mode, verbose=False):
+    """用固定的随机输入驱动游戏，返回每帧的得分、生命和存活实体，以及打印的输出"""
+    random.seed(seed)
+    game = SubmarineHunterGame(entity_arrays=entity_arrays)
+    game.spawn_rates = dict(rates)
+    game.god_mode = god_mode
+    game.verbose_logging = verbose
+    inputs = random.Random(seed + 1)
+    frames = []
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        for frame in range(FRAMES):
+            if not game.running:
+                break
+            key = inputs.random()
+            if key < 0.3:
+                game.ship.move_left()
+            elif key < 0.6:
+                game.ship.move_right()
+            if inputs.random() < 0.1:
+                game.fire_bomb()
+            if inputs.random() < 0.02:
+                game.high_explosives = 3
+                game.fire_high_explosive()
+            game.update()
+            frames.append((game.score, game.submarines_destroyed, game.ship.lives, game.running,
+                           active(game.bombs), active(game.mines), active(game.missiles), active(game.submarines),
+                           len(game.explosions)))
+            if frame % 97 == 0:
+                game.draw()
+    return frames, output.getvalue()
+
+
+@pytest.mark.parametrize('seed, rates, god_mode', [
+    (0, DENSE_RATES, True),
+    (1, NORMAL_RATES, False),
+])
+def test_arrays_backend_matches_objects(seed, rates, god_mode):
+    objects, _ = run(seed, False, rates, god_mode)
+    arrays, _ = run(seed, True, rates, god_mode)
+    assert len(arrays) == len(objects)
+    for frame, (expected, actual) in enumerate(zip(objects, arrays)):
+        assert actual == expected, f"第{frame}帧不同"
+    assert objects[-1][1] > 0  # 确实击毁过潜艇
+
+
+def mine_missile_events(output):
+    """水雷和导弹的事件输出（去掉坐标，数组后端打印的坐标是浮点数）"""
+    return sorted(line.split(' at ')[0] for line in output.splitlines() if line.split()[1] in ('Mine', 'Missile'))
+
+
+def test_event_prints_follow_verbose_logging():
+    assert mine_missile_events(run(0, False, DENSE_RATES, True)[1]) == []
+    assert mine_missile_events(run(0, True, DENSE_RATES, True)[1]) == []
+    verbose_objects = mine_missile_events(run(0, False, DENSE_RATES, True, verbose=True)[1])
+    verbose_arrays = mine_missile_events(run(0, True, DENSE_RATES, True, verbose=True)[1])
+    assert '⚠️ Mine surfaced' in verbose_objects
+    assert verbose_arrays == verbose_objects
@@ -0,0 +1,70 @@
+"""对象池复用实例，游戏运行中借出的实例与仍被引用的实体一一对应"""
+import contextlib
+import io
+import random
+
+import pytest
+
+from entity_pool import EntityPool
+from submarine_hunter import Bomb, Explosion, SubmarineHunterGame
+
+
+def test_acquire_reuses_released_instances():
+    pool = EntityPool(Bomb)
+    first = pool.acquire(10, 20)
+    second = pool.acquire(30, 40)
+    assert (pool.created, pool.in_use, pool.high_water) == (2, 2, 2)
+    pool.release(first)
+    third = pool.acquire(50, 60)
+    assert third is first
+    assert (third.x, third.y, third.active) == (50, 60, True)
+    assert (pool.created, pool.in_use, pool.high_water) == (2, 2, 2)
+    pool.release(second)
+    pool.release(third)
+    assert (pool.in_use, len(pool.free), pool.high_water) == (0, 2, 2)
+
+
+def test_reinitialised_instance_has_fresh_state():
+    pool = EntityPool(Explosion)
+    explosion = pool.acquire(100, 200, 'bomb')
+    explosion.timer = explosion.max_timer
+    explosion.has_triggered_chain = True
+    pool.release(explosion)
+    reused = pool.acquire(5, 6, 'submarine')
+    assert reused is explosion
+    assert (reused.x, reused.y, reused.timer, reused.has_triggered_chain) == (5, 6, 0, False)
+    assert reused.explosion_type == 'submarine'
+
+
+@pytest.mark.parametrize('staggered_chains', [False, True])
+def test_game_pools_track_referenced_entities(staggered_chains):
+    random.seed(3)
+    game = SubmarineHunterGame()
+    game.spawn_rates = {'scout': 0.3, 'minelayer': 0.2, 'missile': 0.2}
+    game.god_mode = True
+    game.staggered_chains = staggered_chains
+    inputs = random.Random(4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(1200):
+            if inputs.random() < 0.5:
+                game.ship.move_left()
+            else:
+                game.ship.move_right()
+            if inputs.random() < 0.2:
+                game.fire_bomb()
+            if inputs.random() < 0.02:
+                game.high_explosives = 3
+                game.fire_high_explosive()
+            game.update()
+            referenced = {id(entity): entity for entities in (game.bombs, game.mines, game.missiles,
+                                                               game.explosions, game.chain_queue)
+                          for entity in entities}
+            for entity_class, pool in game.pools.items():
+                # 仍被引用的实体不能在空闲列表里，否则会被下一个新实体覆盖
+                assert not any(id(entity) in referenced for entity in pool.free)
+                in_use = sum(type(entity) is entity_class for entity in referenced.values())
+                assert pool.in_use == in_use, entity_class.__name__
+    for pool in game.pools.values():
+        # 只有空闲列表为空时才新建，所以新建的实例数正好是峰值
+        assert pool.created == pool.high_water == pool.in_use + len(pool.free)
+    assert game.pools[Bomb].created < 200  # 连发时复用实例，而不是每枚炸弹新建
@@ -0,0 +1,61 @@
+"""空间哈希的粗筛结果与逐个遍历列表的精确检测一致"""
+import random
+
+import pygame
+
+from spatial_hash import SpatialHash, bounds_overlap
+
+
+class Box:
+    def __init__(self, x, y, width, height, active=True):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.active = active
+
+    def get_bounds(self):
+        return (int(self.x), int(self.y), int(self.x) + self.width, int(self.y) + self.height)
+
+
+def random_boxes(rng, count):
+    return [Box(rng.uniform(-50, 1250), rng.uniform(-50, 850), rng.randint(1, 90), rng.randint(1, 70),
+                active=rng.random() < 0.8)
+            for _ in range(count)]
+
+
+def test_bounds_overlap_matches_colliderect():
+    rng = random.Random(0)
+    for _ in range(2000):
+        a, b = random_boxes(rng, 2)
+        rect_a = pygame.Rect(a.x, a.y, a.width, a.height)
+        rect_b = pygame.Rect(b.x, b.y, b.width, b.height)
+        assert bounds_overlap(a.get_bounds(), b.get_bounds()) == bool(rect_a.colliderect(rect_b))
+
+
+def test_first_overlap_matches_linear_scan():
+    rng = random.Random(1)
+    boxes = random_boxes(rng, 300)
+    spatial_hash = SpatialHash()
+    spatial_hash.build(boxes)
+    # 登记后击毁的实体应被跳过
+    for box in boxes[::7]:
+        box.active = False
+    for probe in random_boxes(rng, 500):
+        bounds = probe.get_bounds()
+        expected = next((box for box in boxes if box.active and bounds_overlap(bounds, box.get_bounds())), None)
+        assert spatial_hash.first_overlap(bounds) is expected
+
+
+def test_within_matches_distance_scan():
+    rng = random.Random(2)
+    boxes = random_boxes(rng, 300)
+    points = [(box.x, box.y) for box in boxes]
+    spatial_hash = SpatialHash()
+    spatial_hash.build_points(boxes, points)
+    for _ in range(300):
+        x, y = rng.uniform(0, 1200), rng.uniform(0, 800)
+        radius = rng.uniform(0, 200)
+        expected = [box for box in boxes
+                    if box.active and (box.x - x) ** 2 + (box.y - y) ** 2 <= radius * radius]
+        assert spatial_hash.within(x, y, radius) == expected